@@ -0,0 +1,88 @@
+"""
+Compare the token splicing and AST compiler backends.
+
+For each input of bench_transpile.py, time the conversion of Pytuguês source
+to a code object by:
+
+* tokens: PytugaLexer.transpile_tokens() over a list of Token objects,
+  followed by untokenize() and compile(),
+* buffers: PytugaLexer.transpile() (token buffers) followed by compile(),
+* ast: the AstCompiler of pytuga.astbackend.
+
+The transpile cache is bypassed. Reports throughput in lines/s and the best
+time of all runs.
+
+Usage::
+
+    python benchmarks/bench_backends.py [--repeat R] [--lines N]
+"""
+import argparse
+import time
+
+from transpyler.utils import keep_spaces
+
+from pytuga.astbackend import AstCompiler
+from pytuga.transpyler import PytugaTranspyler
+
+from bench_transpile import cases
+
+BACKENDS = ('tokens', 'buffers', 'ast')
+
+
+def backend_functions(transpyler):
+    """
+    Return a dict of {backend: func}. Each function compiles a source string
+    to a code object.
+    """
+
+    lexer = transpyler.lexer
+    ast_compiler = AstCompiler(transpyler)
+
+    def compile_tokens(src):
+        tokens = lexer.transpile_tokens(lexer.tokenize(src))
+        python = keep_spaces(lexer.untokenize(tokens), src)
+        return compile(python, '<bench>', 'exec')
+
+    return {
+        'tokens': compile_tokens,
+        'buffers': lambda src: compile(lexer.transpile(src), '<bench>',
+                                       'exec'),
+        'ast': lambda src: ast_compiler.compile(src, '<bench>', 'exec'),
+    }
+
+
+def best_time(func, sources, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for src in sources:
+            func(src)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=10,
+                        help='number of runs of each case.')
+    parser.add_argument('--lines', type=int, default=20000,
+                        help='size of the large synthetic files.')
+    args = parser.parse_args(argv)
+
+    funcs = backend_functions(PytugaTranspyler())
+    print('%-16s %-10s %12s %10s %8s' % (
+        'case', 'backend', 'lines/s', 'best ms', 'speedup'))
+    for name, sources, factor in cases(args.lines):
+        n_lines = sum(src.count('\n') for src in sources)
+        repeat = max(1, int(args.repeat * (factor or 0.3)))
+        times = {backend: best_time(funcs[backend], sources, repeat)
+                 for backend in BACKENDS}
+        for backend in BACKENDS:
+            dt = times[backend]
+            print('%-16s %-10s %12.0f %10.2f %7.2fx' % (
+                name, backend, n_lines / dt, dt * 1000,
+                times['tokens'] / dt))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmarks comparing curse methods with their native equivalents.
+
+For each distinct method installed by the curses in pytuga.curses, time a call
+through the Portuguese name (e.g., L.acrescentar(1)) and through the builtin
+method (L.append(1)).
+
+Usage::
+
+    python benchmarks/bench_curses.py [--number N]
+"""
+import argparse
+import timeit
+
+from pytuga import curses
+
+SETUP = {
+    list: 'obj = [3, 1, 2] * 10',
+    tuple: 'obj = (3, 1, 2) * 10',
+    set: 'obj = set(range(30))',
+    dict: 'obj = dict.fromkeys(range(30))',
+    str: 'obj = "Olá, mundo!"',
+}
+
+# Arguments for each native method as (prefix, args). The prefix statement
+# restores the state of objects modified by destructive methods.
+ARGS = {
+    'append': ('', '(1)'),
+    'add': ('', '(1)'),
+    'center': ('', '(20)'),
+    'count': ('', '(1)'),
+    'difference': ('', '({1})'),
+    'difference_update': ('obj.add(1); ', '({1})'),
+    'discard': ('obj.add(1); ', '(1)'),
+    'extend': ('', '(())'),
+    'get': ('', '(1)'),
+    'index': ('', '(1)'),
+    'insert': ('', '(-1, 1)'),
+    'intersection': ('', '({1})'),
+    'intersection_update': ('', '(obj)'),
+    'isdisjoint': ('', '({1})'),
+    'issubset': ('', '({1})'),
+    'issuperset': ('', '({1})'),
+    'ljust': ('', '(20)'),
+    'pop': ('obj.append(1); ', '()'),
+    'popitem': ('obj[1] = 1; ', '()'),
+    'remove': ('obj.append(1); ', '(1)'),
+    'rjust': ('', '(20)'),
+    'setdefault': ('', '(1)'),
+    'sort': ('', '()'),
+    'symmetric_difference': ('', '({1})'),
+    'symmetric_difference_update': ('', '(())'),
+    'union': ('', '({1})'),
+    'update': ('', '(())'),
+}
+
+# Special cases for each type
+TYPE_ARGS = {
+    (set, 'pop'): ('obj.add(1); ', '()'),
+    (set, 'remove'): ('obj.add(1); ', '(1)'),
+    (dict, 'pop'): ('obj[1] = 1; ', '(1)'),
+    (dict, 'update'): ('', '({})'),
+}
+
+# Python wrappers: name -> (native name, curse args, native args)
+WRAPPERS = {
+    'inserir': ('insert', '(-1, 1)', '(-1, 1)'),
+    'ordenar_por': ('sort', '(abs)', '(key=abs)'),
+    'retirar_de': ('pop', '(-1)', '(-1)'),
+}
+
+
+def cases():
+    """
+    Yield (type, curse statement, native statement) for each curse method.
+    """
+
+    for tt, curse in curses.CURSES.items():
+        seen = set()
+        for name, value in curses.curse_attributes(curse).items():
+            if id(value) in seen:
+                continue
+            seen.add(id(value))
+
+            if name in WRAPPERS:
+                native, args, native_args = WRAPPERS[name]
+                prefix = ARGS.get(native, ('', ''))[0]
+            else:
+                native = value.__name__
+                prefix, args = TYPE_ARGS.get((tt, native),
+                                             ARGS.get(native, ('', '()')))
+                native_args = args
+            yield (tt, prefix + 'obj.%s%s' % (name, args),
+                   prefix + 'obj.%s%s' % (native, native_args))
+
+
+def best_time(stmt, setup, number):
+    times = timeit.repeat(stmt, setup, number=number, repeat=3)
+    return min(times) / number * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    curses.apply_curse_map()
+    print('%-45s %10s %10s %7s' % ('method', 'curse', 'native', 'ratio'))
+    for tt, curse_stmt, native_stmt in cases():
+        setup = SETUP[tt]
+        curse_time = best_time(curse_stmt, setup, args.number)
+        native_time = best_time(native_stmt, setup, args.number)
+        print('%-45s %8.1fns %8.1fns %6.2fx' % (
+            curse_stmt.rpartition('; ')[-1][:45],
+            curse_time, native_time, curse_time / native_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Measure cold and warm import times of a tree of Pytuguês modules.
+
+A package with N modules (200 by default) is generated in a temporary folder
+and imported in a fresh interpreter, first without any cached bytecode (cold)
+and then with the .pyc files written by the first run (warm).
+
+Usage::
+
+    python benchmarks/bench_import.py [--modules N] [--repeat R]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+MODULE_TEMPLATE = '''
+função fatorial_{idx}(n):
+    resultado = 1
+    para cada k de 1 até n faça:
+        resultado = resultado * k
+    retorne resultado
+
+
+função soma_{idx}(L):
+    total = 0
+    para cada x em L faça:
+        se x > 0 então:
+            total = total + x
+        senão:
+            prossiga
+    retorne total
+
+
+contador_{idx} = 0
+repetir 10 vezes:
+    contador_{idx} = contador_{idx} + 1
+'''
+
+IMPORT_SCRIPT = '''
+import sys, time
+sys.path.insert(0, {path!r})
+t0 = time.perf_counter()
+import pytuga.importer
+pytuga.importer.install()
+t1 = time.perf_counter()
+import curso
+print(time.perf_counter() - t1)
+'''
+
+
+def make_tree(root, n_modules):
+    """
+    Create the "curso" package with n_modules submodules inside root.
+    """
+
+    pkg = os.path.join(root, 'curso')
+    os.makedirs(pkg)
+    names = ['modulo_%03d' % i for i in range(n_modules)]
+    with open(os.path.join(pkg, '__init__.pytg'), 'w') as fd:
+        fd.write('\n'.join('importe curso.%s' % name for name in names))
+    for idx, name in enumerate(names):
+        with open(os.path.join(pkg, name + '.pytg'), 'w') as fd:
+            fd.write(MODULE_TEMPLATE.format(idx=idx))
+    return pkg
+
+
+def clear_cache(root):
+    for path, dirs, _ in os.walk(root):
+        if '__pycache__' in dirs:
+            shutil.rmtree(os.path.join(path, '__pycache__'))
+
+
+def import_time(root):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env.pop('PYTUGA_CACHE_DIR', None)
+    script = IMPORT_SCRIPT.format(path=root)
+    out = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return float(out.decode().split()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--modules', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp()
+    try:
+        make_tree(root, args.modules)
+        cold, warm = [], []
+        for _ in range(args.repeat):
+            clear_cache(root)
+            cold.append(import_time(root))
+            warm.append(import_time(root))
+    finally:
+        shutil.rmtree(root)
+
+    cold, warm = min(cold), min(warm)
+    print('modules: %d' % args.modules)
+    print('cold import: %.1f ms' % (cold * 1000))
+    print('warm import: %.1f ms' % (warm * 1000))
+    print('speedup: %.1fx' % (cold / warm))
+
+
+if __name__ == '__main__':
+    main()
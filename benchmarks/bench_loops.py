@@ -0,0 +1,93 @@
+"""
+Measure the per-iteration cost of "repetir N vezes" loops.
+
+Each program is compiled by the AST backend with the default lowering
+(for ___ in range(N)) and with OptimizedLoopLowering (for () in
+itertools.repeat((), N)). Programs mimic the turtle drawings of students:
+tight loops at module level and inside functions calling a cheap drawing
+function.
+
+Usage::
+
+    python benchmarks/bench_loops.py [--iterations N] [--repeat R]
+"""
+import argparse
+import time
+
+from pytuga.astbackend import AstCompiler, LoopLowering, \
+    OptimizedLoopLowering
+from pytuga.transpyler import PytugaTranspyler
+
+PROGRAMS = {
+    'module_empty': '''
+repetir N vezes:
+    prossiga
+''',
+    'module_draw': '''
+função frente(passo):
+    retorne passo
+
+repetir N vezes:
+    frente(1)
+''',
+    'function_draw': '''
+função frente(passo):
+    retorne passo
+
+função desenhe():
+    repetir N vezes:
+        frente(1)
+
+desenhe()
+''',
+    'nested_polygon': '''
+função frente(passo):
+    retorne passo
+
+repetir N // 360 vezes:
+    repetir 360 vezes:
+        frente(1)
+''',
+}
+
+LOWERINGS = {
+    'range': LoopLowering,
+    'repeat': OptimizedLoopLowering,
+}
+
+
+def best_time(code, iterations, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        ns = {'N': iterations}
+        start = time.perf_counter()
+        exec(code, ns)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=1000000,
+                        help='number of iterations of each loop.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of each program.')
+    args = parser.parse_args(argv)
+
+    transpyler = PytugaTranspyler()
+    print('%-16s %-8s %10s %10s %8s' % (
+        'program', 'lowering', 'best ms', 'ns/iter', 'speedup'))
+    for name, src in PROGRAMS.items():
+        times = {}
+        for lowering, cls in LOWERINGS.items():
+            compiler = AstCompiler(transpyler, cls())
+            code = compiler.compile(src, '<bench>', 'exec')
+            times[lowering] = best_time(code, args.iterations, args.repeat)
+        for lowering, dt in times.items():
+            print('%-16s %-8s %10.2f %10.1f %7.2fx' % (
+                name, lowering, dt * 1000, dt * 1e9 / args.iterations,
+                times['range'] / dt))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the batched math helpers of pytuga.numeric with scalar loops.
+
+Each function of the Pytuguês runtime is applied to a list and to an
+array.array of random samples by a list comprehension and by its batched
+variant. The aggregates (média and desvio_padrão) are compared with the
+statistics module. Batched functions use NumPy if it is installed.
+
+Usage::
+
+    python benchmarks/bench_numeric.py [--size N] [--repeat R]
+"""
+import argparse
+import random
+import statistics
+import time
+from array import array
+
+from transpyler import math as scalar
+
+from pytuga import numeric
+
+CASES = [
+    ('raiz', scalar.sqrt, numeric.raiz_em_lote),
+    ('seno', scalar.sin, numeric.seno_em_lote),
+    ('exponencial', scalar.exp, numeric.exponencial_em_lote),
+    ('logaritmo', scalar.log, numeric.logaritmo_em_lote),
+]
+
+
+def best_time(func, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=1000000,
+                        help='number of samples.')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of runs of each case.')
+    args = parser.parse_args(argv)
+
+    samples = [random.uniform(1, 100) for _ in range(args.size)]
+    inputs = {'list': samples, 'array': array('d', samples)}
+    print('numpy: %s' % ('yes' if numeric.numpy is not None else 'no'))
+    print('%-14s %-6s %12s %12s %8s' % (
+        'function', 'input', 'scalar ms', 'batched ms', 'speedup'))
+
+    for name, function, batched in CASES:
+        for kind, data in inputs.items():
+            loop = best_time(lambda xs: [function(x) for x in xs], data,
+                             args.repeat)
+            fast = best_time(batched, data, args.repeat)
+            print('%-14s %-6s %12.2f %12.2f %7.2fx' % (
+                name, kind, loop * 1000, fast * 1000, loop / fast))
+
+    aggregates = [
+        ('média', statistics.fmean, numeric.média),
+        ('desvio_padrão', statistics.stdev, numeric.desvio_padrão),
+    ]
+    for name, reference, aggregate in aggregates:
+        for kind, data in inputs.items():
+            slow = best_time(reference, data, 1)
+            fast = best_time(aggregate, data, args.repeat)
+            print('%-14s %-6s %12.2f %12.2f %7.2fx' % (
+                name, kind, slow * 1000, fast * 1000, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
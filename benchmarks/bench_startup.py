@@ -0,0 +1,61 @@
+"""
+Compare startup time and memory of eager and lazy curses.
+
+Each mode runs in a fresh interpreter that imports pytuga, initializes the
+runtime and executes a small program that does not use any Portuguese method
+of builtin types.
+
+Usage::
+
+    python benchmarks/bench_startup.py [--repeat R]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = '''
+import json, resource, time
+t0 = time.perf_counter()
+from pytuga.transpyler import PytugaTranspyler
+transpyler = PytugaTranspyler(lazy_curses={lazy})
+t1 = time.perf_counter()
+transpyler.apply_curses()
+t2 = time.perf_counter()
+transpyler.namespace
+transpyler.exec('x = 0\\nrepetir 10 vezes: x = x + 1\\n', {{}})
+t3 = time.perf_counter()
+print(json.dumps({{
+    'import': t1 - t0,
+    'curses': t2 - t1,
+    'run': t3 - t2,
+    'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+'''
+
+
+def run(lazy):
+    env = dict(os.environ)
+    env.pop('PYTUGA_LAZY_CURSES', None)
+    script = SCRIPT.format(lazy=lazy)
+    out = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return json.loads(out.decode().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    for lazy in [False, True]:
+        results = [run(lazy) for _ in range(args.repeat)]
+        print('%s curses:' % ('lazy' if lazy else 'eager'))
+        for key in ['import', 'curses', 'run']:
+            value = min(x[key] for x in results)
+            print('    %s: %.2f ms' % (key, value * 1000))
+        print('    max rss: %d kB' % min(x['maxrss'] for x in results))
+
+
+if __name__ == '__main__':
+    main()
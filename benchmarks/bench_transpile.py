@@ -0,0 +1,310 @@
+"""
+Benchmark transpile, compile and exec over the language corpus and over
+synthetic inputs.
+
+The corpus is the table of Pytuguês/Python pairs in tests/test_language.py.
+Synthetic cases are deeply nested "repetir" blocks, long chains of
+"para cada x de 1 até N a cada K" commands, a large file mixing all commands
+and a file of long expressions that are mostly plain identifiers. Each case
+reports throughput (lines/s and tokens/s), p50/p99 latency and peak memory
+(measured by tracemalloc in a separate run).
+
+Results are compared with a saved baseline: the benchmark exits with status 1
+if the p50 latency of any case/stage regresses by more than the threshold.
+The baseline is created by the first run or by --save-baseline.
+
+Usage::
+
+    python benchmarks/bench_transpile.py [--repeat R] [--lines N]
+        [--baseline FILE] [--save-baseline] [--threshold T]
+        [--min-delta MS] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import re
+import sys
+import textwrap
+import time
+import tracemalloc
+
+from pytuga.transpyler import PytugaTranspyler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, os.pardir, 'tests', 'test_language.py')
+DEFAULT_BASELINE = os.path.join(HERE, 'bench_transpile.json')
+STAGES = ('transpile', 'compile', 'exec')
+
+MIXED_BLOCK = '''\
+para cada x de 1 até 10 a cada 2 faça:
+    repetir 3 vezes:
+        y = x * 2
+    se x > 5 então:
+        y = y + 1
+    ou então se x < 3:
+        y = y - 1
+    senão:
+        prossiga
+enquanto falso faça:
+    pare
+'''
+
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    Return the Pytuguês sources in the translation table of test_language.py.
+
+    Indented examples are dedented, so all sources can be executed.
+    """
+
+    with open(path, encoding='utf8') as fd:
+        text = fd.read()
+    table = re.search(r"data = r'''(.*?)'''", text, re.DOTALL).group(1)
+    cases = [x.split('-' * 80)[0] for x in table.split('=' * 80)]
+    return [textwrap.dedent(src.strip('\n')) + '\n'
+            for src in cases if src.strip()]
+
+
+def nested_repetir(depth):
+    """
+    Source with depth nested "repetir" blocks.
+    """
+
+    lines = ['%srepetir 1 vezes:' % ('    ' * i) for i in range(depth)]
+    lines.append('%sx = 1' % ('    ' * depth))
+    return '\n'.join(lines) + '\n'
+
+
+def para_chain(n):
+    """
+    Source with n "para cada x de 1 até N a cada K" commands.
+    """
+
+    return ''.join(
+        'para cada x%d de 1 até %d a cada %d faça: y = x%d\n'
+        % (i, i % 7 + 1, i % 3 + 1, i) for i in range(n)
+    )
+
+
+def mixed_file(n_lines):
+    """
+    Source with about n_lines lines mixing all Pytuguês commands.
+    """
+
+    n_blocks = max(1, n_lines // MIXED_BLOCK.count('\n'))
+    return MIXED_BLOCK * n_blocks
+
+
+def identifier_file(n_lines):
+    """
+    Source with about n_lines lines that are mostly identifiers and few
+    keywords.
+    """
+
+    expr = ('valor_inicial + contador + deslocamento + nome + [x, y, z] '
+            'e outra_coisa ou mais_uma')
+    block = 'se alfa então:\n    r = %s\nsenão:\n    r = %s\n' % (expr, expr)
+    return block * max(1, n_lines // 4)
+
+
+def cases(n_lines):
+    """
+    Return a list of (name, sources, repeat_factor) tuples.
+    """
+
+    return [
+        ('corpus', load_corpus(), 1.0),
+        ('nested_repetir', [nested_repetir(19)], 1.0),
+        ('para_chain', [para_chain(1000)], 0.2),
+        ('mixed_file', [mixed_file(n_lines)], 0.0),
+        ('identifiers', [identifier_file(n_lines)], 0.0),
+    ]
+
+
+def free_names(code):
+    """
+    Return the set of global names referenced by code and its inner code
+    objects.
+    """
+
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, type(code)):
+            names.update(free_names(const))
+    return names
+
+
+def exec_globals(transpyler, src):
+    """
+    Return the globals dict used to exec src. Names that the corpus uses
+    without defining them are bound to an empty list.
+    """
+
+    namespace = transpyler.namespace
+    code = compile(transpyler.lexer.transpile(src), '<bench>', 'exec')
+    env = {name: [] for name in free_names(code) - set(namespace)}
+    env.update(namespace)
+    return env
+
+
+def stage_functions(transpyler):
+    """
+    Return a dict of {stage: func}. Each function receives the result of the
+    previous stage and the globals dict of the source. The transpile cache is
+    bypassed.
+    """
+
+    return {
+        'transpile': lambda src, env: transpyler.lexer.transpile(src),
+        'compile': lambda src, env: compile(src, '<bench>', 'exec'),
+        'exec': lambda code, env: exec(code, dict(env)),
+    }
+
+
+def run_stages(funcs, sources, envs):
+    """
+    Run all stages over all sources and return the elapsed time of each stage.
+    """
+
+    times = dict.fromkeys(STAGES, 0.0)
+    for src, env in zip(sources, envs):
+        value = src
+        for stage in STAGES:
+            t0 = time.perf_counter()
+            value = funcs[stage](value, env)
+            times[stage] += time.perf_counter() - t0
+    return times
+
+
+def peak_memory(funcs, sources, envs):
+    """
+    Return the peak memory (in bytes) allocated by each stage.
+    """
+
+    peaks = dict.fromkeys(STAGES, 0)
+    for src, env in zip(sources, envs):
+        value = src
+        for stage in STAGES:
+            tracemalloc.start()
+            value = funcs[stage](value, env)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            peaks[stage] = max(peaks[stage], peak)
+    return peaks
+
+
+def percentile(data, q):
+    data = sorted(data)
+    idx = min(len(data) - 1, max(0, round(q / 100 * (len(data) - 1))))
+    return data[idx]
+
+
+def bench_case(transpyler, sources, repeat):
+    funcs = stage_functions(transpyler)
+    lexer = transpyler.lexer
+    n_lines = sum(src.count('\n') for src in sources)
+    n_tokens = sum(len(lexer.tokenize_buffer(src)) for src in sources)
+    envs = [exec_globals(transpyler, src) for src in sources]
+
+    samples = {stage: [] for stage in STAGES}
+    gc.collect()
+    for _ in range(repeat):
+        for stage, dt in run_stages(funcs, sources, envs).items():
+            samples[stage].append(dt)
+    peaks = peak_memory(funcs, sources, envs)
+
+    result = {}
+    for stage in STAGES:
+        p50 = percentile(samples[stage], 50)
+        result[stage] = {
+            'lines_per_s': n_lines / p50 if p50 else 0.0,
+            'tokens_per_s': n_tokens / p50 if p50 else 0.0,
+            'p50_ms': p50 * 1000,
+            'p99_ms': percentile(samples[stage], 99) * 1000,
+            'peak_kb': peaks[stage] / 1024,
+        }
+    return {'lines': n_lines, 'tokens': n_tokens, 'stages': result}
+
+
+def compare(results, baseline, threshold, min_delta):
+    """
+    Return a list of messages for each regression above threshold.
+
+    Differences smaller than min_delta milliseconds are ignored, since they
+    are dominated by noise.
+    """
+
+    messages = []
+    for name, case in results.items():
+        for stage, stats in case['stages'].items():
+            try:
+                old = baseline[name]['stages'][stage]['p50_ms']
+            except KeyError:
+                continue
+            new = stats['p50_ms']
+            if new - old > max(old * threshold, min_delta):
+                messages.append('%s/%s: p50 %.2f ms -> %.2f ms (+%.0f%%)' % (
+                    name, stage, old, new, 100 * (new / old - 1)))
+    return messages
+
+
+def print_table(results):
+    print('%-16s %-10s %12s %12s %10s %10s %10s' % (
+        'case', 'stage', 'lines/s', 'tokens/s', 'p50 ms', 'p99 ms',
+        'peak KiB'))
+    for name, case in results.items():
+        for stage, stats in case['stages'].items():
+            print('%-16s %-10s %12.0f %12.0f %10.2f %10.2f %10.0f' % (
+                name, stage, stats['lines_per_s'], stats['tokens_per_s'],
+                stats['p50_ms'], stats['p99_ms'], stats['peak_kb']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=50,
+                        help='number of runs of the small cases.')
+    parser.add_argument('--lines', type=int, default=100000,
+                        help='size of the large synthetic file.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='maximum allowed p50 slowdown (0.25 = 25%%).')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this (in ms).')
+    parser.add_argument('--json', action='store_true',
+                        help='print results as JSON.')
+    args = parser.parse_args(argv)
+
+    transpyler = PytugaTranspyler()
+    transpyler.init()
+
+    results = {}
+    for name, sources, factor in cases(args.lines):
+        repeat = max(1, int(args.repeat * factor))
+        results[name] = bench_case(transpyler, sources, repeat)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    if args.save_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as fd:
+            json.dump(results, fd, indent=2)
+        print('baseline saved to %s' % args.baseline, file=sys.stderr)
+        return
+
+    with open(args.baseline) as fd:
+        baseline = json.load(fd)
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    if regressions:
+        print('\nREGRESSIONS (threshold: %.0f%%)' % (100 * args.threshold),
+              file=sys.stderr)
+        for msg in regressions:
+            print('    ' + msg, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -87,6 +87,7 @@ setup(
     # Packages and dependencies
     package_dir={'': 'src'},
     packages=find_packages('src'),
+    py_modules=['pytuga_client'],
     install_requires=[
         'qturtle~=0.5.0',
     ],
@@ -101,6 +102,7 @@ setup(
     entry_points={
         'console_scripts': [
             'pytuga = pytuga.__main__:main',
+            'pytuga-client = pytuga_client:main',
         ],
     },
 
@@ -14,3 +14,11 @@ is_incomplete_source = _ns.pop('is_incomplete_source')
 
 assert not _ns, _ns
 del _ns
+
+
+def __getattr__(name):
+    # The asyncio API (aexec and acompile) is imported on demand
+    if name in ('aexec', 'acompile'):
+        from . import aio
+        return getattr(aio, name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
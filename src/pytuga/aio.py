@@ -0,0 +1,387 @@
+import asyncio
+import atexit
+import errno
+import marshal
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+
+from pytuga_client import HEADER, encode_request
+
+from . import batch
+from .sandbox import RunResult
+
+__all__ = ['acompile', 'aexec', 'spawn', 'Program', 'start_server',
+           'stop_server']
+
+# A (process, address, tempdir) tuple for the server of start_server()
+_server = None
+
+# Task of the event loop that is starting the server
+_starting = None
+
+
+async def acompile(source, filename='<string>', mode='exec'):
+    """
+    Like :func:`pytuga.compile`, but transpile and compile source in a worker
+    process, without blocking the event loop.
+
+    Raises a SyntaxError if source is invalid.
+    """
+
+    from .transpyler import PytugaTranspyler
+
+    loop = asyncio.get_running_loop()
+    pool = batch.get_pool(os.cpu_count() or 1)
+    result = await loop.run_in_executor(
+        pool, batch.compile_item, (source, filename, mode)
+    )
+    if isinstance(result, SyntaxError):
+        raise result
+    return PytugaTranspyler().resolve_curses(marshal.loads(result), mode)
+
+
+async def aexec(source, stdin=None, timeout=None, address=None):
+    """
+    Run a Pytuguês program in a separate process and return a
+    :class:`pytuga.sandbox.RunResult` with its captured output.
+
+    The program is killed if it does not finish in timeout seconds or if the
+    coroutine is cancelled. Use :func:`spawn` to read the output while the
+    program runs.
+
+    Args:
+        source (str):
+            Pytuguês source code.
+        stdin (str):
+            Data available to the program in the standard input.
+        timeout (float):
+            Maximum wall clock time (in seconds).
+        address (str):
+            Address of a server started by ``pytuga --server``. By default,
+            the server is started by :func:`start_server`.
+    """
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    program = await spawn(source, stdin, address=address)
+    stdout, stderr = [], []
+    try:
+        await asyncio.wait_for(asyncio.gather(
+            collect(program.stdout, stdout),
+            collect(program.stderr, stderr),
+            program.wait(),
+        ), timeout)
+    except asyncio.TimeoutError:
+        program.kill()
+        status, exit_status = 'timeout', -signal.SIGKILL
+    else:
+        exit_status = program.returncode
+        status = 'ok' if exit_status == 0 else 'error'
+    finally:
+        if program.returncode is None:
+            program.kill()
+            await program.wait()
+
+        # The pipes reach their end once the program is dead. Reading the rest
+        # of the output closes their transports.
+        await asyncio.gather(collect(program.stdout, stdout),
+                             collect(program.stderr, stderr))
+
+    elapsed = loop.time() - start
+    return RunResult(status, exit_status, decode(stdout), decode(stderr),
+                     elapsed)
+
+
+async def spawn(source, stdin=None, argv=None, cwd=None, address=None):
+    """
+    Start a Pytuguês program and return a :class:`Program` instance.
+
+    Programs are forked from a server process that has the runtime already
+    initialized, so they start in a few milliseconds.
+
+    Args:
+        source (str):
+            Pytuguês source code.
+        stdin (str):
+            Data available to the program in the standard input.
+        argv (list):
+            Value of sys.argv. The default is ['<programa>'].
+        cwd (str):
+            Working directory. Defaults to the current directory.
+        address (str):
+            Address of the server (see :func:`aexec`).
+    """
+
+    loop = asyncio.get_running_loop()
+    address = address or await start_server()
+    sock = await connect(address)
+    pipes = [os.pipe() for _ in range(3)]
+    try:
+        request = {
+            'argv': list(argv or ['<programa>']),
+            'cwd': cwd or os.getcwd(),
+            'source': source,
+            'report_pid': True,
+        }
+        await send_request(loop, sock, request,
+                           [pipes[0][0], pipes[1][1], pipes[2][1]])
+        data = await recv_exactly(loop, sock, HEADER.size)
+        if not data:
+            raise ConnectionError('pytuga server closed the connection')
+    except BaseException:
+        sock.close()
+        for fd in (pipes[0][1], pipes[1][0], pipes[2][0]):
+            os.close(fd)
+        raise
+    finally:
+        # Only the child process keeps these ends open
+        for fd in (pipes[0][0], pipes[1][1], pipes[2][1]):
+            os.close(fd)
+
+    stdin_fd, stdout_fd, stderr_fd = pipes[0][1], pipes[1][0], pipes[2][0]
+    program = Program(sock, HEADER.unpack(data)[0])
+    program.stdout = await read_pipe(loop, stdout_fd)
+    program.stderr = await read_pipe(loop, stderr_fd)
+    if stdin:
+        transport, _ = await loop.connect_write_pipe(
+            asyncio.Protocol, os.fdopen(stdin_fd, 'wb')
+        )
+        transport.write(stdin.encode('utf8'))
+        transport.close()
+    else:
+        os.close(stdin_fd)
+    return program
+
+
+class Program:
+    """
+    A Pytuguês program started by :func:`spawn`.
+
+    Attributes:
+        pid (int):
+            Process id.
+        stdout, stderr (asyncio.StreamReader):
+            Output streams of the program. Use ``async for line in
+            program.stdout`` to read lines as they are written.
+        returncode (int):
+            Exit status of the program, or None if it is still running. It is
+            negative if the program was killed by a signal.
+    """
+
+    def __init__(self, sock, pid):
+        self.pid = pid
+        self.returncode = None
+        self.stdout = self.stderr = None
+        self._sock = sock
+        self._killed = False
+
+    def __repr__(self):
+        return '<Program: pid=%s, returncode=%s>' % (
+            self.pid, self.returncode)
+
+    async def wait(self):
+        """
+        Wait for the program to finish and return its exit status.
+        """
+
+        if self.returncode is None:
+            loop = asyncio.get_running_loop()
+            data = await recv_exactly(loop, self._sock, HEADER.size)
+            self._sock.close()
+            if data:
+                self.returncode = HEADER.unpack(data)[0]
+            else:
+                self.returncode = -signal.SIGKILL if self._killed else -1
+        return self.returncode
+
+    def kill(self):
+        """
+        Kill the program.
+        """
+
+        if self.returncode is None and not self._killed:
+            self._killed = True
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+async def start_server(address=None):
+    """
+    Start a server that runs the programs of :func:`spawn` and
+    :func:`aexec`, if it is not running yet. Return its address.
+
+    The server is a ``pytuga --server`` process that is stopped when the
+    interpreter exits or when :func:`stop_server` is called. Concurrent calls
+    wait until the same server is listening.
+    """
+
+    global _starting
+    if _server is not None and _server[0].poll() is None:
+        return _server[1]
+
+    loop = asyncio.get_running_loop()
+    if _starting is None or _starting.done() or \
+            _starting.get_loop() is not loop:
+        _starting = loop.create_task(launch_server(address))
+    return await asyncio.shield(_starting)
+
+
+async def launch_server(address):
+    """
+    Start a new server process and return its address once it is listening.
+    """
+
+    global _server
+    stop_server()
+
+    tempdir = None
+    if address is None:
+        tempdir = tempfile.mkdtemp(prefix='pytuga-')
+        address = os.path.join(tempdir, 'server.sock')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'pytuga', '--server', '--socket', address],
+        stdin=subprocess.DEVNULL,
+    )
+    _server = (process, address, tempdir)
+    atexit.unregister(stop_server)
+    atexit.register(stop_server)
+
+    try:
+        await wait_listening(process, address)
+    except BaseException:
+        stop_server()
+        raise
+    return address
+
+
+async def wait_listening(process, address):
+    """
+    Wait until the server process accepts connections at address.
+    """
+
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError('could not start pytuga server')
+        try:
+            sock = await connect(address)
+        except (FileNotFoundError, ConnectionRefusedError):
+            await asyncio.sleep(0.02)
+        else:
+            sock.close()
+            return
+
+
+def stop_server():
+    """
+    Stop the server started by :func:`start_server`.
+    """
+
+    global _server
+    if _server is not None:
+        process, _, tempdir = _server
+        _server = None
+        if process.poll() is None:
+            process.terminate()
+            process.wait()
+        if tempdir is not None:
+            shutil.rmtree(tempdir, ignore_errors=True)
+
+
+#
+# Utility functions
+#
+async def connect(address):
+    """
+    Return a non-blocking socket connected to the server at address.
+
+    Wait while the backlog of the server is full.
+    """
+
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        error = sock.connect_ex(address)
+        if not error:
+            return sock
+        sock.close()
+        if error != errno.EAGAIN:
+            raise OSError(error, os.strerror(error), address)
+        await asyncio.sleep(0.01)
+
+
+async def send_request(loop, sock, request, fds):
+    """
+    Like :func:`pytuga_client.send_request`, but for non-blocking sockets.
+    """
+
+    data = encode_request(request)
+    while True:
+        try:
+            sent = socket.send_fds(sock, [data], fds)
+        except BlockingIOError:
+            await wait_writable(loop, sock)
+        else:
+            break
+    await loop.sock_sendall(sock, data[sent:])
+
+
+async def wait_writable(loop, sock):
+    """
+    Wait until a non-blocking socket can be written.
+    """
+
+    future = loop.create_future()
+    loop.add_writer(sock, lambda: future.done() or future.set_result(None))
+    try:
+        await future
+    finally:
+        loop.remove_writer(sock)
+
+
+async def recv_exactly(loop, sock, size):
+    """
+    Read size bytes from a non-blocking socket. Return an empty string if the
+    connection is closed before that.
+    """
+
+    data = b''
+    while len(data) < size:
+        chunk = await loop.sock_recv(sock, size - len(data))
+        if not chunk:
+            return b''
+        data += chunk
+    return data
+
+
+async def read_pipe(loop, fd):
+    """
+    Return an asyncio.StreamReader for the read end of a pipe.
+    """
+
+    reader = asyncio.StreamReader()
+    protocol = asyncio.StreamReaderProtocol(reader)
+    await loop.connect_read_pipe(lambda: protocol, os.fdopen(fd, 'rb'))
+    return reader
+
+
+async def collect(reader, chunks):
+    """
+    Append all data of reader to the list of chunks.
+    """
+
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            return
+        chunks.append(chunk)
+
+
+def decode(chunks):
+    return b''.join(chunks).decode('utf8', 'replace')
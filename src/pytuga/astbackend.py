@@ -0,0 +1,231 @@
+import ast
+
+from .lexer import PytugaLexer, step_error
+
+__all__ = ['AstCompiler', 'LoopLowering', 'OptimizedLoopLowering',
+           'MarkerLexer']
+
+REPETIR_MARKER = '__pytuga_repetir__'
+DE_ATE_MARKER = '__pytuga_de_ate__'
+
+
+class MarkerLexer(PytugaLexer):
+    """
+    Lexer for the AST backend.
+
+    Keywords are translated as in :class:`pytuga.lexer.PytugaLexer`, but the
+    "repetir" and "de ... até" commands are only marked with calls to marker
+    functions::
+
+        repetir <N> vezes:            ->  for ___ in __pytuga_repetir__(<N>):
+        de <X> até <Y> [a cada <Z>]   ->  in __pytuga_de_ate__(<X>, <Y>[, <Z>])
+
+    Markers are replaced in the syntax tree by :class:`LoopLowering`.
+    """
+
+    repetir_strings = ('for', '___', 'in', REPETIR_MARKER, '(')
+    de_strings = ('in', DE_ATE_MARKER, '(')
+    a_cada_strings = (',',)
+    ate_end_strings = (')',)
+
+    def step_strings(self, buf, de, ate, a, cada):
+        # Steps are checked by LoopLowering.lower_de_ate()
+        return self.a_cada_strings
+
+
+class LoopLowering(ast.NodeTransformer):
+    """
+    Replace marker calls created by :class:`MarkerLexer` with the Python code
+    for each command.
+
+    Subclasses can override :meth:`lower_repetir` and :meth:`lower_de_ate`
+    to change how loops are compiled.
+    """
+
+    def visit_For(self, node):
+        self.generic_visit(node)
+        if is_marker(node.iter, REPETIR_MARKER):
+            return self.lower_repetir(node, node.iter.args)
+        return node
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if is_marker(node, DE_ATE_MARKER):
+            return self.lower_de_ate(node, node.args)
+        return node
+
+    def lower_repetir(self, loop, args):
+        """
+        Lower the loop created for "repetir <N> vezes" to
+        "for ___ in range(N)".
+        """
+
+        loop.iter = range_call(loop.iter, args)
+        return loop
+
+    def lower_de_ate(self, node, args):
+        """
+        Lower the marker of "de <X> até <Y> [a cada <Z>]" to
+        range(X, Y + 1[, Z]).
+
+        As in :meth:`pytuga.lexer.PytugaLexer.process_de_ate_command`, a
+        negative integer literal Z counts down to Y inclusive, i.e.,
+        range(X, Y - 1, Z), and a zero step or a literal step that moves away
+        from literal bounds is a SyntaxError.
+        """
+
+        if len(args) not in (2, 3):
+            raise SyntaxError(
+                'comando para cada malformado na linha %s.\n'
+                '    Espera comando do tipo\n\n'
+                '        para cada <x> de <a> até <b> [a cada <c>]:\n'
+                '            <BLOCO>' % node.lineno
+            )
+        start, stop, *step = args
+        step_value = constant_int(step[0]) if step else None
+        if step_value is not None:
+            msg = step_error(constant_int(start), constant_int(stop),
+                             step_value)
+            if msg is not None:
+                raise SyntaxError(msg, (None, step[0].lineno,
+                                        step[0].col_offset + 1, None))
+        op = ast.Sub() if step_value is not None and step_value < 0 else \
+            ast.Add()
+        stop = ast.BinOp(stop, op, ast.Constant(1))
+        return range_call(node, [start, stop, *step])
+
+
+class OptimizedLoopLowering(LoopLowering):
+    """
+    Loop lowering that compiles "repetir <N> vezes" to::
+
+        for () in __import__('itertools').repeat((), N):
+
+    The loop does not bind a counter in the user's namespace (at module
+    level, "for ___ in range(N)" costs a dict store per iteration) and does
+    not create an int object per iteration.
+
+    The inclusive bound of "de <X> até <Y> [a cada <Z>]" is folded when Y is
+    a literal. This does not change the bytecode, since CPython folds the
+    same constants when compiling, but it keeps the trees returned by
+    :meth:`AstCompiler.parse` free of the "Y + 1" expressions.
+    """
+
+    def lower_repetir(self, loop, args):
+        if len(args) != 1:
+            return super().lower_repetir(loop, args)
+
+        itertools = ast.Call(ast.Name('__import__', ast.Load()),
+                             [ast.Constant('itertools')], [])
+        repeat = ast.Attribute(itertools, 'repeat', ast.Load())
+        iter = ast.Call(repeat, [ast.Tuple([], ast.Load()), args[0]], [])
+        loop.target = ast.copy_location(ast.Tuple([], ast.Store()),
+                                        loop.target)
+        loop.iter = ast.copy_location(iter, loop.iter)
+        return ast.fix_missing_locations(loop)
+
+    def lower_de_ate(self, node, args):
+        """
+        Lower "de <X> até <Y> [a cada <Z>]" folding the "Y +/- 1" bound when
+        Y is an integer literal.
+        """
+
+        node = super().lower_de_ate(node, args)
+        fold_bound(node.args)
+        return node
+
+
+class AstCompiler:
+    """
+    Compile Pytuguês to code objects by rewriting the Python syntax tree.
+
+    Source is converted by a :class:`MarkerLexer`, parsed by Python's own
+    parser and the markers are lowered by a :class:`LoopLowering` transformer.
+    The resulting tree is compiled directly, so no Python source is generated
+    for the structural rewrites. Sources without markers skip the syntax tree
+    and are compiled as strings.
+
+    Args:
+        transpyler:
+            The transpyler that provides the translation tables.
+        lowering (LoopLowering):
+            The transformer applied to the syntax tree.
+    """
+
+    def __init__(self, transpyler, lowering=None):
+        self.transpyler = transpyler
+        self.lexer = MarkerLexer(transpyler)
+        self.lowering = lowering or LoopLowering()
+
+    def parse(self, src, filename='<string>', mode='exec'):
+        """
+        Return the lowered syntax tree for src.
+        """
+
+        return self.lower(self.lexer.transpile(src), filename, mode)
+
+    def lower(self, python, filename='<string>', mode='exec'):
+        """
+        Parse the output of the marker lexer and return the lowered tree.
+        """
+
+        return self.lowering.visit(ast.parse(python, filename, mode))
+
+    def compile(self, src, filename='<string>', mode='exec', flags=0,
+                dont_inherit=False):
+        """
+        Compile src to a code object. Accept the same arguments as the
+        builtin compile() function.
+        """
+
+        python = self.lexer.transpile(src)
+        if REPETIR_MARKER in python or DE_ATE_MARKER in python:
+            python = self.lower(python, filename, mode)
+        return compile(python, filename, mode, flags, dont_inherit)
+
+
+def is_marker(node, name):
+    """
+    Return True if node is a call to the given marker function.
+    """
+
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+        and node.func.id == name and not node.keywords
+
+
+def constant_int(node):
+    """
+    Return the value of an integer literal (possibly with a sign) or None if
+    node is not an integer literal.
+    """
+
+    sign = 1
+    if isinstance(node, ast.UnaryOp) and \
+            isinstance(node.op, (ast.USub, ast.UAdd)):
+        sign = -1 if isinstance(node.op, ast.USub) else 1
+        node = node.operand
+    if isinstance(node, ast.Constant) and type(node.value) is int:
+        return sign * node.value
+    return None
+
+
+def fold_bound(args):
+    """
+    Replace the "Y +/- 1" stop argument of a range() call with a constant if
+    Y is an integer literal.
+    """
+
+    bound = args[1]
+    value = constant_int(bound.left)
+    if value is not None:
+        value += 1 if isinstance(bound.op, ast.Add) else -1
+        args[1] = ast.copy_location(ast.Constant(value), bound.left)
+
+
+def range_call(node, args):
+    """
+    Return a range(*args) call at the location of node.
+    """
+
+    call = ast.Call(ast.Name('range', ast.Load()), list(args), [])
+    return ast.fix_missing_locations(ast.copy_location(call, node))
@@ -0,0 +1,143 @@
+import atexit
+import marshal
+import os
+
+__all__ = ['transpile_many', 'compile_many', 'map_items', 'shutdown_workers']
+
+# Process pools are kept alive between calls, so the import cost of the
+# transpyler is paid only once per worker.
+_pools = {}
+
+
+def transpile_many(sources, workers=None, chunksize=None):
+    """
+    Transpile a sequence of sources in parallel.
+
+    Args:
+        sources:
+            A sequence of strings of Pytuguês source code.
+        workers (int):
+            Number of worker processes. Defaults to the number of CPUs. Use 0
+            to transpile in the current process.
+        chunksize (int):
+            Number of sources sent to each worker at once. Defaults to a value
+            that splits the input in about 4 chunks per worker.
+
+    Returns:
+        A list with the transpiled source for each input, in the same order.
+        Sources with errors are represented by the corresponding SyntaxError
+        instance.
+    """
+
+    return map_items(transpile_item, list(sources), workers, chunksize)
+
+
+def compile_many(sources, filename='<string>', mode='exec', workers=None,
+                 chunksize=None):
+    """
+    Compile a sequence of sources in parallel.
+
+    Accept the same arguments as :func:`transpile_many`. The filename can be
+    a single string or a sequence with one filename per source.
+
+    Returns:
+        A list of code objects or SyntaxError instances, in the same order as
+        the input. Lazy curses required by the code objects are applied in
+        the current process, as in :meth:`PytugaTranspyler.compile`.
+    """
+
+    from .transpyler import PytugaTranspyler
+
+    sources = list(sources)
+    if isinstance(filename, str):
+        filename = [filename] * len(sources)
+    filename = list(filename)
+    if len(filename) != len(sources):
+        raise ValueError('got %s filenames for %s sources' %
+                         (len(filename), len(sources)))
+
+    args = [(src, name, mode) for src, name in zip(sources, filename)]
+    results = map_items(compile_item, args, workers, chunksize)
+    resolve_curses = PytugaTranspyler().resolve_curses
+    return [resolve_curses(marshal.loads(x), mode) if isinstance(x, bytes)
+            else x for x in results]
+
+
+def shutdown_workers():
+    """
+    Shutdown all worker processes created by the batch functions.
+    """
+
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown()
+
+
+atexit.register(shutdown_workers)
+
+
+def map_items(func, items, workers=None, chunksize=None):
+    """
+    Return the list of func(item) for each item, computed by the warm
+    worker processes.
+
+    func must be a picklable module level function. Arguments are the same as
+    in :func:`transpile_many`.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(items) <= 1:
+        return [func(x) for x in items]
+
+    if chunksize is None:
+        chunksize = max(1, len(items) // (4 * workers))
+    return list(get_pool(workers).map(func, items, chunksize=chunksize))
+
+
+def get_pool(workers):
+    """
+    Return a warm process pool with the given number of workers.
+    """
+
+    try:
+        return _pools[workers]
+    except KeyError:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(workers, initializer=init_worker)
+        _pools[workers] = pool
+        return pool
+
+
+#
+# Worker functions
+#
+def init_worker():
+    """
+    Initialize transpyler and lexer tables in the worker process.
+    """
+
+    from .transpyler import PytugaTranspyler
+
+    PytugaTranspyler().transpile('prossiga\n')
+
+
+def transpile_item(src):
+    from .transpyler import PytugaTranspyler
+
+    try:
+        return PytugaTranspyler().transpile(src)
+    except SyntaxError as ex:
+        return ex
+
+
+def compile_item(args):
+    from .transpyler import PytugaTranspyler
+
+    src, filename, mode = args
+    try:
+        code = PytugaTranspyler().compile(src, filename, mode)
+    except SyntaxError as ex:
+        return ex
+    return marshal.dumps(code)
@@ -0,0 +1,258 @@
+import collections
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+import types
+from array import array
+
+from .sourcemap import SourceMap
+
+__all__ = ['TranspileCache', 'CacheInfo']
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'disk_hits', 'maxsize', 'currsize']
+)
+
+
+class TranspileCache:
+    """
+    Content addressed cache for transpiled sources and compiled code objects.
+
+    Entries are keyed by a hash of the source code, the pytuga version and the
+    translation tables of the transpyler, so any change in the language
+    invalidates all previous entries. Code objects are also keyed by the
+    compiler options of the transpyler (see :func:`compiler_options`), which
+    are read at each lookup. The most recently used entries are kept
+    in memory and, if a directory is given, they are also saved on disk
+    (similarly to Python's __pycache__ folders).
+
+    Args:
+        transpyler:
+            The transpyler instance whose tables are used to compute keys.
+        maxsize (int):
+            Maximum number of entries kept in memory.
+        directory (str):
+            Optional directory used to store the on-disk tier.
+    """
+
+    def __init__(self, transpyler, maxsize=256, directory=None):
+        self.transpyler = transpyler
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._data = collections.OrderedDict()
+        self._digest = tables_digest(transpyler, options=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def digest(self):
+        """
+        The digest of the pytuga version and translation tables, computed
+        once by :func:`tables_digest` (without compiler options).
+        """
+
+        return self._digest
+
+    def info(self):
+        """
+        Return a named tuple with the cache statistics.
+        """
+
+        return CacheInfo(self.hits, self.misses, self.disk_hits,
+                         self.maxsize, len(self._data))
+
+    def clear(self):
+        """
+        Clear the in-memory tier and reset statistics.
+        """
+
+        self._data.clear()
+        self.hits = self.misses = self.disk_hits = 0
+
+    def key(self, src, *args):
+        """
+        Return the hash key for the given source and extra arguments.
+        """
+
+        data = repr((self._digest, src) + args).encode('utf8')
+        return hashlib.sha256(data).hexdigest()
+
+    def transpile(self, src, transpile):
+        """
+        Return the transpiled source, calling transpile(src) on cache misses.
+        """
+
+        key = self.key(src)
+        try:
+            result = self._get(key)
+        except KeyError:
+            result = self._load(key + '.py', read_source)
+            if result is None:
+                result = transpile(src)
+                self._save(key + '.py', result, write_source)
+            self._set(key, result)
+        return result
+
+    def compile(self, src, filename, mode, flags, dont_inherit, compile):
+        """
+        Return the code object for src, calling compile(src, filename, ...)
+        on cache misses.
+        """
+
+        key = self.key(src, filename, mode, flags, dont_inherit,
+                       compiler_options(self.transpyler))
+        try:
+            code = self._get(key)
+        except KeyError:
+            code = self._load(key + '.pyc', read_code)
+            if code is None:
+                code = compile(src, filename, mode, flags, dont_inherit)
+
+                # Flags such as ast.PyCF_ONLY_AST return syntax trees, which
+                # are mutable and cannot be marshaled
+                if not isinstance(code, types.CodeType):
+                    return code
+                self._save(key + '.pyc', code, write_code)
+            self._set(key, code)
+        return code
+
+    def source_map(self, src, transpile):
+        """
+        Return a tuple of (python, source_map) for src, calling
+        transpile(src) on cache misses.
+
+        The transpiled source is also stored as the result of
+        :meth:`transpile`.
+        """
+
+        key = self.key(src, 'source_map')
+        try:
+            result = self._get(key)
+        except KeyError:
+            result = self._load(key + '.map', read_source_map)
+            if result is None:
+                python, source_map = transpile(src)
+                result = (python, source_map.tables)
+                self._save(key + '.map', result, write_source_map)
+            self._set(key, result)
+
+        python, tables = result
+        self.transpile(src, lambda src: python)
+        return python, SourceMap(src, python, tables)
+
+    def _get(self, key):
+        value = self._data[key]
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _set(self, key, value):
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _load(self, name, reader):
+        if self.directory is not None:
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as fd:
+                    value = reader(fd)
+            except (OSError, ValueError, EOFError, TypeError):
+                pass
+            else:
+                if value is not None:
+                    self.disk_hits += 1
+                    return value
+        self.misses += 1
+        return None
+
+    def _save(self, name, value, writer):
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_file(os.path.join(self.directory, name), value, writer)
+        except (OSError, ValueError):
+            pass
+
+
+def tables_digest(transpyler, options=True):
+    """
+    Return a string that identifies the pytuga version and the translation
+    tables used by the given transpyler. The compiler options are included
+    unless options is False.
+    """
+
+    from . import __version__
+
+    tables = (transpyler.translations, transpyler.error_dict)
+    data = repr([sorted(map(repr, table.items())) for table in tables])
+    if options:
+        data += repr(list(compiler_options(transpyler)))
+    data = hashlib.sha256(data.encode('utf8')).hexdigest()
+    return '%s-%s' % (__version__, data)
+
+
+def compiler_options(transpyler):
+    """
+    Return a tuple with the options of transpyler that change the code
+    objects it compiles.
+    """
+
+    return (getattr(transpyler, 'backend', None),
+            getattr(transpyler, 'optimize_loops', False))
+
+
+#
+# Disk serialization
+#
+def write_file(path, value, writer):
+    """
+    Atomically write value to path with writer(fd, value). The temporary file
+    is removed if writing fails.
+    """
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with open(fd, 'wb') as file:
+            writer(file, value)
+        os.replace(tmp_path, path)
+    except BaseException:  # noqa: B902
+        os.unlink(tmp_path)
+        raise
+
+
+def read_source(fd):
+    return fd.read().decode('utf8')
+
+
+def write_source(fd, src):
+    fd.write(src.encode('utf8'))
+
+
+def read_code(fd):
+    if fd.read(len(importlib.util.MAGIC_NUMBER)) != importlib.util.MAGIC_NUMBER:
+        return None
+    return marshal.load(fd)
+
+
+def write_code(fd, code):
+    fd.write(importlib.util.MAGIC_NUMBER)
+    marshal.dump(code, fd)
+
+
+def read_source_map(fd):
+    python, tables = marshal.load(fd)
+    return python, [None if data is None else array('i', data)
+                    for data in tables]
+
+
+def write_source_map(fd, value):
+    python, tables = value
+    tables = [None if table is None else table.tobytes() for table in tables]
+    marshal.dump((python, tables), fd)
@@ -0,0 +1,241 @@
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+from . import batch
+from .cache import tables_digest
+from .importer import SOURCE_SUFFIX
+
+__all__ = ['check_tree', 'CheckReport', 'Manifest']
+
+MANIFEST_NAME = '.pytuga-check.json'
+
+
+class CheckReport:
+    """
+    Result of :func:`check_tree`.
+
+    Attributes:
+        errors (list):
+            A list of error dictionaries with the "file", "line", "column" and
+            "message" keys, sorted by file name. Line and column are None if
+            the error has no position.
+        files (int):
+            Number of files in the tree.
+        checked (int):
+            Number of files that were transpiled and compiled. The others were
+            unchanged since the last check and their results were taken from
+            the manifest.
+    """
+
+    def __init__(self, errors, files, checked):
+        self.errors = errors
+        self.files = files
+        self.checked = checked
+
+    def __repr__(self):
+        return '<CheckReport: %s files, %s checked, %s errors>' % (
+            self.files, self.checked, len(self.errors))
+
+    @property
+    def ok(self):
+        """
+        True if no file has errors.
+        """
+
+        return not self.errors
+
+    def as_dict(self):
+        """
+        Return report as a JSON-serializable dictionary.
+        """
+
+        return {
+            'files': self.files,
+            'checked': self.checked,
+            'errors': self.errors,
+        }
+
+    def to_json(self):
+        """
+        Return report as a JSON string.
+        """
+
+        return json.dumps(self.as_dict(), ensure_ascii=False)
+
+    def to_text(self):
+        """
+        Return errors as "file:line:column: message" lines.
+        """
+
+        lines = []
+        for error in self.errors:
+            location = [error['file']]
+            if error['line'] is not None:
+                location.append(str(error['line']))
+                if error['column'] is not None:
+                    location.append(str(error['column']))
+            message = error['message'].splitlines()[0]
+            lines.append('%s: %s' % (':'.join(location), message))
+        return '\n'.join(lines)
+
+
+class Manifest:
+    """
+    Persisted results of previous checks.
+
+    For each file, the manifest stores its modification time, size, a hash
+    of its contents and the list of errors found in it. Files whose mtime and
+    size did not change are not read again and files whose hash did not
+    change are not checked again. The whole manifest is discarded if the
+    pytuga version, the translation tables or the Python version change.
+    """
+
+    def __init__(self, path, digest):
+        self.path = path
+        self.digest = digest
+        self.files = {}
+
+    @classmethod
+    def load(cls, path, digest):
+        manifest = cls(path, digest)
+        try:
+            with open(path, encoding='utf8') as fd:
+                data = json.load(fd)
+        except (OSError, ValueError):
+            return manifest
+        if isinstance(data, dict) and data.get('digest') == digest:
+            manifest.files = data.get('files', {})
+        return manifest
+
+    def save(self):
+        """
+        Atomically write manifest to its path.
+        """
+
+        data = {'digest': self.digest, 'files': self.files}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with open(fd, 'w', encoding='utf8') as file:
+                json.dump(data, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+
+def check_tree(directory, workers=None, manifest=None):
+    """
+    Transpile and compile all Pytuguês files in directory and its
+    subdirectories.
+
+    Files are checked in parallel by the worker processes of
+    :mod:`pytuga.batch` and only files that changed since the last check are
+    processed again.
+
+    Args:
+        directory (str):
+            Root of the tree.
+        workers (int):
+            Number of worker processes. Defaults to the number of CPUs.
+        manifest (str):
+            Path of the manifest file. Defaults to a file named
+            ".pytuga-check.json" inside directory.
+
+    Returns:
+        A :class:`CheckReport`.
+    """
+
+    from .transpyler import PytugaTranspyler
+
+    if manifest is None:
+        manifest = os.path.join(directory, MANIFEST_NAME)
+    digest = '%s-py%s.%s' % (tables_digest(PytugaTranspyler()),
+                             *sys.version_info[:2])
+    state = Manifest.load(manifest, digest)
+
+    files = {}
+    pending = []
+    for path in find_sources(directory):
+        name = os.path.relpath(path, directory)
+        files[name], data = scan_file(path, state.files.get(name))
+        if data is not None:
+            pending.append((name, data))
+
+    results = batch.map_items(check_item, pending, workers)
+    for (name, _), errors in zip(pending, results):
+        files[name]['errors'] = errors
+
+    if files != state.files:
+        state.files = files
+        state.save()
+
+    errors = []
+    for name in sorted(files):
+        errors.extend(dict(file=name, **error)
+                      for error in files[name]['errors'])
+    return CheckReport(errors, len(files), len(pending))
+
+
+def scan_file(path, entry):
+    """
+    Return the manifest entry for the file at path, given its previous entry
+    (or None).
+
+    Return a tuple of (entry, data). Data holds the contents of the file if
+    it must be checked again, or None if the errors in entry are still valid.
+    """
+
+    stat = os.stat(path)
+    if entry and entry['mtime'] == stat.st_mtime_ns and \
+            entry['size'] == stat.st_size:
+        return entry, None
+
+    with open(path, 'rb') as fd:
+        data = fd.read()
+    sha = hashlib.sha256(data).hexdigest()
+    if entry and entry['sha256'] == sha:
+        return dict(entry, mtime=stat.st_mtime_ns, size=stat.st_size), None
+    entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': sha,
+             'errors': None}
+    return entry, data
+
+
+def find_sources(directory):
+    """
+    Iterate over the paths of all Pytuguês files in directory.
+
+    Hidden directories (e.g., .git) are skipped.
+    """
+
+    for root, dirs, filenames in os.walk(directory):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        for name in filenames:
+            if name.endswith(SOURCE_SUFFIX):
+                yield os.path.join(root, name)
+
+
+#
+# Worker functions
+#
+def check_item(args):
+    """
+    Transpile and compile a file and return the list of errors found.
+    """
+
+    from .transpyler import PytugaTranspyler
+
+    name, data = args
+    try:
+        source = importlib.util.decode_source(data)
+        PytugaTranspyler().compile(source, name, 'exec', dont_inherit=True)
+    except SyntaxError as ex:
+        return [{'line': ex.lineno, 'column': ex.offset,
+                 'message': ex.msg}]
+    except (UnicodeDecodeError, ValueError) as ex:
+        return [{'line': None, 'column': None, 'message': str(ex)}]
+    return []
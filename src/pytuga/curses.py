@@ -1,85 +1,127 @@
-from transpyler.utils import normalize_accented_keywords, synonyms
+import ctypes
+import functools
+import inspect
+import types
 
+from transpyler.curses import apply_attr_curse, curse_bool_repr, \
+    curse_none_repr
+from transpyler.utils import synonyms
+from transpyler.utils.namespaces import collect_synonyms
+from unidecode import unidecode
 
-#
-# These classes are mixed with regular builtins using the same technics as in
-# the forbiddenfruit package
-#
-class Lista(list):
-    """
-    Uma lista representa uma sequência de objetos.
-
-    Pode ser incializada com a sintaxe:
 
-    >>> L = [1, 2, 3, 4]
+def unaccented_keywords(func):
     """
+    Decorator that accepts unaccented versions of the accented argument names
+    of func (e.g., indice=0 for a parameter named índice).
 
-    @synonyms('acrescente')
-    def acrescentar(self, elemento):
-        """Acrescenta um elemento no final da lista."""
+    Positional calls are forwarded without any processing.
+    """
 
-        self.append(elemento)
+    names = {unidecode(name): name
+             for name in inspect.signature(func).parameters}
 
-    @synonyms('limpe')
-    def limpar(self):
-        """Remove todos os elementos, ficando vazio."""
+    @functools.wraps(func)
+    def decorated(*args, **kwargs):
+        if kwargs:
+            kwargs = {names.get(k, k): v for k, v in kwargs.items()}
+        return func(*args, **kwargs)
 
-        self.clear()
+    return decorated
 
-    def cópia(self):
-        """Retorna uma cópia da lista."""
 
-        return self.copy()
+class _PyMethodDef(ctypes.Structure):
+    _fields_ = [('ml_name', ctypes.c_char_p), ('ml_meth', ctypes.c_void_p),
+                ('ml_flags', ctypes.c_int), ('ml_doc', ctypes.c_char_p)]
 
-    @synonyms('conte')
-    def contar(self, valor):
-        """Retorna o número de ocorrências do valor dado."""
 
-        return self.count(valor)
+class _PyMethodDescrObject(ctypes.Structure):
+    _fields_ = [('ob_refcnt', ctypes.c_ssize_t), ('ob_type', ctypes.c_void_p),
+                ('d_type', ctypes.c_void_p), ('d_name', ctypes.c_void_p),
+                ('d_qualname', ctypes.c_void_p),
+                ('d_method', ctypes.POINTER(_PyMethodDef))]
 
-    @synonyms('estenda')
-    def estender(self, seq):
-        """Adiciona todos os elementos da sequência dada no fim da lista."""
 
-        self.extend(seq)
+# Method definitions of documented() must live as long as the interpreter
+_method_defs = []
 
-    def índice(self, valor, *args):
-        """Retorna o índice da primeira ocorrência do valor fornecido."""
 
-        return self.index(valor, *args)
+def documented(method, doc):
+    """
+    Return a copy of the builtin method descriptor with the given docstring.
 
-    def índice_em_intervalo(self, valor, i, j):
-        """Retorna o índice da primeira ocorrência do valor fornecido no
-        intervalo entre i e j."""
+    The copy calls the same C function as the original, so it has no
+    overhead. If the interpreter does not expose method descriptors (e.g.,
+    PyPy), the original method is returned.
+    """
 
-        return self.index(valor, i, j)
+    if type(method) is not types.MethodDescriptorType or \
+            not hasattr(ctypes, 'pythonapi'):
+        return method
 
-    @normalize_accented_keywords
-    @synonyms('insira')
-    def inserir(self, índice, valor):
-        """Insere o elemento dado na posição dada pelo índice."""
+    original = _PyMethodDescrObject.from_address(id(method)).d_method[0]
+    header, sep, _ = (original.ml_doc or b'').partition(b'\n--\n\n')
+    text = doc.encode('utf8')
+    if sep:
+        text = header + sep + text
+    method_def = _PyMethodDef(original.ml_name, original.ml_meth,
+                              original.ml_flags, text)
+    _method_defs.append(method_def)
 
-        self.insert(índice, valor)
+    new_method = ctypes.pythonapi.PyDescr_NewMethod
+    new_method.restype = ctypes.py_object
+    new_method.argtypes = [ctypes.py_object, ctypes.POINTER(_PyMethodDef)]
+    return new_method(method.__objclass__, ctypes.byref(method_def))
 
-    @synonyms('remova')
-    def remover(self, valor):
-        """Remove primeira ocorrência de um elemento com o valor fornecido."""
 
-        self.remove(valor)
+#
+# These classes are mixed with regular builtins using the same technics as in
+# the forbiddenfruit package
+#
+class Lista(list):
+    """
+    Uma lista representa uma sequência de objetos.
 
-    @synonyms('inverta')
-    def inverter(self):
-        """Reordena a lista na ordem inversa."""
+    Pode ser incializada com a sintaxe:
 
-        self.reverse()
+    >>> L = [1, 2, 3, 4]
+    """
 
-    @synonyms('ordene')
-    def ordenar(self, **kwds):
-        """Ordena a lista."""
+    # Methods with the same signature of the corresponding builtin are bound
+    # directly to the C implementation, so calling them has no overhead.
+    acrescentar = acrescente = documented(
+        list.append, 'Acrescenta um elemento no final da lista.')
+    limpar = limpe = documented(
+        list.clear, 'Remove todos os elementos, ficando vazio.')
+    cópia = documented(list.copy, 'Retorna uma cópia da lista.')
+    contar = conte = documented(
+        list.count, 'Retorna o número de ocorrências do valor dado.')
+    estender = estenda = documented(
+        list.extend,
+        'Adiciona todos os elementos da sequência dada no fim da lista.')
+    índice = documented(
+        list.index, 'Retorna o índice da primeira ocorrência do valor '
+                    'fornecido.')
+    índice_em_intervalo = documented(
+        list.index, 'Retorna o índice da primeira ocorrência do valor '
+                    'fornecido no\nintervalo entre i e j.')
+    remover = remova = documented(
+        list.remove,
+        'Remove primeira ocorrência de um elemento com o valor fornecido.')
+    inverter = inverta = documented(
+        list.reverse, 'Reordena a lista na ordem inversa.')
+    ordenar = ordene = documented(list.sort, 'Ordena a lista.')
+    retirar = retire = retirar_último = retire_último = documented(
+        list.pop, 'Remove o último elemento da lista e o retorna.')
+
+    @unaccented_keywords
+    @synonyms('insira')
+    def inserir(self, índice, valor):
+        """Insere o elemento dado na posição dada pelo índice."""
 
-        self.sort(**kwds)
+        self.insert(índice, valor)
 
-    @normalize_accented_keywords
+    @unaccented_keywords
     @synonyms('ordene_por')
     def ordenar_por(self, função, invertido=False):
         """Ordena a lista a partir segundo o resultado da aplicação da função
@@ -87,13 +129,7 @@ class Lista(list):
 
         self.sort(key=função, reverse=invertido)
 
-    @synonyms('retire', 'retirar_último', 'retire_último')
-    def retirar(self, *args):
-        """Remove o último elemento da lista e o retorna."""
-
-        return self.pop(*args)
-
-    @normalize_accented_keywords
+    @unaccented_keywords
     @synonyms('retire_de')
     def retirar_de(self, índice):
         """Remove o elemento no índice dado e o retorna."""
@@ -111,9 +147,14 @@ class Tupla(tuple):
     >>> pto = (1, 2, 3)
     """
 
-    contar = Lista.contar
-    índice = Lista.índice
-    índice_em_intervalo = Lista.índice_em_intervalo
+    contar = conte = documented(
+        tuple.count, 'Retorna o número de ocorrências do valor dado.')
+    índice = documented(
+        tuple.index, 'Retorna o índice da primeira ocorrência do valor '
+                     'fornecido.')
+    índice_em_intervalo = documented(
+        tuple.index, 'Retorna o índice da primeira ocorrência do valor '
+                     'fornecido no\nintervalo entre i e j.')
 
 
 class Conjunto(set):
@@ -126,10 +167,13 @@ class Conjunto(set):
 
     # Single element operations
     adicionar = adicione = set.add
-    retirar = Lista.retirar
-    remover = Lista.remover
-    limpar = Lista.limpar
-    cópia = Lista.cópia
+    retirar = retire = documented(
+        set.pop, 'Remove um elemento arbitrário do conjunto e o retorna.')
+    remover = remova = documented(
+        set.remove, 'Remove o elemento fornecido do conjunto.')
+    limpar = limpe = documented(
+        set.clear, 'Remove todos os elementos, ficando vazio.')
+    cópia = documented(set.copy, 'Retorna uma cópia do conjunto.')
     descartar = descarte = set.discard
 
     # Set properties
@@ -163,8 +207,9 @@ class Dicionário(dict):
     >>> D = {"um": 1, "dois": 2, "três": 3}
     """
 
-    limpar = Lista.limpar
-    cópia = Lista.copy
+    limpar = limpe = documented(
+        dict.clear, 'Remove todos os elementos, ficando vazio.')
+    cópia = documented(dict.copy, 'Retorna uma cópia do dicionário.')
 
     # = dict.fromkeys
     obter = obtenha = dict.get
@@ -242,4 +287,137 @@ class Texto(str):
     = str.strip
     = str.translate
     = str.zfill
-    '''
\ No newline at end of file
+    '''
+
+
+CURSES = {
+    list: Lista,
+    tuple: Tupla,
+    set: Conjunto,
+    dict: Dicionário,
+    str: Texto,
+}
+
+
+class LazyCurses:
+    """
+    Apply curses on demand.
+
+    Instead of patching all builtin types at once, each attribute is only
+    installed when it is first referenced by a code object passed to
+    :meth:`resolve_code`, and is then cached.
+
+    Attributes looked up dynamically (e.g., getattr(L, 'acrescentar')) are
+    not detected. Call :meth:`resolve` with the attribute names to install
+    them explicitly.
+    """
+
+    def __init__(self, curse_map=None):
+        self.curse_map = CURSES if curse_map is None else curse_map
+        self.active = False
+        self._index = None
+
+    @property
+    def index(self):
+        """
+        Map each pending attribute name to a list of (type, value) pairs.
+        """
+
+        if self._index is None:
+            index = {}
+            for tt, curse in self.curse_map.items():
+                for name, func in curse_attributes(curse).items():
+                    index.setdefault(name, []).append((tt, func))
+            self._index = index
+        return self._index
+
+    def activate(self):
+        """
+        Start resolving curses in :meth:`resolve_code`.
+        """
+
+        self.active = True
+
+    def resolve(self, names):
+        """
+        Install curses for all given attribute names.
+        """
+
+        index = self.index
+        modified = set()
+        for name in index.keys() & set(names):
+            for tt, func in index.pop(name):
+                if not hasattr(tt, name):
+                    apply_attr_curse(tt, name, func)
+                    modified.add(tt)
+
+        # Builtin types cache attribute lookups (including misses)
+        for tt in modified:
+            ctypes.pythonapi.PyType_Modified(ctypes.py_object(tt))
+
+    def resolve_code(self, code):
+        """
+        Install curses for all attribute names used in the given code object.
+        """
+
+        if self.active and self.index:
+            self.resolve(code_names(code))
+
+
+def apply_curse_map(curse_map=None):
+    """
+    Apply all curses in the given map (defaults to :data:`CURSES`).
+    """
+
+    curses = LazyCurses(curse_map)
+    curses.resolve(list(curses.index))
+
+
+# Non-empty after curse_reprs() is called
+_cursed_reprs = []
+
+
+def curse_reprs():
+    """
+    Change the repr of None, True and False to Nulo, Verdadeiro and Falso.
+
+    Only the first call has any effect: curse_bool_repr() and curse_none_repr()
+    store the new functions in C-level slots of the builtin types and applying
+    them again would release the functions still referenced by those slots.
+    """
+
+    if not _cursed_reprs:
+        curse_none_repr('Nulo')
+        curse_bool_repr('Verdadeiro', 'Falso')
+        _cursed_reprs.append(True)
+
+
+def curse_attributes(curse):
+    """
+    Return a dictionary with all attributes that a curse class adds to the
+    corresponding builtin type.
+
+    It includes public attributes, synonyms declared with @synonyms and the
+    unaccented versions of all names.
+    """
+
+    ns = {k: v for k, v in vars(curse).items() if k[0] != '_'}
+    result = dict(ns)
+    for name, value in collect_synonyms(ns, add_unaccented=False).items():
+        result.setdefault(name, value)
+    for name, value in list(result.items()):
+        result.setdefault(unidecode(name), value)
+    return result
+
+
+def code_names(code):
+    """
+    Return a set with all names referenced by code and its nested code
+    objects.
+    """
+
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(code_names(const))
+    return names
@@ -0,0 +1,166 @@
+import functools
+import hashlib
+import importlib.machinery
+import importlib.util
+import marshal
+import struct
+import sys
+
+from .cache import compiler_options
+from .transpyler import PytugaTranspyler
+
+__all__ = ['PytugaLoader', 'path_hook', 'install', 'uninstall']
+
+SOURCE_SUFFIX = '.pytg'
+HEADER_SIZE = len(importlib.util.MAGIC_NUMBER) + 12
+
+
+class PytugaLoader(importlib.machinery.SourceFileLoader):
+    """
+    Loader for Pytuguês modules.
+
+    Compiled modules are cached as .pyc files in the __pycache__ folder next
+    to the source using an optimization tag derived from the pytuga version
+    and translation tables. Cached files are validated either by the source
+    mtime and size or by a hash of the source (if check_source_hash is True).
+    """
+
+    check_source_hash = False
+
+    def __init__(self, fullname, path, transpyler=None):
+        super().__init__(fullname, path)
+        self.transpyler = transpyler or PytugaTranspyler()
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        source = importlib.util.decode_source(data)
+        return self.transpyler.compile(source, path, 'exec', dont_inherit=True)
+
+    def exec_module(self, module):
+        vars(module).update(self.transpyler.namespace)
+        super().exec_module(module)
+
+    def get_code(self, fullname):
+        path = self.get_filename(fullname)
+        cache_path = bytecode_path(path, self.transpyler)
+        header, source = self.bytecode_header(path)
+
+        code = self.read_bytecode(cache_path, header)
+        if code is not None:
+            return self.transpyler.resolve_curses(code, 'exec')
+
+        # Cache miss
+        if source is None:
+            source = self.get_data(path)
+        code = self.source_to_code(source, path)
+        if not sys.dont_write_bytecode:
+            try:
+                self.set_data(cache_path, header + marshal.dumps(code))
+            except NotImplementedError:
+                pass
+        return code
+
+    def bytecode_header(self, path):
+        """
+        Return a tuple (header, source) with the header that a valid cached
+        file for path must have. Source is None unless it had to be read to
+        compute the header.
+        """
+
+        if self.check_source_hash:
+            source = self.get_data(path)
+            source_hash = importlib.util.source_hash(source)
+            return code_header(source_hash=source_hash), source
+        stats = self.path_stats(path)
+        return code_header(mtime=stats['mtime'], size=stats['size']), None
+
+    def read_bytecode(self, cache_path, header):
+        """
+        Return the code object stored in cache_path or None if the file does
+        not exist or does not start with the given header.
+        """
+
+        try:
+            data = self.get_data(cache_path)
+        except OSError:
+            return None
+        if data[:HEADER_SIZE] != header:
+            return None
+        try:
+            return marshal.loads(data[HEADER_SIZE:])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+
+def bytecode_path(path, transpyler):
+    """
+    Return the path of the cached bytecode for the given source file.
+    """
+
+    # The digest of the tables is computed once by the transpile cache
+    data = repr((transpyler.transpile_cache.digest,
+                 compiler_options(transpyler))).encode('utf8')
+    tag = 'pytuga' + hashlib.sha256(data).hexdigest()[:16]
+    return importlib.util.cache_from_source(path, optimization=tag)
+
+
+def code_header(mtime=0, size=0, source_hash=None):
+    """
+    Return the header of a .pyc file, as described in PEP 552.
+    """
+
+    magic = importlib.util.MAGIC_NUMBER
+    if source_hash is None:
+        mtime, size = int(mtime) & 0xFFFFFFFF, size & 0xFFFFFFFF
+        return magic + struct.pack('<III', 0, mtime, size)
+    return magic + struct.pack('<I', 0b11) + source_hash
+
+
+def path_hook(transpyler=None):
+    """
+    Return a sys.path_hooks entry that creates FileFinders for the standard
+    Python modules and for .pytg modules.
+
+    Python suffixes take precedence over .pytg in the same directory.
+    """
+
+    loader = functools.partial(PytugaLoader, transpyler=transpyler)
+    hook = importlib.machinery.FileFinder.path_hook(
+        (importlib.machinery.ExtensionFileLoader,
+         importlib.machinery.EXTENSION_SUFFIXES),
+        (importlib.machinery.SourceFileLoader,
+         importlib.machinery.SOURCE_SUFFIXES),
+        (importlib.machinery.SourcelessFileLoader,
+         importlib.machinery.BYTECODE_SUFFIXES),
+        (loader, [SOURCE_SUFFIX]),
+    )
+    hook.pytuga = True
+    return hook
+
+
+def install(transpyler=None):
+    """
+    Register a path hook for .pytg modules in sys.path_hooks.
+
+    Returns the installed hook.
+    """
+
+    for hook in sys.path_hooks:
+        if getattr(hook, 'pytuga', False):
+            return hook
+
+    # The hook replaces the default FileFinder hook, which is the last one,
+    # so finders that were already created must be discarded
+    hook = path_hook(transpyler)
+    sys.path_hooks.insert(max(len(sys.path_hooks) - 1, 0), hook)
+    sys.path_importer_cache.clear()
+    return hook
+
+
+def uninstall():
+    """
+    Remove all hooks registered by :func:`install`.
+    """
+
+    sys.path_hooks[:] = \
+        [x for x in sys.path_hooks if not getattr(x, 'pytuga', False)]
+    sys.path_importer_cache.clear()
@@ -0,0 +1,582 @@
+import codeop
+import io
+import math
+import re
+import tokenize
+from bisect import bisect_right
+from tokenize import NEWLINE
+
+from lazyutils import lazy
+
+from .lexer import REPETIR
+from .transpyler import PytugaTranspyler
+
+__all__ = ['IncrementalTranspiler', 'IncompleteSourceChecker',
+           'split_logical_lines', 'check_indentation']
+
+# Number of chunks around an edit that are joined again before the cached
+# code before and after the edit is refreshed
+JOIN_WINDOW = 32
+
+
+class IncrementalTranspiler:
+    """
+    Keep the transpiled version of a source that is edited incrementally.
+
+    The source is stored as a list of chunks, each holding a single logical
+    line (together with the blank and comment lines that precede it) and its
+    transpiled Python code. Since all Pytuguês rewrites are local to a logical
+    line, an edit only re-transpiles the chunks it touches. All other chunks
+    reuse their previous result.
+
+    Each chunk also caches the indentation stack after its logical line, so
+    an edit only revalidates the indentation from the edited chunk until the
+    stack matches the cached one again. Chunk offsets are computed on demand
+    from the edited chunk and the Python code before and after the edited
+    chunks is joined once, so edits close to each other cost the same for
+    short and long sources.
+
+    Usage:
+
+        >>> state = IncrementalTranspiler('repetir 2 vezes:\\n    mostre(1)\\n')
+        >>> python = state.edit(28, 29, '42')
+        >>> state.source
+        'repetir 2 vezes:\\n    mostre(42)\\n'
+
+    Args:
+        source (str):
+            Initial source code.
+        transpyler:
+            Transpyler instance. Defaults to PytugaTranspyler().
+    """
+
+    def __init__(self, source='', transpyler=None):
+        self.transpyler = transpyler or PytugaTranspyler()
+        self._sources = []
+        self._pythons = []
+        self._columns = []
+        self._stacks = []
+        self._failed = 0
+        self._offsets = [0]
+        self._head = self._tail = (0, '')
+        self._edited = (0, 0)
+        self._python = None
+        self.chunks_transpiled = 0
+        self.update(source)
+
+    @property
+    def chunks(self):
+        """
+        List of (source, python) pairs for each chunk. Python is None if the
+        chunk could not be transpiled.
+        """
+
+        return list(zip(self._sources, self._pythons))
+
+    @property
+    def source(self):
+        """
+        The current source code.
+        """
+
+        return ''.join(self._sources)
+
+    @property
+    def python(self):
+        """
+        The transpiled Python code for the current source.
+
+        Raises a SyntaxError if the source cannot be transpiled.
+        """
+
+        if self._python is None:
+            if self._failed or self._stacks and self._stacks[-1] is None:
+                # Transpile the full source to obtain the correct line numbers
+                # in the error message
+                self._python = self.transpyler.transpile(self.source)
+            else:
+                self._python = self._join()
+        return self._python
+
+    @property
+    def offsets(self):
+        """
+        List with the offset of the start of each chunk in the source.
+        """
+
+        return self._extend_offsets(math.inf)
+
+    def edit(self, start, end, text):
+        """
+        Replace source[start:end] by text and return the new Python code.
+        """
+
+        offsets = self._extend_offsets(end)
+        first = self._previous(bisect_right(offsets, start) - 1)
+        last = max(min(bisect_right(offsets, end), len(self._sources)), first)
+
+        region = ''.join(self._sources[first:last])
+        start -= offsets[first]
+        end -= offsets[first]
+        self._replace(first, last, region[:start] + text + region[end:])
+        return self.python
+
+    def update(self, source):
+        """
+        Replace the full source and return the new Python code.
+
+        Chunks in the common head and tail of the old and new sources are
+        reused.
+        """
+
+        sources = self._sources
+        first = 0
+        pos = 0
+        while first < len(sources) and source.startswith(sources[first], pos):
+            pos += len(sources[first])
+            first += 1
+
+        last = len(sources)
+        end = len(source)
+        while last > first and end > pos and \
+                source.endswith(sources[last - 1], pos, end):
+            end -= len(sources[last - 1])
+            last -= 1
+
+        idx = self._previous(first)
+        pos -= sum(map(len, sources[idx:first]))
+        self._replace(idx, last, source[pos:end])
+        return self.python
+
+    def _extend_offsets(self, pos):
+        # Compute the offsets of chunks until the first one after pos
+        offsets = self._offsets
+        sources = self._sources
+        while offsets[-1] <= pos and len(offsets) <= len(sources):
+            offsets.append(offsets[-1] + len(sources[len(offsets) - 1]))
+        return offsets
+
+    def _previous(self, idx):
+        # The last chunk may be an incomplete logical line that continues in
+        # the edited region.
+        if idx == len(self._sources) and idx > 0:
+            return idx - 1
+        return idx
+
+    def _replace(self, first, last, region):
+        sources = self._sources
+
+        # Extend region until it ends in a complete logical line
+        while True:
+            try:
+                lines, rest = split_logical_lines(region)
+            except (tokenize.TokenError, SyntaxError):
+                if last == len(sources):
+                    # Incomplete source is handled by the full transpiler
+                    lines = [region] if region else []
+                    pythons = [None] * len(lines)
+                    break
+            else:
+                if not rest or last == len(sources):
+                    if rest:
+                        lines.append(rest)
+                    pythons = [self._transpile(src) for src in lines]
+                    break
+            region += sources[last]
+            last += 1
+        self._store(first, last, lines, pythons)
+
+    def _store(self, first, last, lines, pythons):
+        # Replace chunks[first:last] and update the cached state
+        sources = self._sources
+        self._failed += pythons.count(None) - \
+            self._pythons[first:last].count(None)
+        if self._head[0] > first:
+            self._head = (0, '')
+        if self._tail[0] > len(sources) - last:
+            self._tail = (0, '')
+        self._edited = (first, first + len(lines))
+        sources[first:last] = lines
+        self._pythons[first:last] = pythons
+        self._columns[first:last] = map(indentation_column, lines)
+        self._stacks[first:last] = [None] * len(lines)
+        self._revalidate(first, first + len(lines))
+        del self._offsets[first + 1:]
+        self._python = None
+
+    def _join(self):
+        # Join the Python code of all chunks reusing the code before and after
+        # the chunks changed by the last edit
+        pythons = self._pythons
+        first, end = self._edited
+        head, tail = self._head, self._tail
+        if first - head[0] > JOIN_WINDOW:
+            head = self._head = (first, ''.join(pythons[:first]))
+        size = len(pythons) - end
+        if size - tail[0] > JOIN_WINDOW:
+            tail = self._tail = (size, ''.join(pythons[end:]))
+        middle = pythons[head[0]:len(pythons) - tail[0]]
+        return head[1] + ''.join(middle) + tail[1]
+
+    def _revalidate(self, first, end):
+        # Update the indentation stacks of the new chunks in [first, end) and
+        # of the following chunks until a stack matches the cached one
+        stacks = self._stacks
+        stack = stacks[first - 1] if first else (0,)
+        for idx in range(first, len(stacks)):
+            stack = indent_stack(stack, self._columns[idx])
+            if idx >= end and stacks[idx] == stack:
+                break
+            stacks[idx] = stack
+
+    def _transpile(self, src):
+        self.chunks_transpiled += 1
+        try:
+            return self.transpyler.lexer.transpile(src)
+        except (SyntaxError, ValueError):
+            # Errors are reported by transpiling the full source
+            return None
+
+
+class IncompleteSourceChecker:
+    """
+    Test if the source typed in an interactive console is incomplete.
+
+    A cheap scanner tracks open brackets, unterminated strings, line
+    continuations and blocks opened by a line that ends with ":" (e.g., in
+    "faça:" or "então:"). Sources that end in any of these states are
+    incomplete. Syntax errors inside them are only reported when the source
+    is complete. The exception are lines that end with ":": they are only
+    incomplete if they start with a block keyword and the header of the
+    block is valid (see :meth:`is_block_header`).
+
+    All other sources are transpiled and compiled, as in
+    Transpyler.is_incomplete_source(). Transpilation uses an
+    :class:`IncrementalTranspiler`, so only the lines that changed since the
+    last call are transpiled again. Likewise, the scanner resumes from the
+    last complete logical line if the source extends the previous one.
+
+    Args:
+        transpyler:
+            Transpyler instance. Defaults to PytugaTranspyler().
+    """
+
+    def __init__(self, transpyler=None):
+        self.transpyler = transpyler or PytugaTranspyler()
+        self.incremental = IncrementalTranspiler(transpyler=self.transpyler)
+        self._prefix = ''
+        self._state = ScanState()
+
+    def __call__(self, src, filename='<input>', symbol='single'):
+        state = self.scan(src)
+        if state.is_incomplete():
+            if not state.opens_block():
+                return True
+            header = src[state.checkpoint:]
+            if self.is_block_header(header, filename):
+                return True
+
+        try:
+            python = self.incremental.update(src)
+        except SyntaxError:
+            return True
+        return codeop.compile_command(python, filename, symbol) is None
+
+    @lazy
+    def block_keywords(self):
+        """
+        Set of words that start a line that opens a block.
+        """
+
+        words = set(BLOCK_KEYWORDS) | REPETIR
+        for word, python in self.transpyler.translations.items():
+            if python in BLOCK_KEYWORDS:
+                words.add(word if isinstance(word, str) else word[0])
+        return words
+
+    def is_block_header(self, line, filename='<input>'):
+        """
+        Return True if line is a valid header of a block, such as
+        "se x então:". Return False if it does not start with a block keyword.
+
+        Raise a SyntaxError if the header is invalid.
+        """
+
+        line = line.lstrip()
+        if line.split(None, 1)[0].rstrip(':') not in self.block_keywords:
+            return False
+        python = self.transpyler.lexer.transpile(line)
+        keyword = python.split(None, 1)[0].rstrip(':')
+        before, after = HEADER_CONTEXT.get(keyword, ('', ''))
+        compile(before + python + '\n    pass\n' + after, filename, 'exec')
+        return True
+
+    def scan(self, src):
+        """
+        Return the :class:`ScanState` at the end of src.
+        """
+
+        if src.startswith(self._prefix):
+            state = self._state.resume()
+        else:
+            state = ScanState()
+        state.feed(src)
+        self._prefix = src[:state.checkpoint]
+        self._state = state
+        return state
+
+
+class ScanState:
+    """
+    State of the scanner of :class:`IncompleteSourceChecker`.
+
+    Attributes:
+        brackets (list):
+            Stack of closing brackets that are expected.
+        quote (str):
+            Quotes of an unterminated string, or None.
+        continued (bool):
+            True if source ends with a line continuation.
+        colon (bool):
+            True if the last line of source ends with ":".
+        header (bool):
+            True if the last logical line without indentation ends with ":".
+        block (bool):
+            True if source ends in an indented line (without a newline) of
+            the block opened by the last header.
+        broken (bool):
+            True if the scanner found an error.
+        checkpoint (int):
+            Position after the last complete logical line. The scanner can be
+            resumed from this position.
+    """
+
+    def __init__(self):
+        self.brackets = []
+        self.quote = None
+        self.continued = False
+        self.colon = False
+        self.header = False
+        self.block = False
+        self.broken = False
+        self.checkpoint = 0
+        self._checkpoint_broken = False
+
+    def resume(self):
+        """
+        Return a new state at the checkpoint position.
+        """
+
+        new = ScanState()
+        new.broken = new._checkpoint_broken = self._checkpoint_broken
+        new.header = self.header
+        new.checkpoint = self.checkpoint
+        return new
+
+    def is_incomplete(self):
+        """
+        True if the source is certainly incomplete.
+        """
+
+        if self.broken:
+            return False
+        return bool(self.brackets) or self.continued or self.colon or \
+            self.block or self.quote in ("'''", '"""')
+
+    def opens_block(self):
+        """
+        True if the source is incomplete only because its last line ends
+        with ":".
+        """
+
+        return self.colon and not self.brackets and not self.continued and \
+            self.quote is None
+
+    def feed(self, src):  # noqa: C901 (state machine)
+        """
+        Scan src from the checkpoint position.
+        """
+
+        pos = code_start = self.checkpoint
+        code_end = None
+        brackets = self.brackets
+        while True:
+            if self.quote is not None:
+                match = STRING_END[self.quote].search(src, pos)
+                if match is None:
+                    return
+                pos = match.end()
+                token = match.group()
+                if token[0] == '\\':
+                    continue
+                elif token == '\n':
+                    self.broken = True
+                    pos -= 1
+                self.quote = None
+                code_start = pos
+                continue
+
+            match = SPECIAL_CHARS.search(src, pos)
+            if match is None:
+                self.colon = ends_with_colon(src, code_start, code_end)
+                self.block = self.header and is_indented(src, self.checkpoint)
+                return
+
+            char, idx, pos = match.group(), match.start(), match.end()
+            if char in '"\'':
+                triple = char * 3
+                self.quote = triple if src.startswith(triple, idx) else char
+                pos = idx + len(self.quote)
+            elif char == '#':
+                code_end = idx
+                pos = src.find('\n', pos)
+                if pos == -1:
+                    self.colon = ends_with_colon(src, code_start, code_end)
+                    self.block = self.header and \
+                        is_indented(src, self.checkpoint)
+                    return
+            elif char == '\\':
+                if pos == len(src):
+                    self.continued = True
+                    return
+                elif src[pos] == '\n':
+                    pos += 1
+                    code_start = pos
+                else:
+                    self.broken = True
+            elif char == '\n':
+                if not brackets:
+                    end = idx if code_end is None else code_end
+                    self.colon = ends_with_colon(src, code_start, end)
+                    if is_indented(src, self.checkpoint) is False:
+                        self.header = self.colon
+                    self.checkpoint = pos
+                    self._checkpoint_broken = self.broken
+                code_start = pos
+                code_end = None
+            elif char in OPENING_BRACKETS:
+                brackets.append(OPENING_BRACKETS[char])
+            elif not brackets or brackets.pop() != char:
+                self.broken = True
+
+
+def ends_with_colon(src, start, end):
+    return src[start:end].rstrip().endswith(':')
+
+
+def is_indented(src, start):
+    """
+    Return True if the line that starts at the given position is indented,
+    False if it is not and None if it is blank or a comment.
+    """
+
+    match = LINE_START.match(src, start)
+    if match.group(2) in ('', '#', '\n', '\r'):
+        return None
+    return bool(match.group(1))
+
+
+# Python keywords that start a compound statement and the statements that
+# must come before and after them
+BLOCK_KEYWORDS = frozenset(['if', 'elif', 'else', 'while', 'for', 'def',
+                            'class', 'try', 'except', 'finally', 'with',
+                            'async'])
+HEADER_CONTEXT = {
+    'elif': ('if 1: pass\n', ''),
+    'else': ('if 1: pass\n', ''),
+    'try': ('', 'finally: pass\n'),
+    'except': ('try: pass\n', ''),
+    'finally': ('try: pass\n', ''),
+}
+OPENING_BRACKETS = {'(': ')', '[': ']', '{': '}'}
+LINE_START = re.compile(r'([ \t\f]*)(.?)')
+SPECIAL_CHARS = re.compile(r'[\'"#\\\n()\[\]{}]')
+STRING_END = {
+    quote: re.compile(r'\\.|' + quote + (r'|\n' if len(quote) == 1 else ''),
+                      re.DOTALL)
+    for quote in ["'", '"', "'''", '"""']
+}
+
+
+def split_logical_lines(src):
+    """
+    Split source in a list of strings with one logical line each.
+
+    Blank and comment lines are attached to the following logical line. Return
+    a tuple of (lines, rest), where rest holds the blank and comment lines at
+    the end of the source. Raise tokenize.TokenError if the source ends in an
+    incomplete logical line.
+    """
+
+    lines = src.splitlines(True)
+
+    # Indentation is irrelevant to find logical lines and could make the
+    # tokenizer fail when src starts in the middle of a block.
+    readline = io.StringIO(''.join(line.lstrip(' \t') for line in lines))
+    result = []
+    start = 0
+    for tk in tokenize.generate_tokens(readline.readline):
+        if tk.type == NEWLINE:
+            end = tk.end[0]
+            result.append(''.join(lines[start:end]))
+            start = end
+    return result, ''.join(lines[start:])
+
+
+def check_indentation(chunks):
+    """
+    Return True if the logical lines in the given sequence of chunks have a
+    consistent indentation.
+
+    Each chunk must be a string returned by :func:`split_logical_lines`.
+    """
+
+    stack = (0,)
+    for src in chunks:
+        stack = indent_stack(stack, indentation_column(src))
+        if stack is None:
+            return False
+    return True
+
+
+def indentation_column(src):
+    """
+    Return the indentation column of the first line with code in the given
+    chunk, or None if it only has blank and comment lines.
+    """
+
+    for line in src.splitlines():
+        stripped = line.lstrip(' \t\f')
+        if stripped and not stripped.startswith('#'):
+            break
+    else:
+        return None
+
+    # Same rules used by the tokenize module
+    column = 0
+    for char in line[:len(line) - len(stripped)]:
+        if char == ' ':
+            column += 1
+        elif char == '\t':
+            column = (column // 8 + 1) * 8
+        else:
+            column = 0
+    return column
+
+
+def indent_stack(stack, column):
+    """
+    Return the tuple of indentation columns of the open blocks after a line
+    indented at column, or None if the indentation is inconsistent.
+
+    Blank lines (column is None) keep the stack and inconsistent stacks stay
+    inconsistent.
+    """
+
+    if stack is None or column is None:
+        return stack
+    if column > stack[-1]:
+        return stack + (column,)
+    while column < stack[-1]:
+        stack = stack[:-1]
+    return stack if column == stack[-1] else None
@@ -1,5 +1,7 @@
 import collections
 import keyword
+import types
+import unicodedata
 
 TRANSLATIONS = dict(
     # Loops
@@ -87,24 +89,76 @@ ERROR_GROUPS = collections.OrderedDict(
     ]
 )
 
-PURE_PYTG_KEYWORDS = set(TRANSLATIONS)
-PURE_PYTG_KEYWORDS.update({'repetir', 'repita', 'vezes', 'cada', 'de',
-                           'ate', 'fazer', 'faça', 'faca'})
-kwlist = set(PURE_PYTG_KEYWORDS)
-kwlist.update(keyword.kwlist)
+
+def fold_accents(word):
+    """
+    Remove diacritics from word (e.g., "senão" -> "senao").
+    """
+
+    decomposed = unicodedata.normalize('NFKD', word)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _keyword_forms(words):
+    # Unaccented spellings map to the accented keyword unless they are a
+    # different keyword (e.g., "e" is "and", but "é" is "is").
+    forms = {word: word for word in words}
+    for word in words:
+        folded = fold_accents(word)
+        if folded != word and TRANSLATIONS.get(folded, folded) == \
+                TRANSLATIONS.get(word, folded):
+            forms[folded] = word
+
+    # Pytuguês to Pytuguês translations (e.g., "ateh" -> "ate") are aliases
+    for word, target in TRANSLATIONS.items():
+        if target in forms:
+            forms[word] = forms[target]
+    return types.MappingProxyType(forms)
+
+
+_words = set(TRANSLATIONS)
+_words.update(word for seq in SEQUENCE_TRANSLATIONS for word in seq
+              if word.isidentifier())
+_words.update({'repetir', 'repita', 'vezes', 'cada', 'de', 'até'})
+
+# Every spelling of each Pytuguês keyword, mapped to its canonical (accented)
+# form. Accent folding is a single lookup in this table.
+KEYWORD_FORMS = _keyword_forms(_words)
+
+PURE_PYTG_KEYWORDS = frozenset(KEYWORD_FORMS)
+kwlist = PURE_PYTG_KEYWORDS.union(keyword.kwlist)
 constants = (
     'True', 'False', 'None',
     'Verdadeiro', 'Falso', 'Nulo',
     'verdadeiro', 'falso', 'nulo',
 )
 
+#: Return True if k is a valid Pytuguês keyword.
+iskeyword = kwlist.__contains__
+
 
-def iskeyword(k):
+def normalize_keyword(word):
     """
-    Return True if k is a valid Pytuguês keyword.
+    Return the canonical form of a Pytuguês keyword or None if word is not a
+    keyword.
+
+    >>> normalize_keyword('senao')
+    'senão'
+    """
+
+    return KEYWORD_FORMS.get(word)
+
+
+def keyword_forms(*words):
+    """
+    Return a frozenset with all spellings of the given canonical keywords.
+
+    >>> sorted(keyword_forms('até'))
+    ['ate', 'ateh', 'até']
     """
 
-    return k in kwlist
+    return frozenset(form for form, canonical in KEYWORD_FORMS.items()
+                     if canonical in words)
 
 
-del keyword
+del keyword, _words
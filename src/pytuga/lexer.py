@@ -1,19 +1,260 @@
-from tokenize import NEWLINE
+import io
+import time
+from bisect import bisect_left
+import tokenize
+from tokenize import NAME, NEWLINE, NUMBER, OP
 
-from transpyler import token
+from lazyutils import lazy
 from transpyler.lexer import Lexer
 from transpyler.token import Token
+from transpyler.utils import keep_spaces
+
+from .keywords import keyword_forms
+from .profiling import TranspileStats
+from .sourcemap import SourceMap
+from .tokens import StreamUntokenizer, TokenBuffer, token_end
 
 __all__ = ['PytugaLexer']
 
 
+class LineDisplacement:
+    """
+    Column displacement pending for the tokens of the line being rewritten.
+
+    Rewrites that change the width of a token register the difference with
+    :meth:`add`. The shift is only applied when a token is copied to the
+    output by :meth:`apply`, so each token is visited once no matter how many
+    rewrites happened before it in the same line.
+    """
+
+    __slots__ = ('lineno', 'cols')
+
+    def __init__(self):
+        self.lineno = None
+        self.cols = 0
+
+    def add(self, lineno, cols):
+        """
+        Displace all following tokens in the given line by cols columns.
+        """
+
+        if lineno != self.lineno:
+            self.lineno, self.cols = lineno, 0
+        self.cols += cols
+
+    def apply(self, lineno, col):
+        """
+        Return the displaced column of a token that starts at (lineno, col).
+        """
+
+        if lineno != self.lineno:
+            self.lineno, self.cols = None, 0
+            return col
+        return col + self.cols
+
+
+def emit_strings(displacement, out, lineno, col, old_end, strings, origin):
+    """
+    Append new tokens to the out buffer replacing the tokens from (lineno,
+    col) up to old_end and register the column displacement with respect to
+    old_end. Return the end position of the new tokens.
+    """
+
+    end = out.append_strings(lineno, col, strings, origin)
+    if end[0] == old_end[0]:
+        displacement.add(end[0], end[1] - old_end[1])
+    return end
+
+
+def syntax_error(msg, buf, lineno, col=None):
+    """
+    Return a SyntaxError at the given position of the source of buf. The
+    column starts at 0, as in the token positions.
+    """
+
+    offset = None if col is None else col + 1
+    return SyntaxError(msg, (None, lineno, offset, buf.source_line(lineno)))
+
+
+def literal_int(buf, start, stop):
+    """
+    Return the value of the integer literal (possibly with a sign) formed by
+    the tokens from position start up to stop of buf or None if they are not
+    an integer literal.
+    """
+
+    table, strings = buf.table, buf.strings
+    sign = 1
+    if stop - start == 2 and table[strings[start]] in ('-', '+'):
+        sign = -1 if table[strings[start]] == '-' else 1
+        start += 1
+    if stop - start != 1 or buf.types[start] != NUMBER:
+        return None
+    try:
+        return sign * int(table[strings[start]], 0)
+    except ValueError:
+        return None
+
+
+def step_error(start, stop, step):
+    """
+    Return the error message for the integer literal step of a "de <X> até
+    <Y> a cada <Z>" command or None if the step is valid. The start and stop
+    bounds are None if they are not integer literals.
+    """
+
+    if step == 0:
+        return 'o passo do comando para cada não pode ser zero'
+    if start is not None and stop is not None and (stop - start) * step < 0:
+        direction = 'negativo' if step < 0 else 'positivo'
+        return 'passo %s em um comando para cada de %s até %s: o laço ' \
+               'nunca seria executado' % (direction, start, stop)
+    return None
+
+
+def keyword_positions(buf, words):
+    """
+    Return a sorted list with the positions of the tokens of buf whose
+    strings are in the given set of words.
+
+    Words are looked up once per entry of the string table, so scanning the
+    buffer costs a single integer lookup per token.
+    """
+
+    table = buf.table
+    if len(table) < len(words):
+        wanted = {idx for idx, string in enumerate(table) if string in words}
+    else:
+        index = table.index
+        wanted = {index[word] for word in words if word in index}
+    if not wanted:
+        return []
+    return [idx for idx, string in enumerate(buf.strings) if string in wanted]
+
+
+def copy_tokens(out, buf, start, stop, displacement):
+    """
+    Copy tokens from position start up to stop of buf to the out buffer.
+    """
+
+    # Only tokens in the line of the last rewrite must be displaced
+    lines, cols, line = buf.lines, buf.cols, displacement.lineno
+    while start < stop and lines[start] == line:
+        out.copy_token(buf, start, displacement.apply(line, cols[start]))
+        start += 1
+    if start < stop:
+        out.extend(buf, start, stop)
+
+
+def skip_tokens(out, buf, idx, positions, displacement):
+    """
+    Copy tokens from position idx up to the next position in the sorted list
+    of positions to the out buffer. Return that position or len(buf) if there
+    are no more positions.
+    """
+
+    k = bisect_left(positions, idx)
+    stop = positions[k] if k < len(positions) else len(buf)
+    copy_tokens(out, buf, idx, stop, displacement)
+    return stop
+
+
+def replace_sequence(out, buf, idx, col, match, displacement):
+    """
+    Append the replacement of a (sequence, replacement) match that starts at
+    position idx of buf to the out buffer. Return the position of the last
+    replaced token.
+    """
+
+    seq, repl = match
+    lines, cols = buf.lines, buf.cols
+    last = idx + len(seq) - 1
+    last_col = col
+    for k in range(idx + 1, last + 1):
+        last_col = displacement.apply(lines[k], cols[k])
+    end = token_end(lines[last], last_col, buf.table[buf.strings[last]],
+                    buf.types[last])
+    emit_strings(displacement, out, lines[idx], col, end, (repl,),
+                 buf.origins and buf.origins[idx])
+    return last
+
+
+class TokenTrie:
+    """
+    A token-level trie compiled from a mapping of {sequence: value}.
+
+    Matching a position inspects at most as many tokens as the longest
+    sequence in the mapping, independently of the number of sequences.
+    """
+
+    def __init__(self, mapping):
+        self.root = {}
+        for seq, value in mapping.items():
+            node = self.root
+            for string in seq:
+                node = node.setdefault(string, {})
+            node[None] = (tuple(seq), value)
+
+    def __bool__(self):
+        return bool(self.root)
+
+    def match(self, tokens, idx):
+        """
+        Return the (sequence, value) pair for the longest sequence starting
+        at tokens[idx] or None if no sequence matches.
+        """
+
+        node = self.root.get(tokens[idx].string)
+        result = None
+        while node is not None:
+            result = node.get(None, result)
+            idx += 1
+            if idx == len(tokens):
+                break
+            node = node.get(tokens[idx].string)
+        return result
+
+    def match_buffer(self, buf, idx):
+        """
+        Like :meth:`match`, but for a :class:`pytuga.tokens.TokenBuffer`.
+        """
+
+        table, strings = buf.table, buf.strings
+        node = self.root.get(table[strings[idx]])
+        result = None
+        size = len(strings)
+        while node is not None:
+            result = node.get(None, result)
+            idx += 1
+            if idx == size:
+                break
+            node = node.get(table[strings[idx]])
+        return result
+
+
 class PytugaLexer(Lexer):
     """
     Pytuga lexer.
 
     Defines the "repetir n vezes" and "de X ate Y a cada Z" commands.
+
+    Tokens are stored in a :class:`pytuga.tokens.TokenBuffer` and each rewrite
+    is a single pass from one buffer to another, so transpilation time and
+    memory grow linearly with the size of the source. The methods that
+    receive lists of Token objects are kept for compatibility and convert them
+    to and from buffers.
     """
 
+    # A TranspileProfiler instance (see pytuga.profiling) or None
+    profiler = None
+
+    # Tokens emitted for "repetir <N> vezes" and "de <X> até <Y> a cada <Z>"
+    repetir_strings = ('for', '___', 'in', 'range', '(')
+    de_strings = ('in', 'range', '(')
+    a_cada_strings = ('+', '1', ',')
+    a_cada_down_strings = ('-', '1', ',')
+    ate_end_strings = ('+', '1', ')')
+
     def process_repetir_command(self, tokens):
         """
         Converts command::
@@ -32,35 +273,66 @@ class PytugaLexer(Lexer):
                 <BLOCO>
         """
 
-        matches = [('repetir',), ('repita',), ('vezes',), (NEWLINE,)]
-        iterator = token.token_find(tokens, matches)
+        buf = TokenBuffer.from_tokens(tokens)
+        return self.rewrite_repetir(buf).to_tokens()
+
+    def rewrite_repetir(self, buf):  # noqa: C901 (state machine)
+        """
+        Buffer version of :meth:`process_repetir_command`.
+        """
 
-        for idx, match, start, end in iterator:
-            # Send tokens to the beginning of the equivalent "for" loop
-            starttokens = Token.from_strings(
-                tokens[idx].start, 'for', '___', 'in', 'range', '('
-            )
-            del tokens[idx]
-            token.insert_tokens_at(tokens, idx, starttokens, end=end)
+        positions = keyword_positions(buf, REPETIR_KEYWORDS)
+        if not positions:
+            return buf
 
-            # Matches the 'vezes' token
-            try:
-                idx, match, start, end = next(iterator)
-            except StopIteration:
-                match = [None]
-
-            if match[0] != 'vezes':
-                raise SyntaxError(
-                    'comando repetir malformado na linha %s.\n'
-                    '    Espera comando do tipo\n\n'
-                    '        repetir <N> vezes:\n'
-                    '            <BLOCO>\n\n'
-                    '    Palavra chave "vezes" está faltando!' % (start.lineno))
+        out = buf.new()
+        table, types, strings = buf.table, buf.types, buf.strings
+        lines, cols, origins = buf.lines, buf.cols, buf.origins
+        displacement = LineDisplacement()
+        pending = None
+        size = len(buf)
+        idx = -1
+
+        while True:
+            idx += 1
+            if pending is None:
+                idx = skip_tokens(out, buf, idx, positions, displacement)
+            if idx >= size:
+                break
+
+            lineno = lines[idx]
+            col = displacement.apply(lineno, cols[idx])
+            type, string = types[idx], table[strings[idx]]
+            is_name = type == NAME
+
+            if is_name and string in REPETIR and pending is None:
+                pending = (lineno, cols[idx])
+                emit_strings(displacement, out, lineno, col,
+                             (lineno, col + len(string)),
+                             self.repetir_strings,
+                             origins and origins[idx])
+            elif is_name and string == 'vezes' and pending is not None:
+                pending = None
+                out.append(OP, ')', lineno, col, origins and origins[idx])
+                displacement.add(lineno, 1 - len(string))
+            elif pending is not None and (
+                    type == NEWLINE or is_name and string in REPETIR):
+                self.repetir_error(buf, lineno, cols[idx])
             else:
-                tokens[idx] = Token(')', start=start)
-                token.displace_tokens(tokens[idx + 1:], -4)
+                out.copy_token(buf, idx, col)
 
-        return tokens
+        if pending is not None:
+            self.repetir_error(buf, *pending)
+        return out
+
+    def repetir_error(self, buf, lineno, col=None):
+        raise syntax_error(
+            'comando repetir malformado na linha %s.\n'
+            '    Espera comando do tipo\n\n'
+            '        repetir <N> vezes:\n'
+            '            <BLOCO>\n\n'
+            '    Palavra chave "vezes" está faltando!' % lineno,
+            buf, lineno, col)
 
     def process_de_ate_command(self, tokens):
         """
@@ -72,72 +344,455 @@ class PytugaLexer(Lexer):
 
             in range(<X>, <Y> + 1[, <Z>])
 
+        If Z is a negative integer literal, the loop counts down to Y
+        inclusive, i.e., range(<X>, <Y> - 1, <Z>). A zero step or a literal
+        step that moves away from literal bounds is a SyntaxError.
+        """
+
+        buf = TokenBuffer.from_tokens(tokens)
+        return self.rewrite_de_ate(buf).to_tokens()
+
+    def rewrite_de_ate(self, buf):  # noqa: C901 (state machine)
+        """
+        Buffer version of :meth:`process_de_ate_command`.
         """
 
-        matches = [('de',), ('ate',), ('a', 'cada',), (NEWLINE,), (':',)]
-        iterator = token.token_find(tokens, matches)
-        for idx, match, start, end in iterator:
-            # Waits for a 'de' token to start processing
-            if match[0] != 'de':
+        positions = keyword_positions(buf, DE)
+        if not positions:
+            return buf
+
+        out = buf.new()
+        table, types, strings = buf.table, buf.types, buf.strings
+        lines, cols, origins = buf.lines, buf.cols, buf.origins
+
+        # States: None (outside command), 'de' (waiting for "até"), 'ate'
+        # (waiting for "a cada" or the end of line) and 'a cada' (waiting for
+        # the end of line).
+        displacement = LineDisplacement()
+        state = None
+        prev_line = prev_end = None
+        held = None
+        de_idx = ate_idx = None
+        size = len(buf)
+        idx = -1
+
+        while True:
+            idx += 1
+            if state is None and held is None:
+                idx = skip_tokens(out, buf, idx, positions, displacement)
+            if idx >= size:
+                break
+
+            lineno = lines[idx]
+            col = displacement.apply(lineno, cols[idx])
+            type, string = types[idx], table[strings[idx]]
+            origin = origins and origins[idx]
+            is_name = type == NAME
+
+            # An "a" token may start the "a cada" sequence: we hold it until
+            # the next token is seen.
+            if held is not None:
+                (held_idx, held_col), held = held, None
+                held_line = lines[held_idx]
+                if is_name and string == 'cada':
+                    if state == 'de':
+                        self.ate_error(buf, held_line, cols[held_idx])
+                    elif state == 'a cada':
+                        self.de_ate_error(buf, held_line, cols[held_idx])
+                    state = 'a cada'
+                    new = self.step_strings(buf, de_idx, ate_idx, held_idx,
+                                            idx)
+                    prev_end = emit_strings(
+                        displacement, out, held_line, held_col,
+                        (lineno, col + len(string)), new,
+                        origins and origins[held_idx])
+                    prev_line = held_line
+                    continue
+                out.copy_token(buf, held_idx, held_col)
+                prev_line, prev_end = held_line, (held_line, held_col + 1)
+
+            if state is None:
+                if is_name and string == 'de':
+                    state = 'de'
+                    de_idx = idx
+                    prev_end = emit_strings(
+                        displacement, out, lineno, col,
+                        (lineno, col + len(string)), self.de_strings,
+                        origin)
+                    prev_line = lineno
+                    continue
+
+            elif is_name and string == 'a':
+                held = (idx, col)
                 continue
 
-            # Send tokens for the beginning of the equivalent in range(...)
-            # test
-            start = tokens[idx].start
-            starttokens = Token.from_strings(start, 'in', 'range', '(')
-            del tokens[idx]
-            token.insert_tokens_at(tokens, idx, starttokens, end=end)
-
-            # Matches the 'até' token and insert a comma separator
-            idx, match, start, end = next(iterator)
-            if match[0] in ['até', 'ate']:
-                token.displace_tokens(tokens[idx:], -3)
-                tokens[idx] = Token(',', start=tokens[idx - 1].end)
-            else:
-                raise SyntaxError(
-                    'comando para cada malformado na linha %s.\n'
-                    '    Espera comando do tipo\n\n'
-                    '        para cada <x> de <a> até <b>:\n'
-                    '            <BLOCO>\n\n'
-                    '    Palavra chave "até" está faltando!' % (start.lineno)
-                )
-
-            idx, match, start, end = next(iterator)
-
-            # Matches "a cada" or the end of the line
-            if match == ('a', 'cada'):
-                middletokens = Token.from_strings(start, '+', '1', ',')
-                del tokens[idx:idx + 2]
-                token.insert_tokens_at(tokens, idx, middletokens, end=end)
-
-                # Proceed to the end of the line
-                idx, match, start, end = next(iterator)
-                if match[0] not in (NEWLINE, ':'):
-                    raise SyntaxError(
-                        'comando malformado na linha %s.\n'
-                        '    Espera um ":" no fim do bloco' % (start.lineno)
-                    )
-                endtok = Token(')', start=start)
-                token.displace_tokens(tokens[idx:], 1)
-                tokens.insert(idx, endtok)
-
-            # Finish command
-            elif match[0] in (NEWLINE, ':'):
-                token.displace_tokens(tokens[idx:], 1)
-                endtokens = Token.from_strings(start, '+', '1', ')')
-                token.insert_tokens_at(tokens, idx, endtokens, end=end)
-
-            # Unexpected token
+            elif state == 'de':
+                if is_name and string in ATE:
+                    state = 'ate'
+                    ate_idx = idx
+                    displacement.add(lineno, -3)
+                    lineno, col = prev_end
+                    out.append(OP, ',', lineno, col, origin)
+                    prev_line, prev_end = lineno, (lineno, col + 1)
+                    continue
+                elif type == NEWLINE or string == ':' or \
+                        is_name and string == 'de':
+                    self.ate_error(buf, lineno, cols[idx])
+
+            elif type == NEWLINE or string == ':':
+                new = self.ate_end_strings if state == 'ate' else (')',)
+                end_col = out.append_strings(lineno, col, new, origin)[1]
+                displacement.add(lineno, end_col - col)
+                col = end_col
+                state = None
+
+            elif is_name and string == 'de':
+                self.de_ate_error(buf, lineno, cols[idx])
+
+            out.copy_token(buf, idx, col)
+            prev_line = lineno
+            prev_end = token_end(lineno, col, string, type)
+
+        if held is not None:
+            out.copy_token(buf, *held)
+        if state == 'de':
+            self.ate_error(buf, prev_line)
+        elif state is not None:
+            self.de_ate_error(buf, prev_line)
+        return out
+
+    def step_strings(self, buf, de, ate, a, cada):
+        """
+        Return the strings emitted for "a cada" in the command whose "de",
+        "até", "a" and "cada" tokens are at the given positions of buf.
+
+        Raise a SyntaxError for invalid integer literal steps.
+        """
+
+        table, types, strings = buf.table, buf.types, buf.strings
+        stop, size = cada + 1, len(buf)
+        while stop < size and types[stop] != NEWLINE and \
+                table[strings[stop]] != ':':
+            stop += 1
+        step = literal_int(buf, cada + 1, stop)
+        if step is None:
+            return self.a_cada_strings
+
+        msg = step_error(literal_int(buf, de + 1, ate),
+                         literal_int(buf, ate + 1, a), step)
+        if msg is not None:
+            raise syntax_error(msg, buf, buf.lines[cada + 1],
+                               buf.cols[cada + 1])
+        return self.a_cada_strings if step > 0 else self.a_cada_down_strings
+
+    def ate_error(self, buf, lineno, col=None):
+        raise syntax_error(
+            'comando para cada malformado na linha %s.\n'
+            '    Espera comando do tipo\n\n'
+            '        para cada <x> de <a> até <b>:\n'
+            '            <BLOCO>\n\n'
+            '    Palavra chave "até" está faltando!' % lineno,
+            buf, lineno, col)
+
+    def de_ate_error(self, buf, lineno, col=None):
+        raise syntax_error(
+            'comando malformado na linha %s.\n'
+            '    Espera um ":" no fim do bloco' % lineno,
+            buf, lineno, col)
+
+    def transpile(self, src, source_map=False):
+        """
+        Transpile source code to Python.
+
+        If source_map is True, return a tuple of (python, source_map), where
+        source_map is a :class:`pytuga.sourcemap.SourceMap` that maps
+        positions in the Python code to the Pytuguês source.
+        """
+
+        if self.profiler is not None and not source_map:
+            return self.transpile_profiled(src)
+        if not src or src.isspace():
+            return (src, SourceMap(src, src, [])) if source_map else src
+
+        buf = self.tokenize_buffer(src, origins=source_map)
+        buf = self.transpile_buffer(buf)
+        python = keep_spaces(buf.untokenize(), src)
+        if source_map:
+            return python, SourceMap.from_buffer(src, python, buf)
+        return python
+
+    def transpile_stream(self, reader, writer):
+        """
+        Read source code from the reader file object and write the
+        corresponding Python code to writer.
+
+        Source is transpiled one logical line at a time, so memory usage does
+        not depend on the size of the input. The result is the same as
+        calling :meth:`transpile` with the whole contents of reader and line
+        numbers in error messages refer to the whole input.
+        """
+
+        # Trailing whitespace is only written when more code follows, since
+        # the output must end with the trailing whitespace of the source.
+        untokenizer = StreamUntokenizer()
+        started = False
+        tail = src_tail = ''
+        for buf in TokenBuffer.iter_logical_lines(reader.readline):
+            src = buf.source
+            if not src or src.isspace():
+                if started:
+                    src_tail += src
+                else:
+                    writer.write(src)
+                continue
+            src_tail = src[len(src.rstrip()):]
+
+            python = untokenizer.untokenize(self.transpile_buffer(buf))
+            if not started:
+                python = src[:len(src) - len(src.lstrip())] + python.lstrip()
+                started = True
+            code = python.rstrip()
+            if code:
+                writer.write(tail + code)
+                tail = python[len(code):]
             else:
-                raise SyntaxError(
-                    'comando malformado na linha %s.\n'
-                    '    Espera um ":" no fim do bloco' % (start.lineno)
-                )
+                tail += python
 
+        if started:
+            writer.write(src_tail)
+
+    def tokenize(self, src):
+        """
+        Convert source string to a list of tokens.
+
+        Args:
+            src (str): a string of source code
+        """
+
+        iterator = tokenize.generate_tokens(io.StringIO(src).readline)
+        tokens = []
+        while True:
+            try:
+                tokens.append(Token(next(iterator)))
+            except (StopIteration, tokenize.TokenError):
+                break
         return tokens
 
+    def tokenize_buffer(self, src, origins=False):
+        """
+        Convert source string to a :class:`pytuga.tokens.TokenBuffer`.
+
+        A newline is appended to the source if it does not end with one.
+        """
+
+        if not src.endswith('\n'):
+            src += '\n'
+        return TokenBuffer.from_source(src, origins=origins)
+
+    @lazy
+    def error_sequences(self):
+        errors = dict(self.invalid_tokens)
+        errors.update(getattr(self.transpyler, 'error_dict', None) or {})
+        return errors
+
+    @lazy
+    def sequence_trie(self):
+        return TokenTrie(self.sequence_translations)
+
+    @lazy
+    def error_trie(self):
+        return TokenTrie(self.error_sequences)
+
+    def detect_error_sequences(self, tokens, error_dict):
+        """
+        Raises a SyntaxError if list of tokens contains any sub-sequence in
+        the given error_dict.
+
+        Args:
+            tokens: List of tokens
+            error_dict: A dictionary of {sequence: error_message}
+        """
+
+        trie = TokenTrie(error_dict)
+        buf = TokenBuffer.from_tokens(tokens)
+        for idx in range(len(buf)):
+            self.check_error_sequence(buf, idx, trie)
+
+    def check_error_sequence(self, buf, idx, trie):
+        """
+        Raises a SyntaxError if some sequence of the error trie starts at the
+        given position of the token buffer.
+        """
+
+        match = trie.match_buffer(buf, idx)
+        if match is not None:
+            raise syntax_error(match[1], buf, buf.lines[idx], buf.cols[idx])
+
+    def replace_sequences(self, tokens, mapping):
+        """
+        Replace all sequences of tokens in the mapping by the corresponding
+        token in the RHS.
+
+        Args:
+            tokens: list of tokens.
+            mapping: a mapping from token sequences to their corresponding
+                replacement (e.g.: {('para', 'cada'): 'for'}).
+
+        Returns:
+            A new list of tokens with replacements.
+        """
+
+        buf = TokenBuffer.from_tokens(tokens)
+        return self.rewrite_sequences(buf, TokenTrie(mapping)).to_tokens()
+
+    def rewrite_sequences(self, buf, trie, error_trie=None):
+        """
+        Buffer version of :meth:`replace_sequences` that receives a compiled
+        TokenTrie.
+
+        If error_trie is given, raise a SyntaxError when the buffer contains
+        one of its sequences.
+        """
+
+        words = set(trie.root).union(error_trie.root if error_trie else ())
+        positions = keyword_positions(buf, words)
+        if not positions:
+            return buf
+
+        out = buf.new()
+        displacement = LineDisplacement()
+        size = len(buf)
+        idx = 0
+
+        while True:
+            idx = skip_tokens(out, buf, idx, positions, displacement)
+            if idx >= size:
+                break
+
+            col = displacement.apply(buf.lines[idx], buf.cols[idx])
+            match = trie.match_buffer(buf, idx)
+            if match is None:
+                out.copy_token(buf, idx, col)
+                last = idx
+            else:
+                last = replace_sequence(out, buf, idx, col, match,
+                                        displacement)
+
+            # Error sequences may start inside the replaced tokens
+            if error_trie:
+                for k in range(idx, last + 1):
+                    self.check_error_sequence(buf, k, error_trie)
+            idx = last + 1
+        return out
+
+    def replace_translations(self, tokens, mapping):
+        """
+        Replace all tokens by the corresponding values in the RHS.
+
+        Args:
+            tokens: list of tokens.
+            mapping: a mapping from token sequences to their corresponding
+                replacement (e.g.: {'enquanto': 'while'}).
+
+        Returns:
+            A new list of tokens with replacements.
+        """
+
+        buf = TokenBuffer.from_tokens(tokens)
+        return self.rewrite_translations(buf, mapping).to_tokens()
+
+    def rewrite_translations(self, buf, mapping):
+        """
+        Buffer version of :meth:`replace_translations`.
+        """
+
+        positions = keyword_positions(buf, mapping)
+        if not positions:
+            return buf
+
+        out = buf.new()
+        table, types, strings = buf.table, buf.types, buf.strings
+        lines, cols, origins = buf.lines, buf.cols, buf.origins
+        displacement = LineDisplacement()
+        idx = 0
+
+        for pos in positions:
+            copy_tokens(out, buf, idx, pos, displacement)
+            lineno = lines[pos]
+            col = displacement.apply(lineno, cols[pos])
+            string = table[strings[pos]]
+            end = token_end(lineno, col, string, types[pos])
+            emit_strings(displacement, out, lineno, col, end,
+                         (mapping[string],), origins and origins[pos])
+            idx = pos + 1
+        copy_tokens(out, buf, idx, len(buf), displacement)
+        return out
+
+    def rewrite_stages(self):
+        """
+        Return a list of (name, func) pairs with the rewrite passes applied by
+        :meth:`transpile_buffer`.
+
+        Each function receives a TokenBuffer and returns a new buffer with the
+        rewritten tokens.
+        """
+
+        return [
+            ('sequences', lambda buf: self.rewrite_sequences(
+                buf, self.sequence_trie, self.error_trie)),
+            ('translations', lambda buf: self.rewrite_translations(
+                buf, self.single_translations)),
+            ('repetir', self.rewrite_repetir),
+            ('de_ate', self.rewrite_de_ate),
+        ]
+
+    def transpile_buffer(self, buf):
+        """
+        Apply all rewrite passes to a TokenBuffer and return the resulting
+        buffer of Python tokens.
+        """
+
+        for _, stage in self.rewrite_stages():
+            buf = stage(buf)
+        return buf
+
     def transpile_tokens(self, tokens):
-        tokens = super().transpile_tokens(tokens)
-        tokens = self.process_repetir_command(tokens)
-        tokens = self.process_de_ate_command(tokens)
-        return tokens
+        """
+        Transpile a sequence of Token objects to their corresponding Python
+        tokens.
+        """
+
+        buf = self.transpile_buffer(TokenBuffer.from_tokens(tokens))
+        return buf.to_tokens()
+
+    def transpile_profiled(self, src):
+        """
+        Like :meth:`transpile`, but record the time and the number of tokens
+        of each stage in the profiler.
+        """
+
+        stats = TranspileStats(src)
+        if not src or src.isspace():
+            self.profiler.add(stats)
+            return src
+
+        clock = time.perf_counter
+        start = clock()
+        buf = self.tokenize_buffer(src)
+        stats.record('tokenize', start, len(buf))
+        for name, stage in self.rewrite_stages():
+            start = clock()
+            buf = stage(buf)
+            stats.record(name, start, len(buf))
+
+        start = clock()
+        result = keep_spaces(buf.untokenize(), src)
+        stats.record('untokenize', start, len(buf))
+        self.profiler.add(stats)
+        return result
+
+
+REPETIR = keyword_forms('repetir', 'repita')
+REPETIR_KEYWORDS = REPETIR | {'vezes'}
+ATE = keyword_forms('até')
+DE = frozenset(['de'])
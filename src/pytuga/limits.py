@@ -0,0 +1,352 @@
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+__all__ = ['ResourceMonitor', 'ResourceUsage', 'ResourceLimitError',
+           'MemoryLimitError', 'TimeLimitError']
+
+# Interval between samples (in seconds)
+SAMPLE_INTERVAL = 0.01
+
+# The address space of the process is limited to this multiple of the memory
+# limit. It stops huge allocations that are made at once (e.g., [0] * 10**9)
+# before they reach the operating system; smaller allocations are caught by
+# sampling.
+ADDRESS_SPACE_FACTOR = 2
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class ResourceUsage:
+    """
+    Resources used by the code executed by a :class:`ResourceMonitor`.
+
+    Attributes:
+        time (float):
+            Wall clock time (in seconds).
+        cpu_time (float):
+            CPU time of the process (in seconds).
+        memory (int):
+            Growth of the memory used by the process (in bytes). None if
+            memory is not measured.
+        peak_memory (int):
+            Maximum value of memory in all samples. None if memory is not
+            measured.
+        blocks (int):
+            Number of memory blocks allocated and not released yet.
+        samples (int):
+            Number of times the limits were checked.
+    """
+
+    def __init__(self, time=0.0, cpu_time=0.0, memory=None, peak_memory=None,
+                 blocks=0, samples=0):
+        self.time = time
+        self.cpu_time = cpu_time
+        self.memory = memory
+        self.peak_memory = peak_memory
+        self.blocks = blocks
+        self.samples = samples
+
+    def __repr__(self):
+        peak = '?' if self.peak_memory is None else \
+            format_bytes(self.peak_memory)
+        return '<ResourceUsage: %.2f s, %s peak, %s blocks>' % (
+            self.time, peak, self.blocks)
+
+    def as_dict(self):
+        """
+        Return usage as a JSON-serializable dictionary.
+        """
+
+        return {
+            'time': self.time,
+            'cpu_time': self.cpu_time,
+            'memory': self.memory,
+            'peak_memory': self.peak_memory,
+            'blocks': self.blocks,
+            'samples': self.samples,
+        }
+
+    def to_text(self):
+        """
+        Return a report of the usage in Portuguese.
+        """
+
+        lines = [
+            'tempo: %.3f s' % self.time,
+            'tempo de CPU: %.3f s' % self.cpu_time,
+        ]
+        if self.peak_memory is not None:
+            lines.append('memória máxima: %s' % format_bytes(self.peak_memory))
+        lines.append('blocos de memória: %s' % self.blocks)
+        return '\n'.join(lines)
+
+
+class ResourceLimitError(Exception):
+    """
+    Base class for errors raised when a resource limit is exceeded.
+
+    Attributes:
+        usage (ResourceUsage):
+            Resources used up to the moment the limit was exceeded.
+    """
+
+    def __init__(self, message, usage=None):
+        super().__init__(message)
+        self.usage = usage
+
+
+class MemoryLimitError(ResourceLimitError, MemoryError):
+    """
+    Raised when code exceeds the memory or the allocated blocks limit.
+    """
+
+
+class TimeLimitError(ResourceLimitError, TimeoutError):
+    """
+    Raised when code exceeds the wall clock or the CPU time limit.
+    """
+
+
+class ResourceMonitor:
+    """
+    Context manager that enforces resource limits on the code executed in
+    its block.
+
+    Limits are checked by a SIGALRM handler every SAMPLE_INTERVAL seconds, so
+    the interpreter loop runs at full speed between samples. Memory is the
+    growth of the resident set size of the process, or of the memory traced
+    by tracemalloc on systems without /proc. It is only measured if a memory
+    limit is given. During the block the address space of the process is also
+    limited, so huge allocations fail at once instead of waiting for the next
+    sample.
+
+    The error is raised from the code being executed and again when the block
+    exits, even if the code catches it. It must be used in the main thread
+    of a POSIX system.
+
+    Args:
+        memory (int):
+            Maximum number of bytes allocated by the code.
+        allocations (int):
+            Maximum number of memory blocks allocated by the code and not
+            released.
+        timeout (float):
+            Maximum wall clock time (in seconds).
+        cpu_time (float):
+            Maximum CPU time (in seconds).
+
+    Attributes:
+        usage (ResourceUsage):
+            Resources used by the block. It is updated at each sample and when
+            the block exits.
+
+    Usage:
+
+    >>> with ResourceMonitor(memory=50 * 2**20, timeout=5) as monitor:
+    ...     data = list(range(1000))
+    >>> monitor.usage.time < 5
+    True
+    """
+
+    def __init__(self, memory=None, allocations=None, timeout=None,
+                 cpu_time=None):
+        self.memory = memory
+        self.allocations = allocations
+        self.timeout = timeout
+        self.cpu_time = cpu_time
+        self.usage = ResourceUsage()
+        self.error = None
+        self._state = None
+
+    def __enter__(self):
+        if not hasattr(signal, 'setitimer'):
+            raise RuntimeError('resource limits require a POSIX system')
+        if threading.current_thread() is not threading.main_thread():
+            raise RuntimeError('resource limits only work in the main thread')
+
+        self.usage = ResourceUsage()
+        self.error = None
+        tracing = False
+        if self.memory is not None:
+            self._measure = resident_memory
+            if resident_memory() is None:
+                self._measure = traced_memory
+                tracing = not tracemalloc.is_tracing()
+                if tracing:
+                    tracemalloc.start()
+            self._memory_start = self._measure()
+        rlimit = set_address_space_limit(self.memory)
+
+        self._blocks_start = sys.getallocatedblocks()
+        self._start = time.monotonic()
+        self._cpu_start = time.process_time()
+        handler = signal.signal(signal.SIGALRM, self._sample)
+        timer = signal.setitimer(signal.ITIMER_REAL, SAMPLE_INTERVAL,
+                                 SAMPLE_INTERVAL)
+        self._state = (tracing, rlimit, handler, timer)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        tracing, rlimit, handler, timer = self._state
+        self._state = None
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+        restore_address_space_limit(rlimit)
+        self.update()
+        if tracing:
+            tracemalloc.stop()
+        signal.setitimer(signal.ITIMER_REAL, *timer)
+
+        if self.error is None and exc_type is not None and \
+                issubclass(exc_type, MemoryError) and \
+                not issubclass(exc_type, ResourceLimitError) and \
+                self.memory is not None:
+            self.error = self.memory_error(self.usage.peak_memory)
+            raise self.error from exc
+        if self.error is not None and exc is not self.error:
+            raise self.error
+
+    def update(self):
+        """
+        Update usage with the current values.
+        """
+
+        usage = self.usage
+        usage.time = time.monotonic() - self._start
+        usage.cpu_time = time.process_time() - self._cpu_start
+        usage.blocks = sys.getallocatedblocks() - self._blocks_start
+        if self.memory is not None:
+            usage.memory = self._measure() - self._memory_start
+            usage.peak_memory = max(usage.peak_memory or 0, usage.memory)
+        return usage
+
+    def check(self):
+        """
+        Return a :class:`ResourceLimitError` for the first exceeded limit or
+        None if all limits are respected.
+        """
+
+        usage = self.update()
+        if self.memory is not None and usage.memory > self.memory:
+            return self.memory_error(usage.memory)
+        if self.allocations is not None and usage.blocks > self.allocations:
+            return MemoryLimitError(
+                'limite de alocações excedido: o programa alocou %s blocos '
+                'de memória (limite: %s)' % (usage.blocks, self.allocations),
+                usage)
+        if self.timeout is not None and usage.time > self.timeout:
+            return TimeLimitError(
+                'limite de tempo excedido: o programa executou por %.2f s '
+                '(limite: %.2f s)' % (usage.time, self.timeout), usage)
+        if self.cpu_time is not None and usage.cpu_time > self.cpu_time:
+            return TimeLimitError(
+                'limite de tempo de CPU excedido: o programa usou %.2f s '
+                '(limite: %.2f s)' % (usage.cpu_time, self.cpu_time), usage)
+        return None
+
+    def memory_error(self, used):
+        if used is None or used <= self.memory:
+            message = 'limite de memória excedido: o programa tentou ' \
+                      'alocar mais de %s' % format_bytes(self.memory)
+        else:
+            message = 'limite de memória excedido: o programa usou %s ' \
+                      '(limite: %s)' % (format_bytes(used),
+                                        format_bytes(self.memory))
+        return MemoryLimitError(message, self.usage)
+
+    def _sample(self, signum, frame):
+        self.usage.samples += 1
+        if self.error is None:
+            self.error = self.check()
+        if self.error is not None:
+            raise self.error
+
+
+def resident_memory():
+    """
+    Return the resident set size of the process (in bytes) or None if it
+    cannot be determined.
+    """
+
+    try:
+        with open('/proc/self/statm') as fd:
+            pages = int(fd.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * PAGE_SIZE
+
+
+def address_space():
+    """
+    Return the size of the virtual memory of the current process, or 0 if it
+    cannot be determined.
+    """
+
+    try:
+        with open('/proc/self/statm') as fd:
+            pages = int(fd.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * PAGE_SIZE
+
+
+def traced_memory():
+    """
+    Return the size of the memory blocks traced by tracemalloc (in bytes).
+    """
+
+    return tracemalloc.get_traced_memory()[0]
+
+
+def set_address_space_limit(memory):
+    """
+    Limit the address space of the process to ADDRESS_SPACE_FACTOR * memory
+    bytes on top of its current size.
+
+    Return the previous limits or None if no limit was set.
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    size = address_space()
+    if memory is None or not size:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = size + ADDRESS_SPACE_FACTOR * int(memory)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    if soft != resource.RLIM_INFINITY and soft <= limit:
+        return None
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    return soft, hard
+
+
+def restore_address_space_limit(rlimit):
+    """
+    Restore the limits returned by :func:`set_address_space_limit`.
+    """
+
+    if rlimit is not None:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_AS, rlimit)
+
+
+def format_bytes(size):
+    """
+    Return a human readable string for the given number of bytes.
+    """
+
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return '%.1f %s' % (size, unit) if unit != 'B' else \
+                '%s B' % size
+        size /= 1024
+    return '%.1f GiB' % size
@@ -0,0 +1,243 @@
+import math
+from array import array
+
+from transpyler import math as scalar
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+__all__ = ['raiz_em_lote', 'seno_em_lote', 'cosseno_em_lote',
+           'tangente_em_lote', 'exponencial_em_lote', 'logaritmo_em_lote',
+           'log10_em_lote', 'soma', 'média', 'variância', 'desvio_padrão',
+           'namespace']
+
+_dg = math.pi / 180
+
+
+def batched(function, kernel, name):
+    """
+    Create the batched variant of a scalar function of the Pytuguês runtime.
+
+    The kernel receives a float64 NumPy array and must compute the same
+    values as function. If NumPy is not installed, function is applied to
+    each element.
+    """
+
+    def batched_function(dados):
+        if numpy is None:
+            values = map(function, dados)
+            if isinstance(dados, array):
+                return array('d', values)
+            return list(values)
+
+        values = as_ndarray(dados)
+        with numpy.errstate(all='raise', under='ignore'):
+            try:
+                result = kernel(values)
+            except FloatingPointError as ex:
+                if 'overflow' in str(ex):
+                    raise OverflowError('math range error') from None
+                raise ValueError('math domain error') from None
+        return from_ndarray(result, dados)
+
+    batched_function.__name__ = batched_function.__qualname__ = name
+    batched_function.__doc__ = (
+        """
+        Aplica a função %s() a todos os elementos de uma lista, array ou
+        outra sequência de números e retorna o resultado com o mesmo tipo
+        (uma lista para sequências genéricas).
+
+        Utiliza o NumPy, se estiver instalado, em vez de um laço em Python.
+        """ % function.__name__
+    )
+    return batched_function
+
+
+def as_ndarray(dados):
+    """
+    Return dados as a float64 NumPy array. Arrays are converted without
+    copying when possible.
+    """
+
+    if isinstance(dados, (numpy.ndarray, array)):
+        return numpy.asarray(dados, dtype=numpy.float64)
+    if hasattr(dados, '__len__'):
+        return numpy.array(dados, dtype=numpy.float64)
+    return numpy.fromiter(dados, dtype=numpy.float64)
+
+
+def from_ndarray(result, dados):
+    """
+    Convert the result of a kernel back to the type of dados.
+    """
+
+    if isinstance(dados, numpy.ndarray):
+        return result
+    if isinstance(dados, array):
+        out = array('d')
+        out.frombytes(result.tobytes())
+        return out
+    return result.tolist()
+
+
+def numeric_array(dados):
+    """
+    Return a NumPy view of dados if NumPy is available and dados is a NumPy
+    array or an array.array. Return None otherwise.
+    """
+
+    if numpy is None or not isinstance(dados, (numpy.ndarray, array)):
+        return None
+    return numpy.asarray(dados)
+
+
+#
+# Kernels: they reproduce the special cases of the scalar functions of
+# transpyler.math (angles are in degrees)
+#
+def _sin(values):
+    angle = values % 360
+    result = numpy.sin(angle * _dg)
+    result[(angle == 0) | (angle == 180)] = 0.0
+    return result
+
+
+def _cos(values):
+    angle = values % 360
+    result = numpy.cos(angle * _dg)
+    result[(angle == 90) | (angle == 270)] = 0.0
+    return result
+
+
+def _tan(values):
+    angle = values % 180
+    result = numpy.tan(angle * _dg)
+    result[angle == 45] = 1.0
+    return result
+
+
+def _sqrt(values):
+    return numpy.sqrt(values)
+
+
+def _exp(values):
+    return numpy.exp(values)
+
+
+def _log(values):
+    return numpy.log(values)
+
+
+def _log10(values):
+    return numpy.log10(values)
+
+
+raiz_em_lote = batched(scalar.sqrt, _sqrt, 'raiz_em_lote')
+seno_em_lote = batched(scalar.sin, _sin, 'seno_em_lote')
+cosseno_em_lote = batched(scalar.cos, _cos, 'cosseno_em_lote')
+tangente_em_lote = batched(scalar.tan, _tan, 'tangente_em_lote')
+exponencial_em_lote = batched(scalar.exp, _exp, 'exponencial_em_lote')
+logaritmo_em_lote = batched(scalar.log, _log, 'logaritmo_em_lote')
+log10_em_lote = batched(scalar.log10, _log10, 'log10_em_lote')
+
+
+#
+# Aggregates
+#
+def soma(dados, início=0.0):
+    """
+    Retorna a soma de todos os números da sequência.
+
+    Arrays de números reais são somados pelo NumPy, se estiver instalado.
+    """
+
+    values = numeric_array(dados)
+    if values is not None and values.dtype.kind == 'f':
+        return início + values.sum().item()
+    return sum(dados, início)
+
+
+def média(dados):
+    """
+    Retorna a média aritmética dos números da sequência.
+
+    A sequência é percorrida uma única vez, então também aceita iteradores.
+    """
+
+    values = numeric_array(dados)
+    if values is not None:
+        n, total = values.size, values.sum(dtype=numpy.float64).item()
+    elif hasattr(dados, '__len__'):
+        n, total = len(dados), sum(dados)
+    else:
+        n = total = 0
+        for x in dados:
+            n += 1
+            total += x
+    if n == 0:
+        raise ValueError('não é possível calcular a média de uma sequência '
+                         'vazia')
+    return total / n
+
+
+def variância(dados, populacional=False):
+    """
+    Retorna a variância dos números da sequência.
+
+    Por padrão, calcula a variância amostral (dividindo por n - 1). Passe
+    populacional=Verdadeiro para calcular a variância da população
+    (dividindo por n).
+
+    A sequência é percorrida uma única vez, então também aceita iteradores.
+    """
+
+    ddof = 0 if populacional else 1
+    if numpy is not None and hasattr(dados, '__len__'):
+        values = as_ndarray(dados)
+        n = values.size
+        if n > ddof:
+            return values.var(ddof=ddof).item()
+    else:
+        # Welford's algorithm
+        n, mean, m2 = 0, 0.0, 0.0
+        for x in dados:
+            n += 1
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+        if n > ddof:
+            return m2 / (n - ddof)
+
+    if populacional:
+        raise ValueError('não é possível calcular a variância de uma '
+                         'sequência vazia')
+    raise ValueError('a variância amostral precisa de pelo menos dois '
+                     'valores')
+
+
+def desvio_padrão(dados, populacional=False):
+    """
+    Retorna o desvio padrão dos números da sequência.
+
+    Por padrão, calcula o desvio padrão amostral. Passe
+    populacional=Verdadeiro para calcular o desvio padrão da população.
+    """
+
+    return math.sqrt(variância(dados, populacional))
+
+
+def namespace():
+    """
+    Return a dictionary with the functions of this module for the global
+    namespace of Pytuguês, including the aliases without accents.
+    """
+
+    ns = {name: globals()[name] for name in __all__ if name != 'namespace'}
+    ns.update(
+        media=média,
+        variancia=variância,
+        desvio_padrao=desvio_padrão,
+    )
+    return ns
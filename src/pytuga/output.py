@@ -0,0 +1,227 @@
+import atexit
+import builtins
+import sys
+
+from transpyler.lib import _lib_io
+
+__all__ = ['BufferedOutput', 'flush', 'descarregar_saída']
+
+DEFAULT_SIZE = 64 * 1024
+
+# The installed BufferedOutput, if any
+active = None
+
+
+class BufferedOutput:
+    """
+    Buffer the output of mostrar(), mostrar_formatado(), alerta() and the
+    other output functions of the Pytuguês runtime.
+
+    Text is accumulated in memory and written to the sink in a single call
+    when the buffer reaches the given size, before reading input (leia_texto(),
+    leia_número(), pausar() and input()), when the program exits and when
+    :meth:`flush` or descarregar_saída() are called.
+
+    Calls to print() or mostrar() with an explicit file argument are not
+    buffered. While the buffer is installed with the default sink,
+    sys.stdout is wrapped by a :class:`FlushingStream`, so text written
+    directly to sys.stdout comes out after the buffered text.
+
+    Args:
+        size (int):
+            Number of characters held before the buffer is flushed.
+        sink:
+            A text file or a bytearray that receives the output. A bytearray
+            captures the output in memory, encoded with the given encoding.
+            Defaults to the sys.stdout of the moment the buffer is flushed.
+        encoding (str):
+            Encoding of the text written to a bytearray sink.
+
+    Usage:
+
+    >>> data = bytearray()
+    >>> with BufferedOutput(sink=data):
+    ...     _lib_io.print('olá')
+    >>> data.decode('utf8')
+    'olá\\n'
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, sink=None, encoding='utf8'):
+        self.size = size
+        self.sink = sink
+        self.encoding = encoding
+        self.chunks = []
+        self.pending = 0
+        self._saved = None
+        self._stdout = None
+        self._namespace = self._input = None
+
+    def __repr__(self):
+        return '<BufferedOutput: %s/%s chars>' % (self.pending, self.size)
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *args):
+        self.uninstall()
+
+    def write(self, text):
+        """
+        Append text to the buffer.
+        """
+
+        if self.sink is None and sys.stdout is not self._stdout:
+            self._wrap_stdout()
+        self.chunks.append(text)
+        self.pending += len(text)
+        if self.pending >= self.size:
+            self.flush()
+
+    def print(self, *args, sep=' ', end='\n', file=None, flush=False):
+        """
+        Buffered replacement for the builtin print() function.
+        """
+
+        if file is not None and file is not sys.stdout:
+            builtins.print(*args, sep=sep, end=end, file=file, flush=flush)
+            return
+        sep = ' ' if sep is None else sep
+        end = '\n' if end is None else end
+        self.write(sep.join(map(str, args)) + end)
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all buffered text to the sink.
+        """
+
+        if not self.chunks:
+            return
+        text = ''.join(self.chunks)
+        self.chunks.clear()
+        self.pending = 0
+
+        sink = sys.stdout if self.sink is None else self.sink
+        if sink is self._stdout:
+            sink = sink.stream
+        if isinstance(sink, bytearray):
+            sink.extend(text.encode(self.encoding))
+        else:
+            sink.write(text)
+            sink.flush()
+
+    def install(self, namespace=None):
+        """
+        Replace the output functions of the runtime with buffered versions.
+
+        If a namespace dictionary of Pytuguês programs is given, its input()
+        function also flushes the buffer before reading. The builtin input()
+        is not changed.
+
+        Only one buffer can be installed at a time.
+        """
+
+        global active
+
+        if active is not None:
+            raise RuntimeError('a buffered output is already installed')
+
+        self._saved = (_lib_io._print, _lib_io._input, _lib_io._pause)
+        self._namespace = namespace
+        _lib_io._print = self.print
+        _lib_io._input = self._flushing(self._saved[1])
+        _lib_io._pause = self._flushing(self._saved[2])
+        if namespace is not None:
+            self._input = namespace.get('input')
+            namespace['input'] = self._flushing(self._input or builtins.input)
+        if self.sink is None:
+            self._wrap_stdout()
+        atexit.register(self.flush)
+        active = self
+
+    def uninstall(self):
+        """
+        Flush the buffer and restore the original output functions.
+        """
+
+        global active
+
+        if active is not self:
+            return
+        try:
+            self.flush()
+        finally:
+            _lib_io._print, _lib_io._input, _lib_io._pause = self._saved
+            self._restore_input()
+            if sys.stdout is self._stdout:
+                sys.stdout = self._stdout.stream
+            atexit.unregister(self.flush)
+            self._saved = self._stdout = active = None
+
+    def _restore_input(self):
+        namespace, self._namespace = self._namespace, None
+        if namespace is None:
+            return
+        if self._input is None:
+            namespace.pop('input', None)
+        else:
+            namespace['input'] = self._input
+
+    def _wrap_stdout(self):
+        self._stdout = sys.stdout = FlushingStream(sys.stdout, self)
+
+    def _flushing(self, function):
+        def flushing(*args, **kwargs):
+            self.flush()
+            return function(*args, **kwargs)
+
+        flushing.__name__ = function.__name__
+        flushing.__doc__ = function.__doc__
+        return flushing
+
+
+class FlushingStream:
+    """
+    Wrap a text stream, flushing a :class:`BufferedOutput` before each write.
+
+    All other attributes are taken from the wrapped stream.
+    """
+
+    def __init__(self, stream, buffer):
+        self.stream = stream
+        self.buffer = buffer
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def write(self, text):
+        self.buffer.flush()
+        return self.stream.write(text)
+
+    def writelines(self, lines):
+        self.buffer.flush()
+        self.stream.writelines(lines)
+
+    def flush(self):
+        self.buffer.flush()
+        self.stream.flush()
+
+
+def flush():
+    """
+    Flush the installed :class:`BufferedOutput`, if any.
+    """
+
+    if active is not None:
+        active.flush()
+
+
+def descarregar_saída():
+    """
+    Mostra imediatamente todo o texto que aguarda no buffer de saída.
+    """
+
+    flush()
+    sys.stdout.flush()
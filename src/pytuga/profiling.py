@@ -0,0 +1,131 @@
+import json
+import time
+
+__all__ = ['TranspileStats', 'TranspileProfiler']
+
+
+class TranspileStats:
+    """
+    Timers and token counts for each stage of a single transpilation.
+
+    Stages are recorded in the order they run: "tokenize", each rewrite pass
+    of the lexer ("sequences", "translations", "repetir" and "de_ate") and
+    "untokenize". The number of tokens of a stage is the size of its output.
+
+    Attributes:
+        lines (int):
+            Number of lines in the source.
+        chars (int):
+            Number of characters in the source.
+        stages (list):
+            A list of (name, seconds, tokens) tuples.
+    """
+
+    def __init__(self, src):
+        self.lines = src.count('\n') + (not src.endswith('\n'))
+        self.chars = len(src)
+        self.stages = []
+
+    def __repr__(self):
+        return '<TranspileStats: %s lines, %.2f ms>' % (
+            self.lines, self.total * 1000)
+
+    @property
+    def total(self):
+        """
+        Total time spent in all stages (in seconds).
+        """
+
+        return sum(seconds for _, seconds, _ in self.stages)
+
+    def record(self, name, start, tokens):
+        """
+        Record a stage that started at the given time.perf_counter() value and
+        produced the given number of tokens.
+        """
+
+        self.stages.append((name, time.perf_counter() - start, tokens))
+
+    def as_dict(self):
+        """
+        Return stats as a JSON-serializable dictionary.
+        """
+
+        return {
+            'lines': self.lines,
+            'chars': self.chars,
+            'total_ms': self.total * 1000,
+            'stages': [
+                {'name': name, 'ms': seconds * 1000, 'tokens': tokens}
+                for name, seconds, tokens in self.stages
+            ],
+        }
+
+    def to_json(self):
+        """
+        Return stats as a JSON string in a single line.
+        """
+
+        return json.dumps(self.as_dict())
+
+
+class TranspileProfiler:
+    """
+    Collect the :class:`TranspileStats` of all transpilations.
+
+    Install a profiler by setting the "profiler" attribute of the transpyler.
+    It is None by default and the lexer only checks this attribute once per
+    transpilation, so profiling has no cost when disabled. Sources served from
+    the transpile cache are not transpiled and thus are not recorded.
+
+    Args:
+        callback:
+            A function called with the stats of each transpilation.
+        keep (bool):
+            If True (default), store all stats in the "history" list.
+    """
+
+    def __init__(self, callback=None, keep=True):
+        self.callback = callback
+        self.keep = keep
+        self.history = []
+        self.count = 0
+        self.totals = {}
+
+    def __repr__(self):
+        return '<TranspileProfiler: %s calls>' % self.count
+
+    def add(self, stats):
+        """
+        Register the stats of a transpilation.
+        """
+
+        self.count += 1
+        for name, seconds, tokens in stats.stages:
+            total = self.totals.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += tokens
+        if self.keep:
+            self.history.append(stats)
+        if self.callback is not None:
+            self.callback(stats)
+
+    def as_dict(self):
+        """
+        Return the accumulated totals as a JSON-serializable dictionary.
+        """
+
+        return {
+            'calls': self.count,
+            'stages': [
+                {'name': name, 'ms': seconds * 1000, 'tokens': tokens}
+                for name, (seconds, tokens) in self.totals.items()
+            ],
+        }
+
+    def to_json(self):
+        """
+        Return accumulated totals as a JSON string.
+        """
+
+        return json.dumps(self.as_dict())
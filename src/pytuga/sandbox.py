@@ -0,0 +1,330 @@
+import builtins
+import io
+import os
+import pickle
+import select
+import signal
+import sys
+import time
+
+from lazyutils import lazy
+
+from . import output
+from .limits import address_space
+from .server import exit_status, print_exception
+
+__all__ = ['ExecutionPool', 'RunResult']
+
+
+class RunResult:
+    """
+    Result of a program executed by an :class:`ExecutionPool`.
+
+    Attributes:
+        status (str):
+            One of 'ok', 'error' (uncaught exception or non-zero exit status),
+            'timeout' (wall clock limit exceeded), 'cpu' (CPU time limit
+            exceeded), 'memory' (memory limit exceeded) or 'killed' (the
+            process was terminated by some other signal).
+        exit_status (int):
+            Exit status of the program.
+        stdout, stderr (str):
+            Captured output. Output is lost if the process is killed.
+        time (float):
+            Wall clock time of the run (in seconds).
+    """
+
+    def __init__(self, status, exit_status=0, stdout='', stderr='', time=0.0):
+        self.status = status
+        self.exit_status = exit_status
+        self.stdout = stdout
+        self.stderr = stderr
+        self.time = time
+
+    def __repr__(self):
+        return '<RunResult: %s (%.2f ms)>' % (self.status, self.time * 1000)
+
+    @property
+    def ok(self):
+        """
+        True if the program finished successfully.
+        """
+
+        return self.status == 'ok'
+
+
+class ExecutionPool:
+    """
+    Run Pytuguês programs in isolated processes with resource limits.
+
+    Each worker process of the pool initializes the runtime (curses, lexer
+    tables and the global namespace) once. Programs run in a child forked from
+    a worker, so they start from a copy-on-write clone of the prebuilt
+    namespace and cannot affect other runs.
+
+    Limits given to the constructor are the defaults for all runs and can be
+    overridden by the keyword arguments of :meth:`submit`. None disables a
+    limit.
+
+    Args:
+        workers (int):
+            Number of worker processes. Defaults to the number of CPUs.
+        cpu_time (int):
+            Maximum CPU time of each run (in seconds).
+        memory (int):
+            Maximum number of bytes each run can allocate on top of the
+            memory used by the runtime.
+        timeout (float):
+            Maximum wall clock time of each run (in seconds).
+
+    Usage:
+
+    >>> with ExecutionPool(timeout=5) as pool:               # doctest: +SKIP
+    ...     result = pool.run('repetir 2 vezes: mostre("olá")')
+    >>> result.stdout                                        # doctest: +SKIP
+    'olá\\nolá\\n'
+    """
+
+    def __init__(self, workers=None, cpu_time=None, memory=None,
+                 timeout=None):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('execution pools require a POSIX system')
+
+        self.workers = workers or os.cpu_count() or 1
+        self.cpu_time = cpu_time
+        self.memory = memory
+        self.timeout = timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    @lazy
+    def executor(self):
+        from concurrent.futures import ProcessPoolExecutor
+
+        return ProcessPoolExecutor(self.workers, initializer=init_worker)
+
+    def submit(self, source, stdin='', **limits):
+        """
+        Schedule the execution of source and return a
+        concurrent.futures.Future with its :class:`RunResult`.
+
+        Args:
+            source (str):
+                Pytuguês source code.
+            stdin (str):
+                Data available to the program in the standard input.
+            cpu_time, memory, timeout:
+                Override the limits of the pool.
+        """
+
+        args = (source, stdin) + self._limits(**limits)
+        return self.executor.submit(run_item, args)
+
+    def run(self, source, stdin='', **limits):
+        """
+        Execute source and return its :class:`RunResult`.
+
+        Accept the same arguments as :meth:`submit`.
+        """
+
+        return self.submit(source, stdin, **limits).result()
+
+    def map(self, sources, stdin='', **limits):
+        """
+        Execute a sequence of sources in parallel and return a list with
+        their results, in the same order.
+        """
+
+        futures = [self.submit(src, stdin, **limits) for src in sources]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """
+        Stop all worker processes.
+        """
+
+        executor = self.__dict__.pop('executor', None)
+        if executor is not None:
+            executor.shutdown()
+
+    def _limits(self, cpu_time=None, memory=None, timeout=None):
+        return (
+            self.cpu_time if cpu_time is None else cpu_time,
+            self.memory if memory is None else memory,
+            self.timeout if timeout is None else timeout,
+        )
+
+
+#
+# Worker functions
+#
+# A (transpyler, namespace) pair in the worker processes
+_worker = None
+
+
+def init_worker():
+    """
+    Initialize the runtime and the base namespace in the worker process.
+    """
+
+    global _worker
+    from .transpyler import PytugaTranspyler
+
+    transpyler = PytugaTranspyler()
+    transpyler.init()
+    transpyler.transpile('prossiga\n')
+
+    namespace = {'__name__': '__main__', '__builtins__': builtins}
+    namespace.update(transpyler.namespace)
+    _worker = transpyler, namespace
+
+
+def run_item(args):
+    """
+    Run a program in a forked child of the worker and return its RunResult.
+    """
+
+    source, stdin, cpu_time, memory, timeout = args
+    if _worker is None:
+        init_worker()
+
+    start = time.perf_counter()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        run_forked_child(write_fd, source, stdin, cpu_time, memory)
+
+    os.close(write_fd)
+    data, timed_out = read_output(read_fd, timeout)
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    _, wait_status, rusage = os.wait4(pid, 0)
+    elapsed = time.perf_counter() - start
+
+    if timed_out:
+        return RunResult('timeout', -signal.SIGKILL, time=elapsed)
+    if data:
+        status, exit_status, stdout, stderr = pickle.loads(data)
+        return RunResult(status, exit_status, stdout, stderr, elapsed)
+    return killed_result(wait_status, rusage, cpu_time, memory, elapsed)
+
+
+def run_forked_child(write_fd, source, stdin, cpu_time, memory):
+    """
+    Run program in the forked child and write the pickled result of
+    :func:`run_child` to write_fd. Never returns.
+    """
+
+    try:
+        set_limits(cpu_time, memory)
+        result = run_child(source, stdin)
+        with os.fdopen(write_fd, 'wb') as fd:
+            fd.write(pickle.dumps(result))
+    finally:
+        os._exit(0)
+
+
+def killed_result(wait_status, rusage, cpu_time, memory, elapsed):
+    """
+    Return the RunResult of a child that exited without sending a result.
+
+    A SIGKILL is only reported as 'cpu' if the CPU time in rusage reached the
+    limit. Otherwise it is reported as 'memory' if a memory limit was set,
+    since the kernel kills processes that run out of memory, or as 'killed'.
+    """
+
+    if not os.WIFSIGNALED(wait_status):
+        return RunResult('killed', os.waitstatus_to_exitcode(wait_status),
+                         time=elapsed)
+
+    signum = os.WTERMSIG(wait_status)
+    used = rusage.ru_utime + rusage.ru_stime
+    status = 'killed'
+    if cpu_time is not None and signum == signal.SIGXCPU:
+        status = 'cpu'
+    elif cpu_time is not None and signum == signal.SIGKILL and \
+            used >= cpu_seconds(cpu_time):
+        status = 'cpu'
+    elif signum == signal.SIGKILL and memory is not None:
+        status = 'memory'
+    return RunResult(status, -signum, time=elapsed)
+
+
+def cpu_seconds(cpu_time):
+    """
+    Return the soft RLIMIT_CPU limit (in whole seconds) for cpu_time.
+    """
+
+    return max(1, int(cpu_time))
+
+
+def set_limits(cpu_time, memory):
+    """
+    Set resource limits for the current process.
+    """
+
+    import resource
+
+    if cpu_time is not None:
+        cpu_time = cpu_seconds(cpu_time)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, cpu_time + 1))
+    if memory is not None:
+        limit = address_space() + int(memory)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def read_output(fd, timeout):
+    """
+    Read fd until EOF or until timeout seconds have passed.
+
+    Return a tuple (data, timed_out).
+    """
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    chunks = []
+    try:
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [],
+                                                       remaining)[0]:
+                    return b''.join(chunks), True
+            data = os.read(fd, 65536)
+            if not data:
+                return b''.join(chunks), False
+            chunks.append(data)
+    finally:
+        os.close(fd)
+
+
+def run_child(source, stdin):
+    """
+    Execute source in the base namespace, capturing the standard streams.
+
+    Return a tuple (status, exit_status, stdout, stderr).
+    """
+
+    transpyler, namespace = _worker
+    sys.stdin = io.StringIO(stdin or '')
+    sys.stdout = stdout = io.StringIO()
+    sys.stderr = stderr = io.StringIO()
+
+    status, code = 'ok', 0
+    try:
+        exec(transpyler.compile(source, '<programa>', 'exec'), namespace)
+    except SystemExit as ex:
+        code = exit_status(ex.code)
+        status = 'ok' if code == 0 else 'error'
+    except MemoryError:
+        status, code = 'memory', 1
+        stderr.write('MemoryError: limite de memória excedido\n')
+    except BaseException as ex:  # noqa: B902
+        print_exception(transpyler, ex, source, '<programa>')
+        status, code = 'error', 1
+    output.flush()
+    return status, code, stdout.getvalue(), stderr.getvalue()
@@ -0,0 +1,189 @@
+import os
+import signal
+import socket
+import sys
+import traceback
+
+from pytuga_client import HEADER, check_owner, default_address, recv_request
+
+from . import output
+
+__all__ = ['start_server', 'run_path']
+
+
+def start_server(transpyler, address=None):
+    """
+    Start a server that runs Pytuguês programs sent by pytuga-client.
+
+    The server process initializes the runtime (curses, global namespace and
+    lexer tables) once and forks a fresh child for each request, so programs
+    start without paying the interpreter and import costs.
+
+    Args:
+        transpyler:
+            The transpyler instance used to run programs.
+        address (str):
+            Path of the Unix socket. Defaults to the value returned by
+            :func:`pytuga_client.default_address`.
+    """
+
+    if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+        raise RuntimeError('server mode requires a POSIX system')
+
+    # Preload runtime
+    transpyler.init()
+    transpyler.transpile('prossiga\n')
+
+    address = address or default_address()
+    server = bind_socket(address)
+
+    # Children are reaped automatically and SIGTERM removes the socket file
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        while True:
+            conn, _ = server.accept()
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                serve_request(transpyler, conn)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+def bind_socket(address):
+    """
+    Create a listening Unix socket at address that is only accessible by the
+    current user.
+
+    The directory of the socket is created with mode 0700 if it does not
+    exist. A stale socket file is only removed if it belongs to the current
+    user.
+    """
+
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if os.path.lexists(address):
+        check_owner(address)
+        os.unlink(address)
+    else:
+        check_owner(directory)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        server.bind(address)
+    finally:
+        os.umask(umask)
+    server.listen(64)
+    return server
+
+
+def serve_request(transpyler, conn):
+    """
+    Run a single request in the current (forked) process and exit.
+
+    Besides "argv" and "cwd", requests may have a "source" key with the
+    program source, which is used instead of reading the file at argv[0]. If
+    the "report_pid" key is true, the pid of the process is sent before the
+    exit status, so the client can kill the program.
+    """
+
+    status = 1
+    try:
+        try:
+            request, fds = recv_request(conn)
+        except EOFError:
+            os._exit(status)
+        if request.get('report_pid'):
+            conn.sendall(HEADER.pack(os.getpid()))
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(request['cwd'])
+        status = run_path(transpyler, request['argv'], request.get('source'))
+    except BaseException:  # noqa: B902 (we never return to the server loop)
+        traceback.print_exc()
+    finally:
+        try:
+            conn.sendall(HEADER.pack(status))
+        finally:
+            os._exit(status)
+
+
+def run_path(transpyler, argv, source=None):
+    """
+    Run the Pytuguês program at argv[0] as the __main__ module.
+
+    If source is given, it is used instead of the contents of the file.
+    Returns the exit status of the program.
+    """
+
+    path = argv[0]
+    sys.argv[:] = argv
+    sys.path[0] = os.path.dirname(os.path.abspath(path))
+    source_map = None
+
+    try:
+        if source is None:
+            with open(path, encoding='utf8') as fd:
+                source = fd.read()
+
+        # The transpiled source is cached, so compile() does not transpile
+        # it again and errors are reported without a second transpilation
+        _, source_map = transpyler.transpile(source, source_map=True)
+        code = transpyler.compile(source, path, 'exec')
+        transpyler.exec(code, {'__name__': '__main__', '__file__': path})
+    except SystemExit as ex:
+        return exit_status(ex.code)
+    except BaseException as ex:  # noqa: B902
+        output.flush()
+        print_mapped_exception(ex, source_map, path)
+        return 1
+    finally:
+        output.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return 0
+
+
+def print_exception(transpyler, ex, source, path):
+    """
+    Print traceback with the positions of the Pytuguês source.
+    """
+
+    source_map = None
+    if source is not None:
+        try:
+            _, source_map = transpyler.transpile(source, source_map=True)
+        except SyntaxError:
+            pass
+    print_mapped_exception(ex, source_map, path)
+
+
+def print_mapped_exception(ex, source_map, path):
+    """
+    Print traceback with the positions of the Pytuguês source given by
+    source_map, which may be None.
+    """
+
+    if source_map is None:
+        traceback.print_exception(type(ex), ex, ex.__traceback__)
+    else:
+        sys.stderr.write(''.join(source_map.format_exception(ex, path)))
+
+
+def exit_status(code):
+    if code is None:
+        return 0
+    elif isinstance(code, int):
+        return code & 0xFF
+    print(code, file=sys.stderr)
+    return 1
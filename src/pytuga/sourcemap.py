@@ -0,0 +1,198 @@
+import traceback
+from array import array
+
+from lazyutils import lazy
+
+__all__ = ['SourceMap']
+
+
+class SourceMap:
+    """
+    Map positions in the transpiled Python code back to the Pytuguês source.
+
+    Rewrites never move tokens to a different line, so only columns must be
+    mapped. Lines whose columns are unchanged are not stored. Every other line
+    has an array with the column delta for each column of the Python line, so
+    :meth:`lookup` takes constant time.
+
+    Source maps are created by ``transpile(src, source_map=True)``.
+
+    Args:
+        source (str):
+            Pytuguês source code.
+        python (str):
+            Transpiled Python code.
+        tables (list):
+            A list with the delta table for each line (or None, for lines
+            without changes).
+    """
+
+    def __init__(self, source, python, tables):
+        self.source = source
+        self.python = python
+        self.tables = tables
+
+    # Lines are split once, when they are first needed
+    source_lines = lazy(lambda self: self.source.splitlines(True))
+    python_lines = lazy(lambda self: self.python.splitlines())
+
+    @classmethod
+    def from_tokens(cls, source, python, tokens):
+        """
+        Create source map from a list of transpiled tokens.
+
+        Each token must have an "origin" attribute with the start position of
+        the Pytuguês token it derives from.
+        """
+
+        positions = ((tk.start[0], tk.start[1], tk.origin[1])
+                     for tk in tokens if getattr(tk, 'origin', None))
+        return cls.from_positions(source, python, positions)
+
+    @classmethod
+    def from_buffer(cls, source, python, buf):
+        """
+        Create source map from a :class:`pytuga.tokens.TokenBuffer` that
+        tracks origins.
+        """
+
+        positions = zip(buf.lines, buf.cols, buf.origins)
+        return cls.from_positions(source, python, positions)
+
+    @classmethod
+    def from_positions(cls, source, python, positions):
+        """
+        Create source map from an iterable of (lineno, col, origin_col)
+        tuples with the start position of each Python token and the column of
+        the Pytuguês token it derives from.
+        """
+
+        # Segments of (python col, delta) for each changed line
+        segments = {}
+        for lineno, col, origin in positions:
+            delta = origin - col
+            line_segments = segments.get(lineno)
+            if line_segments is None:
+                if not delta:
+                    continue
+                line_segments = segments[lineno] = [(0, 0)]
+            line_segments.append((col, delta))
+
+        lines = python.splitlines()
+        tables = [None] * len(lines)
+        for lineno, line_segments in segments.items():
+            if lineno > len(lines):
+                continue
+            table = array('i', bytes(4 * (len(lines[lineno - 1]) + 1)))
+            line_segments.append((len(table), 0))
+            for (start, delta), (end, _) in zip(line_segments,
+                                                line_segments[1:]):
+                table[start:end] = array('i', [delta]) * (end - start)
+            tables[lineno - 1] = table
+        return cls(source, python, tables)
+
+    def __repr__(self):
+        changed = sum(1 for table in self.tables if table is not None)
+        return '<SourceMap: %s lines, %s changed>' % (
+            len(self.tables), changed)
+
+    def lookup(self, lineno, col):
+        """
+        Return the (lineno, col) position in the Pytuguês source that
+        corresponds to the given position in the Python code.
+
+        Line numbers start at 1 and columns start at 0, as in the tokenize
+        module.
+        """
+
+        try:
+            table = self.tables[lineno - 1]
+        except IndexError:
+            return lineno, col
+        if table is None:
+            return lineno, col
+        return lineno, col + table[min(col, len(table) - 1)]
+
+    def lookup_bytes(self, lineno, col):
+        """
+        Like :meth:`lookup`, but columns are offsets in the UTF-8 encoded
+        lines, as in the positions of code objects.
+        """
+
+        if not 0 < lineno <= len(self.tables) or \
+                self.tables[lineno - 1] is None:
+            return lineno, col
+
+        python_line = self.python_lines[lineno - 1]
+        col = len(python_line.encode('utf8')[:col].decode('utf8', 'ignore'))
+        lineno, col = self.lookup(lineno, col)
+        source_line = self.source_line(lineno)
+        return lineno, len(source_line[:col].encode('utf8'))
+
+    def source_line(self, lineno):
+        """
+        Return the given line of Pytuguês source, as in linecache.getline().
+        """
+
+        lines = self.source_lines
+        return lines[lineno - 1] if 0 < lineno <= len(lines) else ''
+
+    def format_exception(self, exc, filename='<string>'):
+        """
+        Format exception as in traceback.format_exception(), replacing
+        positions in the code compiled from filename by their positions in
+        the Pytuguês source.
+        """
+
+        tb_exc = traceback.TracebackException.from_exception(exc)
+        self.rewrite_traceback(tb_exc, filename)
+        return list(tb_exc.format())
+
+    def rewrite_traceback(self, tb_exc, filename='<string>'):
+        """
+        Rewrite a traceback.TracebackException (and its causes) in place.
+        """
+
+        seen = set()
+        while tb_exc is not None and id(tb_exc) not in seen:
+            seen.add(id(tb_exc))
+            tb_exc.stack[:] = [self._rewrite_frame(frame, filename)
+                               for frame in tb_exc.stack]
+            if tb_exc.exc_type is not None and \
+                    issubclass(tb_exc.exc_type, SyntaxError) and \
+                    tb_exc.filename == filename:
+                self._rewrite_syntax_error(tb_exc)
+            tb_exc = tb_exc.__cause__ or tb_exc.__context__
+
+    def _rewrite_frame(self, frame, filename):
+        if frame.filename != filename:
+            return frame
+
+        lineno = frame.lineno
+        kwargs = {}
+        colno = getattr(frame, 'colno', None)
+        end_colno = getattr(frame, 'end_colno', None)
+        end_lineno = getattr(frame, 'end_lineno', None)
+        if colno is not None:
+            kwargs['colno'] = self.lookup_bytes(lineno, colno)[1]
+        if end_colno is not None and end_lineno is not None:
+            end_colno = self.lookup_bytes(end_lineno, end_colno)[1]
+            kwargs.update(end_lineno=end_lineno, end_colno=end_colno)
+        return traceback.FrameSummary(
+            frame.filename, lineno, frame.name, lookup_line=False,
+            locals=frame.locals, line=self.source_line(lineno), **kwargs
+        )
+
+    def _rewrite_syntax_error(self, tb_exc):
+        # TracebackException stores line numbers as strings
+        if tb_exc.lineno is None:
+            return
+        lineno = int(tb_exc.lineno)
+        if tb_exc.offset is not None:
+            tb_exc.offset = self.lookup(lineno, tb_exc.offset - 1)[1] + 1
+        end_offset = getattr(tb_exc, 'end_offset', None)
+        end_lineno = getattr(tb_exc, 'end_lineno', None)
+        if end_offset is not None and end_lineno is not None:
+            end_lineno = int(end_lineno)
+            tb_exc.end_offset = self.lookup(end_lineno, end_offset - 1)[1] + 1
+        tb_exc.text = self.source_line(lineno)
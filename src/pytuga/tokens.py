@@ -0,0 +1,371 @@
+import io
+import tokenize
+from array import array
+from tokenize import (NAME, NUMBER, OP, NEWLINE, NL, INDENT, DEDENT,
+                      ENDMARKER, TokenInfo)
+
+from transpyler.token import Token
+
+__all__ = ['TokenBuffer', 'StringTable', 'StreamUntokenizer', 'token_end']
+
+
+class StringTable(list):
+    """
+    A list of unique strings with a reverse index.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.index = {}
+
+    def intern(self, string):
+        """
+        Return the position of string in the table, adding it if necessary.
+        """
+
+        try:
+            return self.index[string]
+        except KeyError:
+            idx = self.index[string] = len(self)
+            self.append(string)
+            return idx
+
+
+class TokenBuffer:
+    """
+    Compact storage for a sequence of tokens.
+
+    Tokens are stored as a struct of arrays: each token is represented by its
+    type, the index of its string in a string table and the line and column of
+    its start position. End positions are computed from the strings. Buffers
+    created with :meth:`new` share the string table of the original buffer.
+
+    If the optional origins array is present, it stores the column of the
+    source token each token derives from (see :class:`pytuga.sourcemap.
+    SourceMap`).
+
+    Line numbers start at first_line, so a buffer can hold a fragment of a
+    larger source and still report its absolute line numbers.
+
+    Args:
+        source (str):
+            Source code the tokens were extracted from. It is only used to
+            show the offending line in error messages.
+        table (StringTable):
+            The string table. A new table is created if not given.
+        first_line (int):
+            Line number of the first line of source.
+    """
+
+    __slots__ = ('source', 'table', 'types', 'strings', 'lines', 'cols',
+                 'origins', 'first_line')
+
+    def __init__(self, source='', table=None, first_line=1):
+        self.source = source
+        self.first_line = first_line
+        self.table = StringTable() if table is None else table
+        self.types = array('B')
+        self.strings = array('I')
+        self.lines = array('I')
+        self.cols = array('I')
+        self.origins = None
+
+    @classmethod
+    def from_source(cls, src, origins=False, first_line=1):
+        """
+        Tokenize source string.
+
+        Tokenization stops silently at the first tokenize.TokenError, as in
+        :meth:`pytuga.lexer.PytugaLexer.tokenize`. If origins is True, the
+        buffer tracks the original column of each token.
+        """
+
+        buf = cls(src, first_line=first_line)
+        offset = first_line - 1
+        intern = buf.table.intern
+        types, strings = buf.types.append, buf.strings.append
+        lines, cols = buf.lines.append, buf.cols.append
+
+        readline = io.StringIO(src).readline
+        try:
+            for tk in tokenize.generate_tokens(readline):
+                types(tk[0])
+                strings(intern(tk[1]))
+                lineno, col = tk[2]
+                lines(lineno + offset)
+                cols(col)
+        except tokenize.TokenError:
+            pass
+
+        if origins:
+            buf.origins = array('I', buf.cols)
+        return buf
+
+    @classmethod
+    def iter_logical_lines(cls, readline):
+        """
+        Tokenize source read from the readline function and yield a buffer
+        for each logical line.
+
+        Comments and blank lines go to the buffer of the following logical
+        line. Each buffer has its own string table and keeps the absolute
+        line numbers of its tokens, so only the current logical line is held
+        in memory. Tokenization stops silently at the first
+        tokenize.TokenError, as in :meth:`from_source`.
+        """
+
+        lines = []
+
+        def read():
+            line = readline()
+            lines.append(line)
+            return line
+
+        buf = cls(first_line=1)
+        append = buf.append
+        try:
+            for tk in tokenize.generate_tokens(read):
+                lineno, col = tk[2]
+                append(tk[0], tk[1], lineno, col)
+                if tk[0] == NEWLINE:
+                    last = tk[3][0]
+                    size = last - buf.first_line + 1
+                    buf.source = ''.join(lines[:size])
+                    del lines[:size]
+                    yield buf
+                    buf = cls(first_line=last + 1)
+                    append = buf.append
+        except tokenize.TokenError:
+            pass
+
+        if len(buf) or any(lines):
+            buf.source = ''.join(lines)
+            yield buf
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """
+        Create buffer from a sequence of Token objects.
+        """
+
+        buf = cls()
+        for tk in tokens:
+            buf.append(tk.type, tk.string, *tk.start)
+        return buf
+
+    def __len__(self):
+        return len(self.types)
+
+    def __repr__(self):
+        return '<TokenBuffer: %s tokens>' % len(self)
+
+    def new(self):
+        """
+        Return an empty buffer that shares the source and string table of this
+        buffer and tracks origins if this buffer does.
+        """
+
+        buf = TokenBuffer(self.source, self.table, self.first_line)
+        if self.origins is not None:
+            buf.origins = array('I')
+        return buf
+
+    def append(self, type, string, lineno, col, origin=0):
+        """
+        Append token with the given type and string at the given position.
+        """
+
+        self.types.append(type)
+        self.strings.append(self.table.intern(string))
+        self.lines.append(lineno)
+        self.cols.append(col)
+        if self.origins is not None:
+            self.origins.append(origin)
+
+    def copy_token(self, buf, idx, col):
+        """
+        Append the token at position idx of buf, moving it to the given
+        column.
+        """
+
+        self.types.append(buf.types[idx])
+        self.strings.append(buf.strings[idx])
+        self.lines.append(buf.lines[idx])
+        self.cols.append(col)
+        if self.origins is not None:
+            self.origins.append(buf.origins[idx])
+
+    def extend(self, buf, start, stop):
+        """
+        Append the tokens from position start up to stop of buf, which must
+        share the string table of this buffer.
+        """
+
+        self.types += buf.types[start:stop]
+        self.strings += buf.strings[start:stop]
+        self.lines += buf.lines[start:stop]
+        self.cols += buf.cols[start:stop]
+        if self.origins is not None:
+            self.origins += buf.origins[start:stop]
+
+    def append_strings(self, lineno, col, strings, origin=0):
+        """
+        Append new tokens with the given strings starting at the given
+        position, as in Token.from_strings(). Return the end position of
+        the last token.
+        """
+
+        is_fragile = False
+        for string in strings:
+            is_identifier = string.isidentifier()
+            if is_fragile and is_identifier:
+                col += 1
+            type = string_type(string)
+            self.append(type, string, lineno, col, origin)
+            lineno, col = token_end(lineno, col, string, type)
+            is_fragile = is_identifier
+        return lineno, col
+
+    def string(self, idx):
+        """
+        Return the string of the token at the given position.
+        """
+
+        return self.table[self.strings[idx]]
+
+    def end(self, idx):
+        """
+        Return the end position of the token at the given position.
+        """
+
+        return token_end(self.lines[idx], self.cols[idx], self.string(idx),
+                         self.types[idx])
+
+    def source_line(self, lineno):
+        """
+        Return the given line of the source code.
+        """
+
+        lineno -= self.first_line - 1
+        lines = self.source.splitlines(True)
+        return lines[lineno - 1] if 0 < lineno <= len(lines) else ''
+
+    def token_info(self):
+        """
+        Iterate over tokens as tokenize.TokenInfo tuples.
+
+        Line numbers are relative to the start of the buffer source.
+        """
+
+        table = self.table
+        offset = self.first_line - 1
+        for type, string, lineno, col in zip(self.types, self.strings,
+                                             self.lines, self.cols):
+            string = table[string]
+            lineno -= offset
+            end = token_end(lineno, col, string, type)
+            yield TokenInfo(type, string, (lineno, col), end, '')
+
+    def to_tokens(self):
+        """
+        Return a list of Token objects.
+        """
+
+        return [Token(tk) for tk in self.token_info()]
+
+    def untokenize(self):
+        """
+        Convert tokens back to a string of source code.
+        """
+
+        return tokenize.untokenize(self.token_info())
+
+
+class StreamUntokenizer:
+    """
+    Convert the consecutive buffers of :meth:`TokenBuffer.iter_logical_lines`
+    back to source code.
+
+    It works as tokenize.untokenize() applied to the concatenation of all
+    buffers, but only keeps the indentation stack and the position of the
+    last token between calls.
+    """
+
+    def __init__(self):
+        self.indents = []
+        self.startline = False
+        self.prev_row = 1
+        self.prev_col = 0
+
+    def untokenize(self, buf):
+        """
+        Return the source code for the tokens in buf.
+        """
+
+        out = []
+        table = buf.table
+        for type, string, row, col in zip(buf.types, buf.strings, buf.lines,
+                                          buf.cols):
+            string = table[string]
+            if type in INDENTATION_TYPES:
+                self._indentation(type, string, row, col)
+                continue
+            if type == NEWLINE or type == NL:
+                self.startline = True
+            elif self.startline:
+                self._start_line(out, col)
+
+            if row > self.prev_row:
+                out.append('\\\n' * (row - self.prev_row))
+                self.prev_col = 0
+            if col > self.prev_col:
+                out.append(' ' * (col - self.prev_col))
+            out.append(string)
+            self.prev_row, self.prev_col = (
+                (row + 1, 0) if type == NEWLINE or type == NL
+                else token_end(row, col, string, type)
+            )
+        return ''.join(out)
+
+    def _indentation(self, type, string, row, col):
+        # INDENT, DEDENT and ENDMARKER tokens do not produce any output
+        if type == INDENT:
+            self.indents.append(string)
+        elif type == DEDENT:
+            self.indents.pop()
+            self.prev_row, self.prev_col = row, col
+
+    def _start_line(self, out, col):
+        # Indent the first token of a line
+        self.startline = False
+        if self.indents:
+            indent = self.indents[-1]
+            if col >= len(indent):
+                out.append(indent)
+                self.prev_col = len(indent)
+
+
+INDENTATION_TYPES = frozenset([INDENT, DEDENT, ENDMARKER])
+
+
+def token_end(lineno, col, string, type=None):
+    """
+    Return the end position of a token that starts at (lineno, col).
+    """
+
+    if type in (NEWLINE, NL) or '\n' not in string:
+        return lineno, col + len(string)
+    return (lineno + string.count('\n'),
+            len(string) - string.rindex('\n') - 1)
+
+
+def string_type(string):
+    """
+    Return the token type of a string created by a rewrite.
+    """
+
+    if string.isidentifier():
+        return NAME
+    elif string[:1].isdigit():
+        return NUMBER
+    return OP
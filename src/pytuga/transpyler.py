@@ -1,10 +1,16 @@
+import os
 import sys
+import types
 
+from lazyutils import lazy
 from transpyler import Transpyler
-from transpyler.curses import curse_none_repr, curse_bool_repr, apply_curses
-from transpyler.utils import pretty_callable
+from transpyler.utils import pretty_callable, has_qt
 from . import __version__
+from . import batch
 from . import curses
+from . import output
+from . import profiling
+from .cache import TranspileCache
 from .keywords import TRANSLATIONS, SEQUENCE_TRANSLATIONS, ERROR_GROUPS
 from .lexer import PytugaLexer
 
@@ -22,20 +28,378 @@ class PytugaTranspyler(Transpyler):
     error_dict = ERROR_GROUPS
     lang = 'pt_BR'
 
+    # Transpilation cache. The on-disk tier is only used if cache_dir is set.
+    cache_size = 256
+    cache_dir = os.environ.get('PYTUGA_CACHE_DIR')
+    transpile_cache = lazy(
+        lambda self: TranspileCache(self, self.cache_size, self.cache_dir)
+    )
+
+    # If true, curses for builtin types are only applied to the attributes
+    # referenced by the compiled code.
+    lazy_curses = bool(os.environ.get('PYTUGA_LAZY_CURSES'))
+    lazy_curse_map = lazy(lambda self: curses.LazyCurses())
+
+    # Compiler backend: 'tokens' compiles the transpiled source and 'ast'
+    # rewrites the syntax tree (see pytuga.astbackend). It does not affect
+    # transpile(). If optimize_loops is true, the AST backend compiles loops
+    # with pytuga.astbackend.OptimizedLoopLowering.
+    backend = os.environ.get('PYTUGA_BACKEND', 'tokens')
+    optimize_loops = bool(os.environ.get('PYTUGA_OPTIMIZE_LOOPS'))
+
+    # If positive, the output functions of the runtime (mostrar(), etc) are
+    # buffered by a pytuga.output.BufferedOutput of this size after init().
+    output_buffer_size = int(os.environ.get('PYTUGA_OUTPUT_BUFFER') or 0)
+
+    _ast_compilers = lazy(lambda self: {})
+
+    @property
+    def ast_compiler(self):
+        """
+        The :class:`pytuga.astbackend.AstCompiler` for the current compiler
+        options.
+        """
+
+        from .astbackend import AstCompiler, OptimizedLoopLowering
+        from .cache import compiler_options
+
+        options = compiler_options(self)
+        try:
+            return self._ast_compilers[options]
+        except KeyError:
+            lowering = OptimizedLoopLowering() if self.optimize_loops else None
+            compiler = AstCompiler(self, lowering)
+            self._ast_compilers[options] = compiler
+            return compiler
+
+    @lazy
+    def incomplete_source_checker(self):
+        from .incremental import IncompleteSourceChecker
+
+        return IncompleteSourceChecker(self)
+
+    @property
+    def profiler(self):
+        """
+        A :class:`pytuga.profiling.TranspileProfiler` that records the time
+        and number of tokens of each transpilation stage. None (the default)
+        disables profiling.
+        """
+
+        return self.lexer.profiler
+
+    @profiler.setter
+    def profiler(self, value):
+        self.lexer.profiler = value
+
+    def transpile(self, src, source_map=False):
+        """
+        Convert source to Python.
+
+        Results are stored in the transpile_cache, including source maps.
+        If source_map is True, return a tuple of (python, source_map) with a
+        :class:`pytuga.sourcemap.SourceMap` that maps positions in the Python
+        code back to the source.
+        """
+
+        if not source_map:
+            return self.transpile_cache.transpile(src, super().transpile)
+
+        return self.transpile_cache.source_map(
+            src, lambda src: self.lexer.transpile(src, source_map=True))
+
+    def transpile_stream(self, reader, writer):
+        """
+        Transpile source code read from the reader file object and write the
+        resulting Python code to writer, one logical line at a time.
+
+        Unlike :meth:`transpile`, results are not cached and memory usage does
+        not depend on the size of the input.
+        """
+
+        self.lexer.transpile_stream(reader, writer)
+
+    def is_incomplete_source(self, src, filename='<input>', symbol='single'):
+        """
+        Test if a given source code is incomplete.
+
+        Incomplete code may appear in users interactions when user is typing a
+        multi line command::
+
+            para cada x de 1 até 10 faça:
+                ... should continue here, but user already pressed enter!
+
+        Sources that end inside brackets, strings or right after a line that
+        opens a block are detected without transpiling them. See
+        :class:`pytuga.incremental.IncompleteSourceChecker`.
+        """
+
+        return self.incomplete_source_checker(src, filename, symbol)
+
+    def compile(self, source, filename, mode, flags=0, dont_inherit=False,
+                compile_function=None):
+        if not isinstance(source, str) or compile_function is not None:
+            code = super().compile(
+                source, filename, mode, flags=flags,
+                dont_inherit=dont_inherit, compile_function=compile_function,
+            )
+        else:
+            def compile_source(src, *args):
+                if self.backend == 'ast':
+                    return self.ast_compiler.compile(src, *args)
+                return self._compile(self.transpile(src), *args)
+
+            code = self.transpile_cache.compile(
+                source, filename, mode, flags, dont_inherit, compile_source
+            )
+        return self.resolve_curses(code, mode)
+
+    def exec(self, source, globals=None, locals=None, exec_function=None,
+             **limits):
+        source = self.resolve_curses(source, 'exec')
+        if not any(value is not None for value in limits.values()):
+            return super().exec(source, globals, locals, exec_function)
+
+        from .limits import ResourceMonitor
+
+        if isinstance(source, str):
+            source = self.compile(source, '<string>', 'exec')
+        with ResourceMonitor(**limits):
+            return super().exec(source, globals, locals, exec_function)
+
+    def eval(self, source, globals=None, locals=None, eval_function=None):
+        source = self.resolve_curses(source, 'eval')
+        return super().eval(source, globals, locals, eval_function)
+
+    compile.__doc__ = Transpyler.compile.__doc__
+    exec.__doc__ = Transpyler.exec.__doc__.rstrip() + \
+        '''
+            memory, allocations, timeout, cpu_time:
+                Resource limits (see :class:`pytuga.limits.ResourceMonitor`).
+                If a limit is exceeded, the program is interrupted with a
+                :class:`pytuga.limits.MemoryLimitError` or
+                :class:`pytuga.limits.TimeLimitError`.
+        '''
+    eval.__doc__ = Transpyler.eval.__doc__
+
+    @classmethod
+    def core_functions(cls):
+        """
+        Return the namespace of core functions of Transpyler.core_functions().
+        The exec() function also accepts resource limits.
+        """
+
+        ns = super().core_functions()
+
+        def exec(source, globals=None, locals=None, exec_function=None,
+                 memory=None, allocations=None, timeout=None, cpu_time=None):
+            return cls().exec(
+                source, globals=globals, locals=locals,
+                exec_function=exec_function, memory=memory,
+                allocations=allocations, timeout=timeout, cpu_time=cpu_time,
+            )
+
+        exec.__doc__ = cls.exec.__doc__
+        ns['exec'] = exec
+        return ns
+
+    def resolve_curses(self, source, mode):
+        """
+        Apply the lazy curses required to run source.
+
+        Sources given as strings are compiled and the resulting code object is
+        returned. It does nothing if lazy curses were not activated by init().
+        """
+
+        if not self.lazy_curse_map.active:
+            return source
+        if isinstance(source, str):
+            return self.compile(source, '<string>', mode)
+        if isinstance(source, types.CodeType):
+            self.lazy_curse_map.resolve_code(source)
+        return source
+
+    def transpile_many(self, sources, workers=None, chunksize=None):
+        return batch.transpile_many(sources, workers, chunksize)
+
+    def compile_many(self, sources, filename='<string>', mode='exec',
+                     workers=None, chunksize=None):
+        return batch.compile_many(sources, filename, mode, workers, chunksize)
+
+    transpile_many.__doc__ = batch.transpile_many.__doc__
+    compile_many.__doc__ = batch.compile_many.__doc__
+
+    def start_main(self):
+        """
+        Starts the default main application.
+
+        Besides the options of the default application, it accepts the name of
+        a Pytuguês program to execute and the --server flag, which starts a
+        server that runs programs sent by the pytuga-client command. The
+        --profile-transpile flag prints the stats of each transpilation to
+        stderr as a line of JSON.
+
+        The --transpile flag converts FILE (or "-" for stdin) to Python and
+        writes the result to the file given by --output (stdout by default).
+        The --check flag transpiles and compiles all Pytuguês files in the
+        directory FILE and reports their errors (see :mod:`pytuga.check`).
+        """
+
+        import click
+        from . import server
+
+        @click.command(context_settings=dict(allow_interspersed_args=False))
+        @click.option('--cli', '-c', is_flag=True, default=False,
+                      help='start gui-less console.')
+        @click.option('--console', is_flag=True, default=False,
+                      help='start a simple gui-less console.')
+        @click.option('--notebook/--no-notebook', '-n', default=False,
+                      help='starts notebook server.')
+        @click.option('--server', 'run_server', is_flag=True, default=False,
+                      help='start a server for pytuga-client.')
+        @click.option('--socket', default=None,
+                      help='path of the server socket.')
+        @click.option('--profile-transpile', is_flag=True, default=False,
+                      help='print per-stage transpilation stats as JSON.')
+        @click.option('--transpile', 'transpile_only', is_flag=True,
+                      default=False, help='convert FILE to Python.')
+        @click.option('--output', '-o', 'output_path', default='-',
+                      help='output file of --transpile.')
+        @click.option('--check', 'check_only', is_flag=True, default=False,
+                      help='check all Pytuguês files in the FILE directory.')
+        @click.option('--format', 'report_format', default='text',
+                      type=click.Choice(['text', 'json']),
+                      help='format of the --check report.')
+        @click.option('--manifest', default=None,
+                      help='path of the --check manifest file.')
+        @click.argument('file', required=False)
+        @click.argument('args', nargs=-1, type=click.UNPROCESSED)
+        def main(cli, console, notebook, run_server, socket,
+                 profile_transpile, transpile_only, output_path, check_only,
+                 report_format, manifest, file, args):
+            if profile_transpile:
+                self.profiler = profiling.TranspileProfiler(
+                    lambda stats: click.echo(stats.to_json(), err=True),
+                    keep=False,
+                )
+            if run_server:
+                return server.start_server(self, socket)
+            if transpile_only:
+                return self._transpile_command(file, args, output_path)
+            if check_only:
+                return self._check_command(file, args, report_format,
+                                           manifest)
+            if file:
+                self.init()
+                raise SystemExit(server.run_path(self, [file] + list(args)))
+            return self._start_application(cli, console, notebook)
+
+        return main()
+
+    def _start_application(self, cli, console, notebook):
+        import click
+
+        if cli:
+            return self.start_console('auto')
+        if console:
+            return self.start_console('console')
+        if notebook:
+            return self.start_notebook()
+
+        if has_qt():
+            return self.start_qturtle()
+        else:
+            msg = 'Could not start GUI. Do you have Qt installed?'
+            click.echo(msg, err=True)
+            return self.start_console('jupyter')
+
+    def _transpile_command(self, file, args, output):
+        import click
+
+        # Options given after FILE are collected in args
+        if len(args) == 2 and args[0] in ('-o', '--output'):
+            output, args = args[1], ()
+        if not file or args:
+            raise click.UsageError('usage: --transpile FILE [-o OUTPUT]')
+        return self._transpile_file(file, output)
+
+    def _check_command(self, directory, args, report_format, manifest):
+        import click
+
+        if not directory or args or not os.path.isdir(directory):
+            raise click.UsageError('usage: --check DIRECTORY')
+        return self._check_tree(directory, report_format, manifest)
+
+    def _transpile_file(self, path, output):
+        import click
+
+        # The output file is only replaced if transpilation succeeds
+        if output == '-':
+            writer = click.get_text_stream('stdout')
+        else:
+            writer = open(output + '.part', 'w', encoding='utf8')
+        try:
+            with click.open_file(path, encoding='utf8') as reader:
+                self.transpile_stream(reader, writer)
+        except SyntaxError as ex:
+            location = path if ex.lineno is None else \
+                '%s:%s' % (path, ex.lineno)
+            click.echo('%s: %s' % (location, ex.msg), err=True)
+            raise SystemExit(1)
+        finally:
+            if output != '-':
+                writer.close()
+                if sys.exc_info()[0] is None:
+                    os.replace(writer.name, output)
+                else:
+                    os.unlink(writer.name)
+
+    def _check_tree(self, directory, report_format, manifest):
+        import click
+        from .check import check_tree
+
+        report = check_tree(directory, manifest=manifest)
+        output = report.to_json() if report_format == 'json' else \
+            report.to_text()
+        if output:
+            click.echo(output)
+        raise SystemExit(0 if report.ok else 1)
+
+    def init(self, ns=None):
+        super().init(ns)
+        if self.output_buffer_size > 0 and output.active is None:
+            buffer = output.BufferedOutput(self.output_buffer_size)
+            buffer.install(self.namespace)
+
+    init.__doc__ = Transpyler.init.__doc__
+
+    def recreate_namespace(self):
+        """
+        Recompute the default namespace, adding the numeric functions of
+        :mod:`pytuga.numeric` and the descarregar_saída() function of
+        :mod:`pytuga.output`.
+        """
+
+        from . import numeric
+
+        ns = super().recreate_namespace()
+        ns.update(numeric.namespace())
+        ns.update(
+            descarregar_saída=output.descarregar_saída,
+            descarregar_saida=output.descarregar_saída,
+        )
+        return ns
+
     def apply_curses(self):
         """
         Apply all curses.
         """
 
-        curse_none_repr('Nulo')
-        curse_bool_repr('Verdadeiro', 'Falso')
-        apply_curses({
-            list: curses.Lista,
-            tuple: curses.Tupla,
-            set: curses.Conjunto,
-            dict: curses.Dicionário,
-            str: curses.Texto,
-        })
+        curses.curse_reprs()
+        if self.lazy_curses:
+            self.lazy_curse_map.activate()
+        else:
+            curses.apply_curse_map(curses.CURSES)
 
     def __make_global_namespace(self):
         ns = super().make_global_namespace()
@@ -0,0 +1,136 @@
+"""
+Thin client for the Pytuguês server.
+
+This module only uses the standard library and does not import pytuga or
+transpyler, so it starts in a few milliseconds. It sends the program name,
+arguments and the standard streams of the current process to a server
+started with ``pytuga --server`` and exits with the status of the program.
+
+If no server is running, it falls back to ``python -m pytuga``.
+
+Usage::
+
+    pytuga-client programa.pytg [ARGS]...
+"""
+import json
+import os
+import socket
+import struct
+import sys
+import tempfile
+
+__all__ = ['main', 'default_address', 'check_owner', 'encode_request',
+           'send_request', 'recv_request']
+
+HEADER = struct.Struct('!I')
+
+
+def default_address():
+    """
+    Return the path of the server socket.
+
+    It can be configured with the PYTUGA_SOCKET environment variable.
+    Otherwise the socket is created in $XDG_RUNTIME_DIR or, if it is not
+    set, in a private pytuga-<uid> directory in the temporary directory.
+    """
+
+    try:
+        return os.environ['PYTUGA_SOCKET']
+    except KeyError:
+        pass
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+    if not directory:
+        name = 'pytuga-%s' % os.getuid()
+        directory = os.path.join(tempfile.gettempdir(), name)
+    return os.path.join(directory, 'pytuga.sock')
+
+
+def check_owner(path):
+    """
+    Raise PermissionError unless path is owned by the current user and its
+    directory is owned by the current user or by root.
+
+    It stops other local users from impersonating the server.
+    """
+
+    uid = os.getuid()
+    directory = os.path.dirname(os.path.abspath(path))
+    if os.stat(directory).st_uid not in (uid, 0):
+        raise PermissionError('%s is not owned by the current user'
+                              % directory)
+    if os.stat(path).st_uid != uid:
+        raise PermissionError('%s is not owned by the current user' % path)
+
+
+def encode_request(request):
+    """
+    Return the bytes sent by :func:`send_request` for the given request.
+    """
+
+    data = json.dumps(request).encode('utf8')
+    return HEADER.pack(len(data)) + data
+
+
+def send_request(sock, request, fds):
+    """
+    Send a JSON request together with a list of file descriptors.
+    """
+
+    socket.send_fds(sock, [encode_request(request)], fds)
+
+
+def recv_request(sock, maxfds=3):
+    """
+    Receive a request sent by :func:`send_request`.
+
+    Return a tuple of (request, fds).
+    """
+
+    data, fds, _, _ = socket.recv_fds(sock, 65536, maxfds)
+    if len(data) < HEADER.size:
+        raise EOFError('incomplete request')
+    size = HEADER.unpack(data[:HEADER.size])[0]
+    data = data[HEADER.size:]
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError('incomplete request')
+        data += chunk
+    return json.loads(data.decode('utf8')), fds
+
+
+def main(argv=None):
+    """
+    Run program in the server and exit with its status code.
+    """
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv:
+        sys.exit(__doc__.strip().rpartition('\n\n')[-1].strip())
+
+    address = default_address()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        check_owner(address)
+        sock.connect(address)
+    except OSError as ex:
+        sock.close()
+        if isinstance(ex, PermissionError):
+            print('pytuga-client: %s' % ex, file=sys.stderr)
+        args = [sys.executable, '-m', 'pytuga'] + argv
+        os.execv(sys.executable, args)
+
+    with sock:
+        request = {'argv': argv, 'cwd': os.getcwd()}
+        send_request(sock, request, [0, 1, 2])
+        data = b''
+        while len(data) < HEADER.size:
+            chunk = sock.recv(HEADER.size - len(data))
+            if not chunk:
+                sys.exit('pytuga-client: connection lost')
+            data += chunk
+    sys.exit(HEADER.unpack(data)[0])
+
+
+if __name__ == '__main__':
+    main()
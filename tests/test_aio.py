@@ -0,0 +1,103 @@
+import asyncio
+import gc
+
+import pytest
+
+import pytuga
+from pytuga import aio
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def server():
+    yield
+    aio.stop_server()
+
+
+def test_aexec_captures_output():
+    result = run(pytuga.aexec('repetir 2 vezes: mostre(input())', 'a\nb\n'))
+    assert result.ok
+    assert result.stdout == 'a\nb\n'
+
+
+def test_aexec_reports_errors():
+    result = run(pytuga.aexec('x = 1 / 0'))
+    assert result.status == 'error'
+    assert result.exit_status == 1
+    assert 'ZeroDivisionError' in result.stderr
+
+
+def test_aexec_timeout():
+    result = run(pytuga.aexec(
+        'mostre(1)\nenquanto verdadeiro faça: prosseguir', timeout=0.5,
+    ))
+    assert result.status == 'timeout'
+    assert result.stdout == '1\n'
+
+
+def test_aexec_timeout_releases_resources(recwarn):
+    result = run(pytuga.aexec('enquanto verdadeiro faça: prosseguir',
+                              timeout=0.2))
+    gc.collect()
+    assert result.status == 'timeout'
+    assert not [w for w in recwarn if w.category is ResourceWarning]
+
+
+def test_aexec_cancel():
+    async def main():
+        task = asyncio.ensure_future(
+            pytuga.aexec('enquanto verdadeiro faça: prosseguir'))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(main())
+
+
+def test_spawn_streams_output():
+    async def main():
+        program = await aio.spawn(
+            'importe sys\n'
+            'repetir 3 vezes: mostre("oi", flush=Verdadeiro)\n'
+            'sys.exit(2)\n'
+        )
+        lines = [line async for line in program.stdout]
+        return lines, await program.wait()
+
+    assert run(main()) == ([b'oi\n'] * 3, 2)
+
+
+def test_concurrent_runs():
+    async def main():
+        return await asyncio.gather(*[
+            pytuga.aexec('mostre(%s)' % i) for i in range(20)
+        ])
+
+    results = run(main())
+    assert [r.stdout for r in results] == ['%s\n' % i for i in range(20)]
+
+
+def test_concurrent_runs_start_a_single_server():
+    aio.stop_server()
+
+    async def main():
+        return await asyncio.gather(*[
+            pytuga.aexec('mostre(%s)' % i) for i in range(5)
+        ])
+
+    results = run(main())
+    assert [r.stdout for r in results] == ['%s\n' % i for i in range(5)]
+
+
+def test_acompile():
+    code = run(pytuga.acompile('x = 0\npara y de 1 até 3: x += y'))
+    ns = {}
+    exec(code, ns)
+    assert ns['x'] == 6
+
+    with pytest.raises(SyntaxError):
+        run(pytuga.acompile('repetir 3'))
@@ -0,0 +1,149 @@
+import ast
+
+import pytest
+
+from pytuga.astbackend import AstCompiler, OptimizedLoopLowering
+from pytuga.cache import tables_digest
+from pytuga.transpyler import PytugaTranspyler
+
+SOURCES = [
+    'repetir 4 vezes: prosseguir',
+    'repita x + 1 vezes:\n    repetir 2 vezes: f("a")\n',
+    'para cada x de 1 até 10: mostre(x)',
+    'para x de 1 até n - 1 a cada 2 faça:\n    repetir x vezes: mostre(x)\n',
+    'se x então:\n    y = 1\nou então se z: prossiga\nsenão: y = 2\n',
+    'função f(x):\n    retorne x e não y\n',
+    'para x de 10 até 1 a cada -1: mostre(x)',
+    'para cada x de n até 0 a cada -2: mostre(x)',
+]
+
+
+@pytest.fixture
+def compiler():
+    return AstCompiler(PytugaTranspyler())
+
+
+@pytest.fixture(params=['tokens', 'ast', 'optimized'])
+def compile_source(request):
+    transpyler = PytugaTranspyler()
+    if request.param == 'tokens':
+        return lambda src: compile(transpyler.transpile(src), '<test>', 'exec')
+    lowering = OptimizedLoopLowering() if request.param == 'optimized' else None
+    compiler = AstCompiler(transpyler, lowering)
+    return lambda src: compiler.compile(src, '<test>', 'exec')
+
+
+@pytest.mark.parametrize('src', SOURCES)
+def test_ast_backend_matches_token_backend(compiler, src):
+    python = PytugaTranspyler().lexer.transpile(src)
+    assert ast.dump(compiler.parse(src)) == ast.dump(ast.parse(python))
+
+
+def test_ast_backend_compiles_loops(compiler):
+    src = (
+        'L = []\n'
+        'para cada x de 1 até 7 a cada 3:\n'
+        '    repetir 2 vezes: L.append(x)\n'
+    )
+    code = compiler.compile(src, '<test>', 'exec')
+    ns = {}
+    exec(code, ns)
+    assert ns['L'] == [1, 1, 4, 4, 7, 7]
+
+
+def test_ast_backend_adds_one_to_the_whole_bound(compiler):
+    # The token backend emits "b se c senão d + 1"
+    src = 'L = []\npara cada x de 1 até 2 se c senão 5: L.append(x)\n'
+    ns = {'c': True}
+    exec(compiler.compile(src, '<test>', 'exec'), ns)
+    assert ns['L'] == [1, 2]
+
+
+def test_ast_backend_keeps_line_numbers(compiler):
+    tree = compiler.parse('x = 1\n\nrepetir 3 vezes:\n    y = x\n')
+    loop = tree.body[1]
+    assert isinstance(loop, ast.For)
+    assert loop.iter.lineno == 3
+    assert loop.body[0].lineno == 4
+
+
+def test_transpyler_backend_option(monkeypatch):
+    transpyler = PytugaTranspyler()
+    digest = tables_digest(transpyler)
+    monkeypatch.setattr(transpyler, 'backend', 'ast')
+    assert tables_digest(transpyler) != digest
+
+    src = 'L = []\npara cada x de 10 até 1 a cada -1: L.append(x)\n'
+    ns = {}
+    exec(transpyler.compile(src, '<test>', 'exec'), ns)
+    assert ns['L'] == [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+def test_optimized_repetir_does_not_bind_names():
+    compiler = AstCompiler(PytugaTranspyler(), OptimizedLoopLowering())
+    tree = compiler.parse('repetir n vezes:\n    repetir 2 vezes: f()\n')
+    assert ast.unparse(tree.body[0].body[0]) == (
+        "for () in __import__('itertools').repeat((), 2):\n    f()"
+    )
+
+    ns = {'n': 3, 'L': []}
+    exec(compiler.compile('repetir n vezes:\n    repetir 2 vezes: '
+                          'L.append(1)\n', '<test>', 'exec'), ns)
+    assert ns['L'] == [1] * 6
+    assert '___' not in ns
+
+
+def test_optimize_loops_option(monkeypatch):
+    transpyler = PytugaTranspyler()
+    digest = tables_digest(transpyler)
+    monkeypatch.setattr(transpyler, 'optimize_loops', True)
+    assert tables_digest(transpyler) != digest
+    monkeypatch.setattr(transpyler, 'backend', 'ast')
+
+    ns = {}
+    code = transpyler.compile('conta_rapida = 0\nrepetir 5 vezes: '
+                              'conta_rapida += 1\n', '<test>', 'exec')
+    exec(code, ns)
+    assert ns['conta_rapida'] == 5
+    assert '___' not in ns
+
+
+@pytest.mark.parametrize('src, python', [
+    ('de 1 até 10', 'range(1, 11)'),
+    ('de a até -3 a cada 2', 'range(a, -2, 2)'),
+    ('de 10 até 1 a cada -1', 'range(10, 0, -1)'),
+    ('de n até 0 a cada -2', 'range(n, -1, -2)'),
+    ('de 1 até n a cada k', 'range(1, n + 1, k)'),
+    ('de 1 até n a cada -1', 'range(1, n - 1, -1)'),
+])
+def test_optimized_de_ate_folds_constant_bounds(src, python):
+    compiler = AstCompiler(PytugaTranspyler(), OptimizedLoopLowering())
+    tree = compiler.parse('para cada x %s: f(x)\n' % src)
+    assert ast.unparse(tree.body[0].iter) == python
+
+
+@pytest.mark.parametrize('src, values', [
+    ('de 10 até 1 a cada -1', [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]),
+    ('de 9 até 3 a cada -3', [9, 6, 3]),
+    ('de n até 0 a cada -2', [4, 2, 0]),
+    ('de 1 até n a cada 2', [1, 3]),
+    # Steps that are not literals always use the "Y + 1" bound
+    ('de n até 1 a cada k', [4, 3]),
+])
+def test_de_ate_counts_down_to_inclusive_bound(compile_source, src, values):
+    ns = {'L': [], 'n': 4, 'k': -1}
+    exec(compile_source('para cada x %s: L.append(x)\n' % src), ns)
+    assert ns['L'] == values
+
+
+@pytest.mark.parametrize('src', [
+    'de 1 até n a cada 0',
+    'de 1 até n a cada -0',
+    'de 1 até 10 a cada -1',
+    'de 10 até 1 a cada 2',
+])
+def test_de_ate_rejects_invalid_steps(compile_source, src):
+    with pytest.raises(SyntaxError) as info:
+        compile_source('x = 0\npara cada x %s: f(x)\n' % src)
+    assert info.value.lineno == 2
+    assert 'passo' in info.value.msg
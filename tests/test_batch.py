@@ -0,0 +1,48 @@
+import pytest
+
+from pytuga import batch, transpile
+from pytuga.transpyler import PytugaTranspyler
+
+sources = [
+    'repetir 2 vezes: prosseguir',
+    'enquanto x faça faça: prosseguir',
+    'para x de 1 até 3: mostre(x)',
+]
+
+
+@pytest.fixture(params=[0, 2])
+def workers(request):
+    yield request.param
+    batch.shutdown_workers()
+
+
+def test_transpile_many(workers):
+    result = PytugaTranspyler().transpile_many(sources * 3, workers=workers)
+    assert len(result) == 9
+    assert result[0::3] == [transpile(sources[0])] * 3
+    assert result[2::3] == [transpile(sources[2])] * 3
+    assert all(isinstance(x, SyntaxError) for x in result[1::3])
+
+
+def test_compile_many(workers):
+    result = PytugaTranspyler().compile_many(sources, workers=workers)
+    assert isinstance(result[1], SyntaxError)
+
+    ns = {'mostre': print}
+    exec(result[2], ns)
+    assert ns['x'] == 3
+
+
+def test_compile_many_resolves_curses(workers, monkeypatch):
+    transpyler = PytugaTranspyler()
+    resolved = []
+    monkeypatch.setattr(transpyler, 'resolve_curses',
+                        lambda code, mode: resolved.append(code) or code)
+    result = transpyler.compile_many(sources, workers=workers)
+    assert result[0] in resolved
+    assert result[2] in resolved
+
+
+def test_compile_many_checks_filenames():
+    with pytest.raises(ValueError):
+        batch.compile_many(sources, ['a.pytg', 'b.pytg'], workers=0)
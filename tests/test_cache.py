@@ -0,0 +1,111 @@
+import ast
+
+import pytest
+
+from pytuga.cache import TranspileCache
+from pytuga.transpyler import PytugaTranspyler
+
+
+@pytest.fixture
+def transpyler():
+    return PytugaTranspyler()
+
+
+def transpile(src):
+    return PytugaTranspyler().lexer.transpile(src)
+
+
+def test_memory_cache_hits(transpyler):
+    cache = TranspileCache(transpyler)
+    src = 'repetir 3 vezes: prosseguir'
+    assert cache.transpile(src, transpile) == transpile(src)
+    assert cache.transpile(src, transpile) == transpile(src)
+    assert cache.info()[:3] == (1, 1, 0)
+
+
+def test_memory_cache_evicts_least_recent(transpyler):
+    cache = TranspileCache(transpyler, maxsize=2)
+    for src in ['x', 'y', 'x', 'z', 'x']:
+        cache.transpile(src, transpile)
+    assert len(cache) == 2
+    assert cache.info()[:2] == (2, 3)
+
+
+def test_disk_cache(transpyler, tmpdir):
+    src = 'enquanto verdadeiro: prosseguir'
+    cache = TranspileCache(transpyler, directory=str(tmpdir))
+    cache.transpile(src, transpile)
+    code = cache.compile(src, '<string>', 'exec', 0, False,
+                         lambda src, *args: compile(transpile(src), *args))
+
+    cache = TranspileCache(transpyler, directory=str(tmpdir))
+    assert cache.transpile(src, transpile) == 'while True: pass'
+    assert cache.compile(src, '<string>', 'exec', 0, False, None) == code
+    assert cache.info()[:3] == (0, 0, 2)
+
+
+def test_source_maps_are_cached(transpyler, tmpdir):
+    src = 'x = 1\nrepetir 3 vezes: mostre(x)\n'
+    calls = []
+
+    def transpile_with_map(src):
+        calls.append(src)
+        return transpyler.lexer.transpile(src, source_map=True)
+
+    cache = TranspileCache(transpyler, directory=str(tmpdir))
+    python, source_map = cache.source_map(src, transpile_with_map)
+    assert cache.source_map(src, transpile_with_map)[0] == python
+    assert len(calls) == 1
+
+    cache = TranspileCache(transpyler, directory=str(tmpdir))
+    cached_python, cached_map = cache.source_map(src, None)
+    assert cached_python == python
+    assert cached_map.tables == source_map.tables
+    assert cached_map.lookup(2, 25) == source_map.lookup(2, 25)
+    assert cache.transpile(src, None) == python
+
+
+def test_keys_depend_on_translation_tables(transpyler):
+    cache = TranspileCache(transpyler)
+    key = cache.key('x')
+    cache._digest = 'other'
+    assert cache.key('x') != key
+
+
+def test_compile_keys_depend_on_compiler_options(transpyler, monkeypatch):
+    src = 'repetir 2 vezes: prosseguir'
+    code = transpyler.compile(src, '<string>', 'exec')
+    assert '___' in code.co_names
+
+    monkeypatch.setattr(transpyler, 'backend', 'ast')
+    code = transpyler.compile(src, '<string>', 'exec')
+    assert '___' in code.co_names
+
+    # Switching options after the first compilation takes effect
+    monkeypatch.setattr(transpyler, 'optimize_loops', True)
+    code = transpyler.compile(src, '<string>', 'exec')
+    assert '___' not in code.co_names
+
+    monkeypatch.setattr(transpyler, 'optimize_loops', False)
+    transpyler.transpile_cache.clear()
+    code = transpyler.compile(src, '<string>', 'exec')
+    assert '___' in code.co_names
+
+
+def test_syntax_trees_are_not_cached(transpyler, tmpdir):
+    cache = TranspileCache(transpyler, directory=str(tmpdir))
+    tree = cache.compile('x = 1', '<string>', 'exec', ast.PyCF_ONLY_AST,
+                         False, compile)
+    assert isinstance(tree, ast.Module)
+    assert len(cache) == 0
+    assert tmpdir.listdir() == []
+
+
+def test_failed_writes_leave_no_files(transpyler, tmpdir):
+    def write_invalid(fd, value):
+        fd.write(b'partial')
+        raise ValueError('unmarshallable object')
+
+    cache = TranspileCache(transpyler, directory=str(tmpdir))
+    cache._save('x.pyc', object(), write_invalid)
+    assert tmpdir.listdir() == []
@@ -0,0 +1,56 @@
+import json
+import os
+
+from pytuga.check import check_tree, MANIFEST_NAME
+
+
+def write(tmpdir, name, src):
+    path = tmpdir.join(name)
+    path.write_text(src, encoding='utf8', ensure=True)
+    return path
+
+
+def test_check_reports_errors(tmpdir):
+    write(tmpdir, 'ok.pytg', 'repetir 2 vezes:\n    mostre(1)\n')
+    write(tmpdir, 'sub/bad.pytg', 'x = 1\nse x então então: y\n')
+    write(tmpdir, 'sub/py.pytg', 'x = (\n')
+    write(tmpdir, '.hidden/bad.pytg', 'x = (\n')
+
+    report = check_tree(str(tmpdir), workers=0)
+    assert (report.files, report.checked) == (3, 3)
+    assert [error['file'] for error in report.errors] == \
+        [os.path.join('sub', 'bad.pytg'), os.path.join('sub', 'py.pytg')]
+    error = report.errors[0]
+    assert error['line'] == 2
+    assert error['message'] == 'Repetição inválida: então então'
+    assert json.loads(report.to_json())['errors'] == report.errors
+    assert report.to_text().splitlines()[0] == \
+        '%s:2:6: Repetição inválida: então então' % error['file']
+
+
+def test_check_skips_unchanged_files(tmpdir):
+    write(tmpdir, 'a.pytg', 'mostre(1)\n')
+    path = write(tmpdir, 'b.pytg', 'se x então então: y\n')
+    assert check_tree(str(tmpdir), workers=0).checked == 2
+    assert tmpdir.join(MANIFEST_NAME).check()
+
+    report = check_tree(str(tmpdir), workers=0)
+    assert report.checked == 0
+    assert len(report.errors) == 1
+
+    path.write_text('se x então: y\n', encoding='utf8')
+    report = check_tree(str(tmpdir), workers=0)
+    assert report.checked == 1
+    assert report.ok
+
+
+def test_check_in_parallel(tmpdir):
+    for i in range(8):
+        write(tmpdir, 'ex%s.pytg' % i, 'repetir %s vezes: x = 1\n' % i)
+    write(tmpdir, 'bad.pytg', 'repetir 3: x\n')
+    manifest = str(tmpdir.join('manifest.json'))
+
+    report = check_tree(str(tmpdir), workers=2, manifest=manifest)
+    assert (report.files, report.checked) == (9, 9)
+    assert [error['file'] for error in report.errors] == ['bad.pytg']
+    assert report.errors[0]['line'] == 1
@@ -0,0 +1,68 @@
+import inspect
+
+from transpyler.utils import synonyms
+
+from pytuga.curses import LazyCurses, Lista, Tupla, code_names, \
+    curse_attributes, unaccented_keywords
+
+
+class Alvo:
+    pass
+
+
+class Maldição:
+    @synonyms('dobre')
+    def dobrar(self):
+        return 2
+
+
+def test_code_names_include_nested_functions():
+    code = compile('def f(x):\n    return x.foo()\ny.bar', '<string>', 'exec')
+    assert {'foo', 'bar', 'f', 'y'} <= code_names(code)
+
+
+def test_lazy_curses_are_applied_on_demand():
+    lazy = LazyCurses({Alvo: Maldição})
+    code = compile('x.dobre()', '<string>', 'exec')
+
+    lazy.resolve_code(code)
+    assert not hasattr(Alvo(), 'dobre')
+
+    lazy.activate()
+    lazy.resolve_code(compile('x.outro()', '<string>', 'exec'))
+    assert not hasattr(Alvo(), 'dobre')
+
+    lazy.resolve_code(code)
+    assert Alvo().dobre() == 2
+    assert 'dobre' not in lazy.index
+
+
+def test_methods_are_bound_to_builtins():
+    assert Lista.acrescentar is Lista.acrescente
+    assert type(Lista.acrescentar) is type(list.append)
+    assert Lista.acrescentar.__doc__ == \
+        'Acrescenta um elemento no final da lista.'
+    assert str(inspect.signature(Tupla.contar)) == '(self, value, /)'
+
+    L = []
+    Lista.acrescentar(L, 1)
+    assert L == [1]
+    assert Tupla.contar((1, 2, 1), 1) == 2
+
+
+def test_curse_attributes_include_synonyms_and_unaccented_names():
+    attrs = curse_attributes(Lista)
+    assert attrs['acrescentar'] is Lista.acrescentar
+    assert attrs['copia'] is attrs['cópia'] is Lista.cópia
+    assert attrs['insira'] is attrs['inserir']
+    assert attrs['retire_ultimo'] is Lista.retirar
+
+
+def test_unaccented_keywords():
+    @unaccented_keywords
+    def f(índice, posição=0):
+        return índice, posição
+
+    assert f(1, 2) == (1, 2)
+    assert f(indice=1, posicao=2) == (1, 2)
+    assert f(índice=1) == (1, 0)
@@ -38,3 +38,12 @@ a b
 # def test_bad_syntax_raises_syntax_error(bad_syntax):
 #     with pytest.raises(SyntaxError):
 #         exec(bad_syntax)
+
+
+def test_repeated_keywords_raise_syntax_error():
+    for src in ['enquanto x faça faça:\n    pass',
+                'se x então então:\n    pass']:
+        with pytest.raises(SyntaxError) as info:
+            exec(src)
+        assert 'Repetição inválida' in str(info.value)
+        assert info.value.lineno == 1
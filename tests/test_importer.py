@@ -0,0 +1,75 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+from pytuga import importer
+from pytuga.transpyler import PytugaTranspyler
+
+
+@pytest.fixture
+def project(tmpdir, monkeypatch):
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    tmpdir.join('modulo_pytg.pytg').write(
+        'x = 0\n'
+        'repetir 3 vezes:\n'
+        '    x = x + 1\n'
+    )
+    pkg = tmpdir.mkdir('pacote_pytg')
+    pkg.join('__init__.pytg').write('y = verdadeiro ou falso\n')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    importer.install()
+    yield tmpdir
+    importer.uninstall()
+    for name in ['modulo_pytg', 'pacote_pytg']:
+        sys.modules.pop(name, None)
+
+
+def test_import_module(project):
+    import modulo_pytg
+    import pacote_pytg
+
+    assert modulo_pytg.x == 3
+    assert pacote_pytg.y is True
+
+
+def test_import_uses_cached_bytecode(project, monkeypatch):
+    assert importlib.import_module('modulo_pytg').x == 3
+
+    path = str(project.join('modulo_pytg.pytg'))
+    cache_path = importer.bytecode_path(path, PytugaTranspyler())
+    assert os.path.exists(cache_path)
+
+    # Second import must not compile source again
+    def source_to_code(*args, **kwargs):
+        raise AssertionError('source was compiled')
+
+    del sys.modules['modulo_pytg']
+    monkeypatch.setattr(importer.PytugaLoader, 'source_to_code',
+                        source_to_code)
+    assert importlib.import_module('modulo_pytg').x == 3
+
+
+def test_python_modules_take_precedence(project):
+    project.join('modulo_duplo.py').write('origem = "py"\n')
+    project.join('modulo_duplo.pytg').write('origem = "pytg"\n')
+    try:
+        assert importlib.import_module('modulo_duplo').origem == 'py'
+    finally:
+        sys.modules.pop('modulo_duplo', None)
+
+
+def test_bytecode_path_reuses_tables_digest(monkeypatch):
+    transpyler = PytugaTranspyler()
+    path = importer.bytecode_path('modulo.pytg', transpyler)
+
+    def tables_digest(*args, **kwargs):
+        raise AssertionError('tables were hashed again')
+
+    monkeypatch.setattr('pytuga.cache.tables_digest', tables_digest)
+    assert importer.bytecode_path('modulo.pytg', transpyler) == path
+
+    # Compiler options still change the tag
+    monkeypatch.setattr(transpyler, 'optimize_loops', True)
+    assert importer.bytecode_path('modulo.pytg', transpyler) != path
@@ -0,0 +1,193 @@
+import random
+
+import pytest
+
+from pytuga.incremental import IncompleteSourceChecker, \
+    IncrementalTranspiler, split_logical_lines, check_indentation
+from pytuga.transpyler import PytugaTranspyler
+
+BLOCK = (
+    'para x de 1 até 10 a cada 2 faça:\n'
+    '    repetir 3 vezes:\n'
+    '        mostre(x)\n'
+    '\n'
+    '# comentário\n'
+    'f(1,\n'
+    '  2)\n'
+)
+
+
+def transpile(src):
+    return PytugaTranspyler().transpile(src)
+
+
+def test_split_logical_lines():
+    lines, rest = split_logical_lines(BLOCK + '# fim')
+    assert lines == [
+        'para x de 1 até 10 a cada 2 faça:\n',
+        '    repetir 3 vezes:\n',
+        '        mostre(x)\n',
+        '\n# comentário\nf(1,\n  2)\n',
+    ]
+    assert rest == '# fim'
+
+
+def test_check_indentation():
+    assert check_indentation(['if x:\n', '    y\n', '\n', 'z\n'])
+    assert not check_indentation(['if x:\n', '    y\n', '  z\n'])
+
+
+def test_initial_state():
+    state = IncrementalTranspiler(BLOCK * 3)
+    assert state.source == BLOCK * 3
+    assert state.python == transpile(BLOCK * 3)
+
+
+def test_edit_only_transpiles_affected_lines():
+    src = BLOCK * 100
+    state = IncrementalTranspiler(src)
+    count = state.chunks_transpiled
+
+    pos = src.index('mostre(x)', len(src) // 2) + 7
+    python = state.edit(pos, pos + 1, 'y')
+    assert python == transpile(src[:pos] + 'y' + src[pos + 1:])
+    assert state.chunks_transpiled - count <= 2
+
+
+def test_edit_that_opens_a_multiline_string():
+    src = 'x = 1\nrepetir 2 vezes: mostre(x)\ny = 2\n'
+    state = IncrementalTranspiler(src)
+    state.edit(4, 4, '"""')
+    state.edit(len(state.source), len(state.source), '"""\n')
+    assert state.python == transpile(state.source)
+
+
+def test_update_reuses_head_and_tail():
+    src = BLOCK * 50
+    state = IncrementalTranspiler(src)
+    count = state.chunks_transpiled
+
+    pos = len(src) // 2
+    new = src[:pos] + 'repetir 2 vezes: mostre(0)\n' + src[pos:]
+    assert state.update(new) == transpile(new)
+    assert state.chunks_transpiled - count <= 4
+
+
+def test_syntax_errors_are_reported_with_full_source_positions():
+    state = IncrementalTranspiler(BLOCK)
+    with pytest.raises(SyntaxError) as exc:
+        state.edit(0, 0, 'x = 1\n' * 5 + 'se x então então: y\n')
+    assert exc.value.lineno == 6
+
+    state.edit(0, state.offsets[6], '')
+    assert state.python == transpile(BLOCK)
+
+
+def test_indentation_is_revalidated_after_edits():
+    src = BLOCK * 20
+    state = IncrementalTranspiler(src)
+    pos = src.index('f(1,', len(src) // 2)
+    with pytest.raises(SyntaxError):
+        state.edit(pos, pos, '  ')
+    state.edit(pos, pos + 2, '')
+    assert state.python == transpile(src)
+
+    # Fix the indentation of a line by editing a previous line
+    with pytest.raises(SyntaxError):
+        state.edit(pos, pos, '  ')
+    pos = src.rindex('    repetir', 0, pos)
+    state.edit(pos, pos + 2, '')
+    assert state.python == transpile(state.source)
+
+
+def test_random_edits_match_full_transpile():
+    rng = random.Random(0)
+    pieces = ['a', ' ', '\n', '(', ')', '"', ':', '#', '1', '    ',
+              'repetir ', ' vezes', 'de ', ' até ']
+    state = IncrementalTranspiler(BLOCK * 2)
+    for _ in range(200):
+        src = state.source
+        start = rng.randint(0, len(src))
+        end = min(len(src), start + rng.randint(0, 5))
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 2)))
+        try:
+            state.edit(start, end, text)
+        except (SyntaxError, ValueError):
+            pass
+        src = src[:start] + text + src[end:]
+        assert state.source == src
+
+        try:
+            expected = transpile(src)
+            compile(expected, '<string>', 'exec')
+        except (SyntaxError, ValueError):
+            continue
+        assert state.python == expected
+
+
+@pytest.mark.parametrize('src', [
+    'para x de 1 até 3 faça:',
+    'se x então:  # comentário',
+    'se x então:\n    mostre(x)',
+    'se x então:\n    mostre(x)\nsenão:',
+    'x = [1,\n     2',
+    'x = """abc\n',
+    'x = 1 + \\',
+])
+def test_incomplete_source(src):
+    checker = IncompleteSourceChecker()
+    assert checker.scan(src).is_incomplete()
+    assert checker(src)
+    assert PytugaTranspyler().is_incomplete_source(src)
+
+
+@pytest.mark.parametrize('src', [
+    'mostre(x)',
+    'x = "a:"',
+    'x = {1: 2}',
+    '# nota:',
+    'se x então:\n    mostre(x)\n',
+    'se x então: mostre(x)\n',
+])
+def test_complete_source(src):
+    checker = IncompleteSourceChecker()
+    assert not checker.scan(src).is_incomplete()
+    assert not checker(src)
+
+
+def test_incomplete_source_errors():
+    checker = IncompleteSourceChecker()
+    with pytest.raises(SyntaxError):
+        checker('x = )')
+    assert checker('se x então então: y')
+
+
+@pytest.mark.parametrize('src', [
+    'x = 1:',
+    'mostre(x):',
+    'se x então faça faça:',
+    'se x = 1 então:',
+])
+def test_invalid_lines_ending_with_colon(src):
+    with pytest.raises(SyntaxError):
+        IncompleteSourceChecker()(src)
+
+
+@pytest.mark.parametrize('src', [
+    'repetir 3 vezes:',
+    'tente:',
+    'exceção ValueError:',
+    'se x então:\n    y\nsenão:',
+    'definir função f(x):',
+])
+def test_block_headers_are_incomplete(src):
+    assert IncompleteSourceChecker()(src)
+
+
+def test_incomplete_source_scanner_resumes_from_previous_source():
+    checker = IncompleteSourceChecker()
+    lines = ['para x de 1 até 3 faça:', '    y = [x,', '         x]', '']
+    results = [checker('\n'.join(lines[:n])) for n in range(1, 5)]
+    assert results == [True, True, True, False]
+    assert checker.scan('\n'.join(lines[:2])).checkpoint == \
+        len(lines[0]) + 1
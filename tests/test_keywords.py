@@ -5,3 +5,19 @@ def test_iskeyword():
 	k = 'is'
 	assert type(keywords.iskeyword(k)) is bool
 
+
+def test_keyword_tables_are_frozen():
+	assert isinstance(keywords.kwlist, frozenset)
+	assert isinstance(keywords.PURE_PYTG_KEYWORDS, frozenset)
+	with pytest.raises(TypeError):
+		keywords.KEYWORD_FORMS['foo'] = 'bar'
+
+
+def test_accent_folding():
+	assert keywords.normalize_keyword('senao') == 'senão'
+	assert keywords.normalize_keyword('ateh') == 'até'
+	assert keywords.normalize_keyword('entao') == 'então'
+	assert keywords.normalize_keyword('e') == 'e'
+	assert keywords.normalize_keyword('foo') is None
+	assert keywords.keyword_forms('até') == {'até', 'ate', 'ateh'}
+	assert keywords.iskeyword('entao') and keywords.iskeyword('faca')
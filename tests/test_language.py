@@ -321,6 +321,25 @@ for x in range(1, 2 + 1):
     assert pytg(ptsrc) == py(pysrc)
 
 
+def test_many_commands_in_the_same_line():
+    ptsrc = 'para x de a até b a cada 2 faça: repetir x vezes: mostre(x ou a)'
+    pysrc = 'for x in range(a, b + 1, 2): for ___ in range(x): mostre(x or a)'
+    assert pytg(ptsrc) == py(pysrc)
+
+
+def test_long_file_with_many_loops():
+    ptsrc = 'repetir 2 vezes:\n    para x de 1 até 3: mostre(x)\n' * 500
+    pysrc = 'for ___ in range(2):\n    for x in range(1, 3 + 1): mostre(x)\n' * 500
+    assert pytg(ptsrc) == py(pysrc)
+
+
+def test_malformed_commands():
+    for src in ['repetir 4:\n    1\n', 'repetir 4',
+                'para x de 1 em 1:\n    1\n', 'para x de 1 até 2 a cada a cada 3:']:
+        with pytest.raises(SyntaxError):
+            transpile(src)
+
+
 #
 # Bug tracker: these are all examples that have failed in some point and do not
 # belong to any category in special
@@ -365,3 +384,12 @@ def test_full_conditional_command():
     ptsrc = 'se x então faça:\n    pass'
     pysrc = 'if x:\n   pass'
     assert pytg(ptsrc) == py(pysrc)
+
+
+def test_token_trie_prefers_longest_sequence():
+    from pytuga.lexer import TokenTrie
+
+    trie = TokenTrie({('ou', 'se'): 'elif', ('ou',): 'or'})
+    tokens = tokenize('ou se x\n')
+    assert trie.match(tokens, 0) == (('ou', 'se'), 'elif')
+    assert trie.match(tokens, 1) is None
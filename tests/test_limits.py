@@ -0,0 +1,60 @@
+import pytest
+
+import pytuga
+from pytuga.limits import MemoryLimitError, ResourceMonitor, TimeLimitError
+
+
+def test_exec_memory_limit():
+    src = 'L = []\nenquanto verdadeiro faça: L.append("x" * 1000)\n'
+    with pytest.raises(MemoryLimitError) as info:
+        pytuga.exec(src, memory=20 * 2 ** 20)
+    assert 'limite de memória excedido' in str(info.value)
+    assert info.value.usage.peak_memory > 20 * 2 ** 20
+
+
+def test_exec_huge_allocation_fails_at_once():
+    with pytest.raises(MemoryLimitError) as info:
+        pytuga.exec('x = [0] * 10**10', memory=20 * 2 ** 20)
+    assert isinstance(info.value, MemoryError)
+    assert info.value.usage.time < 1
+
+
+def test_exec_allocations_limit():
+    src = 'L = []\nenquanto verdadeiro faça: L.append([1])\n'
+    with pytest.raises(MemoryLimitError) as info:
+        pytuga.exec(src, allocations=10 ** 5)
+    assert 'limite de alocações excedido' in str(info.value)
+    assert info.value.usage.blocks > 10 ** 5
+
+
+@pytest.mark.parametrize('limit', ['timeout', 'cpu_time'])
+def test_exec_time_limits(limit):
+    with pytest.raises(TimeLimitError) as info:
+        pytuga.exec('enquanto verdadeiro faça: prosseguir', **{limit: 0.1})
+    assert 'limite de tempo' in str(info.value)
+    assert 0.1 <= info.value.usage.time < 1
+
+
+def test_limit_errors_cannot_be_silenced():
+    src = (
+        'enquanto verdadeiro faça:\n'
+        '    tente:\n'
+        '        prosseguir\n'
+        '    exceção:\n'
+        '        prosseguir\n'
+    )
+    with pytest.raises(TimeLimitError):
+        pytuga.exec(src, timeout=0.1)
+
+
+def test_monitor_reports_usage():
+    ns = {}
+    with ResourceMonitor(memory=50 * 2 ** 20, timeout=5) as monitor:
+        pytuga.exec('L = [x * 2 para cada x em range(1000)]', ns)
+    assert len(ns['L']) == 1000
+    usage = monitor.usage
+    assert usage.peak_memory >= 0
+    assert usage.time < 5
+    assert 'tempo de CPU' in usage.to_text()
+    assert set(usage.as_dict()) == {'time', 'cpu_time', 'memory',
+                                    'peak_memory', 'blocks', 'samples'}
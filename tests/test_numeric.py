@@ -0,0 +1,91 @@
+from array import array
+
+import pytest
+
+import pytuga
+from pytuga import numeric
+from transpyler import math as scalar
+
+ANGLES = [0, 30, 45, 90, 135, 180, 270, 360, -45, 720.5]
+BATCHED = [
+    (numeric.raiz_em_lote, scalar.sqrt, [0, 1, 2, 16, 1e6]),
+    (numeric.seno_em_lote, scalar.sin, ANGLES),
+    (numeric.cosseno_em_lote, scalar.cos, ANGLES),
+    (numeric.tangente_em_lote, scalar.tan, ANGLES),
+    (numeric.exponencial_em_lote, scalar.exp, [-1000, -1, 0, 1, 10]),
+    (numeric.logaritmo_em_lote, scalar.log, [1e-9, 1, 2, 100]),
+    (numeric.log10_em_lote, scalar.log10, [1e-9, 1, 10, 12345]),
+]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(numeric, 'numpy', None)
+    return request.param
+
+
+@pytest.mark.parametrize('batched, function, data', BATCHED)
+def test_batched_functions_match_scalar_functions(backend, batched,
+                                                  function, data):
+    expected = [function(x) for x in data]
+    assert batched(data) == pytest.approx(expected, rel=1e-15, abs=1e-15)
+
+    result = batched(array('d', data))
+    assert isinstance(result, array)
+    assert list(result) == pytest.approx(expected, rel=1e-15, abs=1e-15)
+
+
+def test_batched_functions_keep_exact_angles(backend):
+    assert numeric.seno_em_lote([0, 180, 360]) == [0.0, 0.0, 0.0]
+    assert numeric.cosseno_em_lote([90, 270]) == [0.0, 0.0]
+    assert numeric.tangente_em_lote([45, 225]) == [1.0, 1.0]
+
+
+def test_batched_functions_raise_math_errors(backend):
+    with pytest.raises(ValueError):
+        numeric.raiz_em_lote([4, -1])
+    with pytest.raises(ValueError):
+        numeric.logaritmo_em_lote([0])
+    with pytest.raises(OverflowError):
+        numeric.exponencial_em_lote([1000])
+
+
+def test_batched_functions_accept_numpy_arrays():
+    numpy = pytest.importorskip('numpy')
+    result = numeric.raiz_em_lote(numpy.array([1.0, 4.0, 9.0]))
+    assert isinstance(result, numpy.ndarray)
+    assert result.tolist() == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize('convert', [list, iter, lambda x: array('d', x)])
+def test_aggregates(backend, convert):
+    data = [2, 4, 4, 4, 5, 5, 7, 9]
+    assert numeric.soma(convert(data)) == 40
+    assert numeric.média(convert(data)) == 5
+    assert numeric.variância(convert(data), populacional=True) == 4
+    assert numeric.desvio_padrão(convert(data), populacional=True) == 2
+    assert numeric.variância(convert(data)) == pytest.approx(32 / 7)
+
+
+def test_aggregates_errors(backend):
+    with pytest.raises(ValueError):
+        numeric.média([])
+    with pytest.raises(ValueError):
+        numeric.variância([1])
+    with pytest.raises(ValueError):
+        numeric.desvio_padrão(iter([]), populacional=True)
+
+
+def test_numeric_functions_in_namespace():
+    ns = {}
+    pytuga.exec(
+        'm = media([1, 2, 3])\n'
+        'dp = desvio_padrão([1, 2, 3])\n'
+        'r = raiz_em_lote([1, 4, 9])\n', ns
+    )
+    assert ns['m'] == 2
+    assert ns['dp'] == 1
+    assert ns['r'] == [1, 2, 3]
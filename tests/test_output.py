@@ -0,0 +1,116 @@
+import builtins
+import io
+import sys
+
+import pytest
+from transpyler.lib import _lib_io
+
+import pytuga
+from pytuga import output
+from pytuga.output import BufferedOutput
+from pytuga.transpyler import PytugaTranspyler
+
+
+@pytest.fixture
+def run():
+    def run(src, buffer, **ns):
+        with buffer:
+            pytuga.exec(src, ns)
+        return ns
+
+    return run
+
+
+def test_output_is_written_when_buffer_is_full(capsys):
+    with BufferedOutput(size=10) as buffer:
+        _lib_io.print('abc')
+        assert capsys.readouterr().out == ''
+        _lib_io.print('defghi')
+        assert capsys.readouterr().out == 'abc\ndefghi\n'
+        _lib_io.print('x', 'y', sep='-', end='')
+        assert buffer.pending == 3
+    assert capsys.readouterr().out == 'x-y'
+    assert output.active is None
+
+
+def test_capture_sink(run):
+    data = bytearray()
+    run('para cada x de 1 até 3: mostre(x)\nmostrar_formatado("%s!", "olá")',
+        BufferedOutput(sink=data))
+    assert data.decode('utf8') == '1\n2\n3\nolá!\n'
+
+
+def test_flush_before_input(monkeypatch, run):
+    sink = io.StringIO()
+    monkeypatch.setattr('sys.stdin', io.StringIO('Ana\n'))
+    seen = []
+    monkeypatch.setattr(_lib_io, '_input',
+                        lambda msg: seen.append(sink.getvalue()) or 'Ana')
+    ns = run('mostre("oi")\nnome = leia_texto("nome?")\nmostre(nome)\n',
+             BufferedOutput(sink=sink))
+    assert ns['nome'] == 'Ana'
+    assert seen == ['oi\n']
+    assert sink.getvalue() == 'oi\nAna\n'
+
+
+def test_explicit_flush(run):
+    sink = io.StringIO()
+    ns = run('mostre("a")\ndescarregar_saída()\nvisto = saida.getvalue()\n'
+             'mostre("b")\n', BufferedOutput(sink=sink), saida=sink)
+    assert ns['visto'] == 'a\n'
+    assert sink.getvalue() == 'a\nb\n'
+
+
+def test_file_argument_is_not_buffered(capsys):
+    sink = io.StringIO()
+    with BufferedOutput():
+        _lib_io.print('direto', file=sink)
+        assert sink.getvalue() == 'direto\n'
+
+
+def test_only_one_buffer_is_installed():
+    with BufferedOutput():
+        with pytest.raises(RuntimeError):
+            BufferedOutput().install()
+    assert _lib_io._print is print
+
+
+def test_init_installs_buffer(monkeypatch, capsys):
+    transpyler = PytugaTranspyler()
+    monkeypatch.setattr(transpyler, 'output_buffer_size', 1024)
+    transpyler.init()
+    try:
+        assert output.active is not None
+        assert output.active.size == 1024
+        assert transpyler.namespace['input'] is not builtins.input
+        assert builtins.input is input
+    finally:
+        output.active.uninstall()
+    assert 'input' not in transpyler.namespace
+
+
+def test_direct_writes_keep_their_order(capsys):
+    with BufferedOutput():
+        _lib_io.print(1)
+        _lib_io.print(2)
+        sys.stdout.write('3\n')
+        _lib_io.print(4)
+        print(5)
+    assert capsys.readouterr().out == '1\n2\n3\n4\n5\n'
+
+
+def test_namespace_input_flushes(monkeypatch, capsys):
+    seen = []
+    monkeypatch.setattr(builtins, 'input', lambda msg='':
+                        seen.append(capsys.readouterr().out) or 'Ana')
+    namespace = {}
+    buffer = BufferedOutput()
+    buffer.install(namespace)
+    try:
+        assert builtins.input is not namespace['input']
+        _lib_io.print('oi')
+        assert namespace['input']('nome?') == 'Ana'
+    finally:
+        buffer.uninstall()
+    assert seen == ['oi\n']
+    assert namespace == {}
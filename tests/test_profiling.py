@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from pytuga.profiling import TranspileProfiler
+from pytuga.transpyler import PytugaTranspyler
+
+SRC = 'para x de 1 até 10 a cada 2 faça:\n    repetir x vezes: mostre(x)\n'
+
+
+@pytest.fixture
+def transpyler():
+    transpyler = PytugaTranspyler()
+    yield transpyler
+    transpyler.profiler = None
+
+
+def test_profiling_is_disabled_by_default(transpyler):
+    assert transpyler.profiler is None
+    assert transpyler.lexer.profiler is None
+
+
+def test_profiled_transpile_has_the_same_result(transpyler):
+    expected = transpyler.lexer.transpile(SRC)
+    transpyler.profiler = TranspileProfiler()
+    assert transpyler.lexer.transpile(SRC) == expected
+
+
+def test_profiler_records_stages(transpyler):
+    calls = []
+    transpyler.profiler = profiler = TranspileProfiler(calls.append)
+    transpyler.lexer.transpile(SRC)
+    transpyler.lexer.transpile(SRC)
+
+    assert profiler.count == 2
+    assert calls == profiler.history
+    stats = calls[0]
+    assert stats.lines == 2
+    assert [name for name, _, _ in stats.stages] == [
+        'tokenize', 'sequences', 'translations', 'repetir', 'de_ate',
+        'untokenize',
+    ]
+    assert all(tokens > 0 for _, _, tokens in stats.stages)
+    assert stats.total > 0
+
+    data = json.loads(stats.to_json())
+    assert data['lines'] == 2
+    assert len(data['stages']) == 6
+    assert json.loads(profiler.to_json())['calls'] == 2
@@ -0,0 +1,75 @@
+import signal
+from types import SimpleNamespace
+
+import pytest
+
+from pytuga.sandbox import ExecutionPool, killed_result
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ExecutionPool(workers=1, timeout=10) as pool:
+        yield pool
+
+
+def test_run_captures_output(pool):
+    result = pool.run('repetir 2 vezes: mostre(input())', 'olá\nmundo\n')
+    assert result.ok
+    assert result.stdout == 'olá\nmundo\n'
+    assert result.exit_status == 0
+
+
+def test_run_reports_errors(pool):
+    result = pool.run('x = 1\ny = x / 0')
+    assert result.status == 'error'
+    assert result.exit_status == 1
+    assert 'ZeroDivisionError' in result.stderr
+
+    result = pool.run('repetir 3: prosseguir')
+    assert result.status == 'error'
+    assert 'vezes' in result.stderr
+
+
+def test_exit_status(pool):
+    result = pool.run('importe sys\nsys.exit(3)')
+    assert result.status == 'error'
+    assert result.exit_status == 3
+
+
+def test_runs_are_isolated(pool):
+    assert pool.run('x = 42\nmostre = Nulo').ok
+    result = pool.run('mostre(Verdadeiro)\nmostre(x)')
+    assert result.stdout == 'Verdadeiro\n'
+    assert 'NameError' in result.stderr
+
+
+def test_time_limits(pool):
+    result = pool.run('enquanto verdadeiro faça: prosseguir', timeout=0.5)
+    assert result.status == 'timeout'
+
+    result = pool.run('enquanto verdadeiro faça: prosseguir', cpu_time=1)
+    assert result.status == 'cpu'
+
+
+@pytest.mark.parametrize('signum, cpu, memory, status', [
+    (signal.SIGKILL, 1.5, None, 'cpu'),
+    (signal.SIGXCPU, 0.9, None, 'cpu'),
+    (signal.SIGKILL, 0.1, None, 'killed'),
+    (signal.SIGKILL, 0.1, 2 ** 20, 'memory'),
+    (signal.SIGSEGV, 0.1, 2 ** 20, 'killed'),
+])
+def test_killed_result(signum, cpu, memory, status):
+    rusage = SimpleNamespace(ru_utime=cpu, ru_stime=0.0)
+    result = killed_result(signum, rusage, 1, memory, 0.0)
+    assert result.status == status
+    assert result.exit_status == -signum
+
+
+def test_memory_limit(pool):
+    result = pool.run('x = [0] * 10**9', memory=50 * 2 ** 20)
+    assert result.status == 'memory'
+
+
+def test_map(pool):
+    results = pool.map(['mostre(%s)' % i for i in range(5)])
+    assert [r.stdout for r in results] == ['%s\n' % i for i in range(5)]
@@ -0,0 +1,81 @@
+import os
+import socket
+import sys
+
+import pytest
+
+import pytuga_client
+from pytuga import server
+from pytuga.transpyler import PytugaTranspyler
+
+
+def test_request_protocol():
+    a, b = socket.socketpair(socket.AF_UNIX)
+    with a, b:
+        request = {'argv': ['prog.pytg', 'x' * 100000], 'cwd': '/'}
+        pytuga_client.send_request(a, request, [1])
+        received, fds = pytuga_client.recv_request(b)
+        assert received == request
+        assert len(fds) == 1
+        os.close(fds[0])
+
+
+def test_default_address(monkeypatch):
+    monkeypatch.setenv('PYTUGA_SOCKET', '/x/server.sock')
+    assert pytuga_client.default_address() == '/x/server.sock'
+    monkeypatch.delenv('PYTUGA_SOCKET')
+    monkeypatch.setenv('XDG_RUNTIME_DIR', '/run/user/1000')
+    assert pytuga_client.default_address() == '/run/user/1000/pytuga.sock'
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    directory = os.path.dirname(pytuga_client.default_address())
+    assert os.path.basename(directory) == 'pytuga-%s' % os.getuid()
+
+
+def test_socket_owner_is_checked(tmpdir, monkeypatch):
+    address = str(tmpdir.join('private', 'pytuga.sock'))
+    with server.bind_socket(address):
+        assert os.stat(address).st_mode & 0o077 == 0
+        pytuga_client.check_owner(address)
+        monkeypatch.setattr(os, 'getuid', lambda: os.stat(address).st_uid + 1)
+        with pytest.raises(PermissionError):
+            pytuga_client.check_owner(address)
+
+
+@pytest.fixture(autouse=True)
+def sys_state(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', list(sys.argv))
+    monkeypatch.setattr(sys, 'path', list(sys.path))
+
+
+def test_run_path(tmpdir, capsys):
+    path = tmpdir.join('prog.pytg')
+    path.write('importe sys\n'
+               'repetir 2 vezes: mostre(sys.argv[1])\n'
+               'sys.exit(3)\n')
+    status = server.run_path(PytugaTranspyler(), [str(path), 'olá'])
+    assert status == 3
+    assert capsys.readouterr().out == 'olá\nolá\n'
+
+
+def test_run_path_reports_errors(tmpdir, capsys):
+    path = tmpdir.join('prog.pytg')
+    path.write('x = 1 / 0\n')
+    assert server.run_path(PytugaTranspyler(), [str(path)]) == 1
+    assert 'ZeroDivisionError' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('src', ['x = 1 / 0\n', 'se x então\n'])
+def test_run_path_transpiles_failing_programs_once(tmpdir, capsys,
+                                                   monkeypatch, src):
+    transpyler = PytugaTranspyler()
+    transpyler.transpile_cache.clear()
+    lexer_transpile = transpyler.lexer.transpile
+    calls = []
+    monkeypatch.setattr(transpyler.lexer, 'transpile', lambda *args, **kw:
+                        calls.append(args) or lexer_transpile(*args, **kw))
+
+    path = tmpdir.join('prog.pytg')
+    path.write(src)
+    assert server.run_path(transpyler, [str(path)]) == 1
+    assert len(calls) == 1
+    assert 'Error' in capsys.readouterr().err
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+from pytuga.transpyler import PytugaTranspyler
+
+SRC = (
+    'para cada x de 1 até 3 faça:\n'
+    '    repetir x vezes: y = 1 / (x - 2)\n'
+)
+
+
+@pytest.fixture
+def transpyler():
+    return PytugaTranspyler()
+
+
+def test_transpile_with_source_map(transpyler):
+    python, source_map = transpyler.transpile(SRC, source_map=True)
+    assert python == transpyler.transpile(SRC)
+    assert python == transpyler.lexer.transpile(SRC)
+
+    src_lines = SRC.splitlines()
+    py_lines = python.splitlines()
+    for lineno, token in [(1, 'x'), (1, '1'), (1, '3'), (2, 'y'),
+                          (2, '(x'), (2, '2')]:
+        col = py_lines[lineno - 1].index(token)
+        assert source_map.lookup(lineno, col) == \
+            (lineno, src_lines[lineno - 1].index(token))
+
+
+def test_unchanged_lines_are_not_stored(transpyler):
+    src = 'x = 1\nse x então: y = 2\nz = 3\n'
+    _, source_map = transpyler.transpile(src, source_map=True)
+    assert source_map.tables[0] is None
+    assert source_map.tables[1] is not None
+    assert source_map.tables[2] is None
+    assert source_map.lookup(3, 2) == (3, 2)
+
+
+def test_format_exception(transpyler):
+    transpyler.init()
+    _, source_map = transpyler.transpile(SRC, source_map=True)
+    code = transpyler.compile(SRC, 'prog.pytg', 'exec')
+    with pytest.raises(ZeroDivisionError) as exc:
+        transpyler.exec(code, {})
+
+    lines = source_map.format_exception(exc.value, 'prog.pytg')
+    msg = ''.join(lines)
+    assert '    repetir x vezes: y = 1 / (x - 2)\n' in msg
+    if sys.version_info >= (3, 11):
+        carets = msg.split('y = 1 / (x - 2)\n')[1].splitlines()[0]
+        assert carets.index('~') == SRC.splitlines()[1].index('1 /')
+
+
+def test_format_syntax_error(transpyler):
+    src = 'se x então: y = = 2\n'
+    python, source_map = transpyler.transpile(src, source_map=True)
+    with pytest.raises(SyntaxError) as exc:
+        compile(python, 'prog.pytg', 'exec')
+
+    msg = ''.join(source_map.format_exception(exc.value, 'prog.pytg'))
+    text, carets = msg.splitlines()[-3:-1]
+    assert text.strip() == src.strip()
+    assert text.index('= = 2') + 2 == carets.index('^')
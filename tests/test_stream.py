@@ -0,0 +1,77 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pytuga.tokens import TokenBuffer
+from pytuga.transpyler import PytugaTranspyler
+
+SOURCES = [
+    '',
+    '\n\n',
+    'repetir 4 vezes: prosseguir',
+    '  repetir 4 vezes:\n    repetir x+1 vezes: f("a")\n',
+    '# a\nse x:\n    # b\n\n    y = 1\n# c\n\n',
+    'se x:\n\ty = 1\n\tz = [1,\n  2]\nw\n',
+    'para x de 1 até 10 a cada 2 faça:\n    mostre("""a\n\nb""", x)\n\n\n',
+]
+
+
+def stream(src):
+    writer = io.StringIO()
+    PytugaTranspyler().transpile_stream(io.StringIO(src), writer)
+    return writer.getvalue()
+
+
+@pytest.mark.parametrize('src', SOURCES)
+def test_stream_matches_transpile(src):
+    assert stream(src) == PytugaTranspyler().lexer.transpile(src)
+
+
+def test_logical_lines_keep_absolute_positions():
+    src = 'x = 1\n\n# c\ny = [1,\n     2]\nz\n'
+    bufs = list(TokenBuffer.iter_logical_lines(io.StringIO(src).readline))
+    assert [buf.first_line for buf in bufs] == [1, 2, 6, 7]
+    assert [buf.source for buf in bufs] == \
+        ['x = 1\n', '\n# c\ny = [1,\n     2]\n', 'z\n', '']
+    assert bufs[2].lines[0] == 6
+    assert bufs[2].source_line(6) == 'z\n'
+
+
+def test_stream_errors_have_absolute_line_numbers():
+    src = 'x = 1\n' * 10 + 'se x então então: y\n'
+    with pytest.raises(SyntaxError) as exc:
+        stream(src)
+    assert exc.value.lineno == 11
+    assert exc.value.text == 'se x então então: y\n'
+
+    with pytest.raises(SyntaxError) as exc:
+        stream('x = 1\n' * 10 + 'repetir 3:\n    y\n')
+    assert 'linha 11' in str(exc.value)
+    assert exc.value.lineno == 11
+    assert exc.value.text == 'repetir 3:\n'
+
+
+def test_transpile_command(tmpdir):
+    path = str(tmpdir.join('prog.pytg'))
+    output = str(tmpdir.join('prog.py'))
+    with open(path, 'w', encoding='utf8') as fd:
+        fd.write('repetir 2 vezes:\n    mostre(1)\n')
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    cmd = [sys.executable, '-m', 'pytuga', '--transpile', path]
+    subprocess.check_call(cmd + ['-o', output], env=env)
+    with open(output, encoding='utf8') as fd:
+        assert fd.read() == 'for ___ in range( 2 ):\n    mostre(1)\n'
+
+    with open(path, 'w', encoding='utf8') as fd:
+        fd.write('x\nse x então então: y\n')
+    proc = subprocess.run(cmd + ['-o', output], env=env,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    assert proc.returncode == 1
+    assert proc.stderr.startswith(path + ':2: ')
+    assert sorted(os.listdir(str(tmpdir))) == ['prog.py', 'prog.pytg']
+    with open(output, encoding='utf8') as fd:
+        assert fd.read().startswith('for ___')
@@ -0,0 +1,69 @@
+from tokenize import NAME, NEWLINE, OP
+
+from pytuga.lexer import TokenTrie, keyword_positions
+from pytuga.tokens import TokenBuffer, token_end
+from pytuga.transpyler import PytugaTranspyler
+
+SRC = 'para x de 1 até 10 a cada 2 faça:\n    mostre("""a\nb""", x)\n'
+
+
+def test_buffer_roundtrip():
+    buf = TokenBuffer.from_source(SRC)
+    assert buf.untokenize() == SRC
+    assert [tk.string for tk in buf.to_tokens()] == \
+        [buf.string(idx) for idx in range(len(buf))]
+
+
+def test_buffer_interns_strings():
+    buf = TokenBuffer.from_source('x = x + x\n')
+    assert buf.strings[0] == buf.strings[2] == buf.strings[4]
+    assert buf.table.count('x') == 1
+
+
+def test_buffer_token_ends():
+    buf = TokenBuffer.from_source(SRC)
+    tokens = buf.to_tokens()
+    lexer = PytugaTranspyler().lexer
+    assert [tk.end for tk in lexer.tokenize(SRC)] == \
+        [tuple(tk.end) for tk in tokens]
+    assert token_end(1, 4, '"""a\nbc"""') == (2, 5)
+    assert token_end(1, 4, '\n', NEWLINE) == (1, 5)
+
+
+def test_append_strings_separates_names():
+    buf = TokenBuffer()
+    end = buf.append_strings(1, 0, ('for', '___', 'in', 'range', '('))
+    assert list(buf.cols) == [0, 4, 8, 11, 16]
+    assert list(buf.types) == [NAME, NAME, NAME, NAME, OP]
+    assert end == (1, 17)
+
+
+def test_token_trie_matches_buffer():
+    trie = TokenTrie({('ou', 'então'): 'elif', ('ou',): 'or'})
+    buf = TokenBuffer.from_source('x ou então y ou z\n')
+    assert trie.match_buffer(buf, 1) == (('ou', 'então'), 'elif')
+    assert trie.match_buffer(buf, 4) == (('ou',), 'or')
+    assert trie.match_buffer(buf, 0) is None
+
+
+def test_rewrites_on_token_lists_and_buffers_agree():
+    lexer = PytugaTranspyler().lexer
+    tokens = lexer.process_de_ate_command(lexer.tokenize(SRC))
+    buf = lexer.rewrite_de_ate(TokenBuffer.from_source(SRC))
+    assert [tk.string for tk in tokens] == \
+        [buf.string(idx) for idx in range(len(buf))]
+    assert lexer.untokenize(tokens) == buf.untokenize()
+
+
+def test_rewrites_skip_buffers_without_keywords():
+    lexer = PytugaTranspyler().lexer
+    buf = TokenBuffer.from_source('x = [a, b + c]\ny = x\n')
+    assert lexer.rewrite_repetir(buf) is buf
+    assert lexer.rewrite_de_ate(buf) is buf
+    assert lexer.rewrite_translations(buf, {'se': 'if'}) is buf
+
+
+def test_keyword_positions():
+    buf = TokenBuffer.from_source('se x e y: z = x e x\n')
+    assert keyword_positions(buf, {'e', 'se', 'foo'}) == [0, 2, 8]
+    assert keyword_positions(buf, {'foo'}) == []